@@ -0,0 +1,24 @@
+"""
+Throughput benchmark of the batch weekly meal plan generation, in users per second.
+
+Usage: ``python -m benchmarks.bench_batch_meal_plan [workers] [batch_size]``
+"""
+import sys
+
+from project.utils.BatchMealPlanner import BatchMealPlanner
+from project.utils.RecipeManager import RecipeManager
+from benchmarks.common import bench_app
+
+
+def main(workers: int = 4, batch_size: int = 2000) -> dict:
+    app = bench_app()
+    with app.app_context():
+        planner = BatchMealPlanner(RecipeManager().next_week_date, workers=workers, batch_size=batch_size, seed=1)
+        stats = planner.run()
+    print(' '.join(f'{key}={value:.2f}' if isinstance(value, float) else f'{key}={value}'
+                   for key, value in stats.items()))
+    return stats
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,31 @@
+"""
+Benchmark of ``RecipeManager.generate_meal``: latency, SQL statements and commits per generated plan.
+
+Usage: ``python -m benchmarks.bench_generate_meal [runs]``
+"""
+import sys
+
+from project.database.database import db
+from project.database.models import User
+from project.utils.RecipeManager import RecipeManager
+from benchmarks.common import bench_app, count_database_calls, time_calls, report
+
+
+def main(runs: int = 50) -> dict:
+    app = bench_app()
+    with app.app_context():
+        user = User.query.order_by(User.user_id).first()
+        recipe_mgt = RecipeManager()
+        start_date = recipe_mgt.next_week_date.isoformat()
+        recipe_mgt.generate_meal(user, start_date)
+
+        with count_database_calls(db.engine) as counters:
+            durations = time_calls(lambda: recipe_mgt.generate_meal(user, start_date), runs)
+
+        return report('generate_meal', durations,
+                      statements_per_plan=counters['statements'] / runs,
+                      commits_per_plan=counters['commits'] / runs)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,27 @@
+"""
+Benchmark of the recipe ingestion pipeline driven by the local fake model, without database writes.
+
+Usage: ``python -m benchmarks.bench_ingestion [ideas] [latency_ms]``
+"""
+import sys
+import time
+
+from project.utils.IngestionPipeline import RecipeIngestionPipeline, FakeCompletionBackend
+
+
+def main(idea_count: int = 200, latency_ms: int = 100) -> list:
+    ideas = [{'name': f'Idée {idx}', 'type': 'végétarien'} for idx in range(idea_count)]
+    backend = FakeCompletionBackend(latency=latency_ms / 1000)
+    results = []
+    for max_workers in (1, 8, 32, 64):
+        pipeline = RecipeIngestionPipeline(backend, max_workers=max_workers)
+        start = time.perf_counter()
+        pipeline.run(ideas, writer=lambda recipe: recipe)
+        elapsed = time.perf_counter() - start
+        results.append({'max_workers': max_workers, 'seconds': elapsed, 'ideas_per_second': idea_count / elapsed})
+        print(f'max_workers={max_workers} seconds={elapsed:.2f} ideas_per_second={idea_count / elapsed:.1f}')
+    return results
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,50 @@
+"""
+Benchmark of ``MealPlanOptimizer`` on synthetic catalogs: plans and candidate weeks scored per second, and the
+distance to the nutrition targets against random weeks, as the catalog grows. No database needed.
+
+Usage: ``python -m benchmarks.bench_optimizer [plans] [time_budget_ms]``
+"""
+import sys
+import time
+
+import numpy as np
+
+from project.utils.MealPlanOptimizer import MealPlanOptimizer, daily_targets
+
+
+def synthetic_macros(recipe_count: int, rng) -> np.ndarray:
+    calories = rng.uniform(250, 900, recipe_count)
+    shares = rng.dirichlet((2, 5, 3), recipe_count)
+    return np.column_stack([calories, calories * shares[:, 0] / 4, calories * shares[:, 1] / 4,
+                            calories * shares[:, 2] / 9])
+
+
+def main(plans: int = 50, time_budget_ms: float = 20) -> list:
+    rng = np.random.default_rng(0)
+    targets = daily_targets(2200)
+    results = []
+    for recipe_count in (100, 1000, 10000, 100000):
+        macros = synthetic_macros(recipe_count, rng)
+        optimizer = MealPlanOptimizer(time_budget_ms=time_budget_ms, seed=0)
+        random_weeks = rng.integers(0, recipe_count, (1000, optimizer.week_size))
+        random_score = float(np.median(optimizer.score(random_weeks, macros, targets)))
+
+        scores, rounds = [], 0
+        start = time.perf_counter()
+        for _ in range(plans):
+            _, score = optimizer.optimize(macros, targets)
+            scores.append(score)
+            rounds += optimizer.rounds
+        elapsed = time.perf_counter() - start
+
+        result = {'recipes': recipe_count, 'plans_per_second': plans / elapsed,
+                  'weeks_scored_per_second': rounds * optimizer.candidates / elapsed,
+                  'median_score': float(np.median(scores)), 'random_median_score': random_score}
+        results.append(result)
+        print(' '.join(f'{key}={value:.4f}' if isinstance(value, float) else f'{key}={value}'
+                       for key, value in result.items()))
+    return results
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50, float(sys.argv[2]) if len(sys.argv) > 2 else 20)
@@ -0,0 +1,55 @@
+"""
+Benchmark of ``PantryIndex`` on a synthetic catalog: load time and latency of a pantry lookup across the whole
+catalog, with and without an eligibility filter, against scoring the ingredient sets in pure Python.
+No database needed.
+
+Usage: ``python -m benchmarks.bench_pantry [recipes] [lookups]``
+"""
+import random
+import sys
+import time
+
+from project.utils.PantryIndex import PantryIndex
+from benchmarks.common import time_calls, report
+
+INGREDIENTS = 2000
+
+
+def synthetic_relations(recipe_count: int, rng) -> list:
+    return [(recipe_id, ingredient_id) for recipe_id in range(recipe_count)
+            for ingredient_id in rng.sample(range(INGREDIENTS), rng.randint(4, 14))]
+
+
+def python_rank(ingredient_sets: dict, pantry: set, limit: int = 20) -> list:
+    scored = [(len(ingredients & pantry) / len(ingredients), recipe_id)
+              for recipe_id, ingredients in ingredient_sets.items() if not ingredients.isdisjoint(pantry)]
+    return sorted(scored, reverse=True)[:limit]
+
+
+def main(recipes: int = 100000, lookups: int = 100) -> list:
+    rng = random.Random(0)
+    relations = synthetic_relations(recipes, rng)
+    index = PantryIndex()
+    start = time.perf_counter()
+    index.load(relations)
+    results = [report('pantry_index_load', [time.perf_counter() - start], recipes=recipes,
+                      relations=len(relations))]
+
+    pantries = [rng.sample(range(INGREDIENTS), 25) for _ in range(lookups)]
+    eligible = rng.sample(range(recipes), recipes // 3)
+    ingredient_sets = {}
+    for recipe_id, ingredient_id in relations:
+        ingredient_sets.setdefault(recipe_id, set()).add(ingredient_id)
+
+    lookup = iter(pantries)
+    results.append(report('pantry_rank', time_calls(lambda: index.rank(next(lookup)), lookups)))
+    lookup = iter(pantries)
+    results.append(report('pantry_rank_eligible', time_calls(lambda: index.rank(next(lookup), eligible), lookups)))
+    lookup = iter(pantries)
+    results.append(report('pantry_rank_python', time_calls(lambda: python_rank(ingredient_sets, set(next(lookup))),
+                                                           lookups)))
+    return results
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
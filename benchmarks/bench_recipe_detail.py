@@ -0,0 +1,49 @@
+"""
+Benchmark of ``GET /recipe/id/<recipe_id>``: latency and SQL statements per request, with a cold and a warm
+catalog cache.
+
+Usage: ``python -m benchmarks.bench_recipe_detail [runs]``
+"""
+import sys
+
+from project.database.database import db
+from project.database.models import User, RecipeIngredient
+from project.utils.CatalogCache import catalog_cache
+from project.utils.UserManager import UserManager
+from benchmarks.common import count_database_calls, time_calls, report
+
+
+def main(runs: int = 200) -> list:
+    # The routes are registered on the app of ``project.app``, bound to ``SQLALCHEMY_DATABASE_URI``
+    from project.app import app
+
+    with app.app_context():
+        user_id = db.session.query(User.user_id).order_by(User.user_id).limit(1).scalar()
+        recipe_id = (db.session.query(RecipeIngredient.recipe_id).group_by(RecipeIngredient.recipe_id)
+                     .order_by(db.func.count().desc()).limit(1).scalar())
+        ingredient_count = RecipeIngredient.query.filter_by(recipe_id=recipe_id).count()
+        engine = db.engine
+        token = UserManager(app).generate_token(user_id)
+
+    headers = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+
+    def cold_request():
+        catalog_cache.bump()
+        assert client.get(f'/recipe/id/{recipe_id}', headers=headers).status_code == 200
+
+    def warm_request():
+        assert client.get(f'/recipe/id/{recipe_id}', headers=headers).status_code == 200
+
+    results = []
+    for name, request in (('cold', cold_request), ('warm', warm_request)):
+        request()
+        with count_database_calls(engine) as counters:
+            durations = time_calls(request, runs)
+        results.append(report(f'recipe_detail_{name}', durations, ingredients=ingredient_count,
+                              statements_per_request=counters['statements'] / runs))
+    return results
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
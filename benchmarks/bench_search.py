@@ -0,0 +1,52 @@
+"""
+Benchmark of ``SearchIndex`` on a synthetic catalog: build time and query latency of one, two and three term
+queries, with and without a diet filter. No database needed.
+
+Usage: ``python -m benchmarks.bench_search [recipes] [queries]``
+"""
+import random
+import sys
+import time
+
+from project.utils.SearchIndex import SearchIndex
+from benchmarks.common import time_calls, report
+
+WORDS = ('poulet', 'boeuf', 'saumon', 'tofu', 'lentille', 'pois', 'chiche', 'courgette', 'aubergine', 'tomate',
+         'poivron', 'carotte', 'oignon', 'ail', 'citron', 'curry', 'gratin', 'salade', 'soupe', 'tarte', 'roti',
+         'grille', 'mijote', 'epice', 'fromage', 'creme', 'riz', 'pate', 'quinoa', 'epinard', 'champignon',
+         'poireau', 'patate', 'douce', 'coco', 'basilic', 'thym', 'romarin', 'miel', 'moutarde')
+DIETS = ('vegetarien', 'vegan', 'keto', 'flex')
+# A vocabulary of realistic size, with a few very common words
+VOCABULARY = WORDS + tuple(f'{left}{right}' for left in WORDS for right in WORDS if left != right)
+
+
+def synthetic_catalog(recipe_count: int, rng) -> tuple[list, list]:
+    recipes, recipe_ingredients = [], []
+    for recipe_id in range(recipe_count):
+        title = ' '.join(rng.sample(VOCABULARY, 3))
+        description = ' '.join(rng.choices(VOCABULARY, k=12))
+        instructions = [' '.join(rng.choices(VOCABULARY, k=8)) for _ in range(4)]
+        recipes.append((recipe_id, title, description, instructions, rng.choice(DIETS)))
+        recipe_ingredients += [(recipe_id, name) for name in rng.sample(VOCABULARY, 6)]
+    return recipes, recipe_ingredients
+
+
+def main(recipes: int = 100000, queries: int = 200) -> list:
+    rng = random.Random(0)
+    catalog = synthetic_catalog(recipes, rng)
+    index = SearchIndex()
+    start = time.perf_counter()
+    index.load(*catalog)
+    results = [report('search_index_load', [time.perf_counter() - start], recipes=recipes)]
+
+    for terms in (1, 2, 3):
+        texts = iter([' '.join(rng.sample(VOCABULARY, terms)) for _ in range(queries)])
+        results.append(report(f'search_{terms}_terms', time_calls(lambda: index.search(next(texts)), queries)))
+        texts = iter([' '.join(rng.sample(VOCABULARY, terms)) for _ in range(queries)])
+        results.append(report(f'search_{terms}_terms_diet',
+                              time_calls(lambda: index.search(next(texts), diet='vegan'), queries)))
+    return results
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,55 @@
+"""
+Benchmark of ``Serializer.serialize``: cost per recipe, and lazy loads issued when serializing the relations
+of a recipe, against the previous ``inspect(self).attrs`` based serializer.
+
+Usage: ``python -m benchmarks.bench_serializer [runs] [recipes]``
+"""
+import sys
+from datetime import date
+
+from sqlalchemy import inspect
+
+from project.database.database import db
+from project.database.models import Recipe, RecipeIngredient, MealPlanRecipe
+from benchmarks.common import bench_app, count_database_calls, time_calls, report
+
+
+def legacy_serialize(instance) -> dict:
+    # The serializer replaced by the compiled one, reads every attribute including the relationships
+    return {c: getattr(instance, c) for c in inspect(instance).attrs.keys()}
+
+
+def sample_recipes(count: int) -> list:
+    return [Recipe(recipe_id=idx, title=f'Recette {idx}', description='Description', prepTime=10, cookTime=20,
+                   servings=2, calories=400, protein=20, carbohydrates=40, fat=15,
+                   instructions=['Préparer.', 'Cuire.', 'Servir.'], diet='vegetarien')
+            for idx in range(count)]
+
+
+def main(runs: int = 20, recipes: int = 1000) -> list:
+    results = []
+    app = bench_app()
+    with app.app_context():
+        objects = sample_recipes(recipes)
+        for name, serialize in (('legacy', legacy_serialize), ('compiled', Recipe.serialize)):
+            durations = time_calls(lambda: [serialize(recipe) for recipe in objects], runs)
+            results.append(report(f'serialize_recipe_{name}', [d / recipes for d in durations]))
+
+        relations = [MealPlanRecipe(meal_plan_id=1, recipe_id=idx, date=date.today()) for idx in range(recipes)]
+        durations = time_calls(lambda: [relation.serialize() for relation in relations], runs)
+        results.append(report('serialize_meal_plan_recipe_compiled', [d / recipes for d in durations]))
+
+        relation_ids = [relation_id for relation_id, in
+                        db.session.query(RecipeIngredient.recipeIngredient_id).limit(100).all()]
+        for name, serialize in (('legacy', legacy_serialize), ('compiled', RecipeIngredient.serialize)):
+            db.session.expunge_all()
+            relations = RecipeIngredient.query.filter(RecipeIngredient.recipeIngredient_id.in_(relation_ids)).all()
+            with count_database_calls(db.engine) as counters:
+                durations = time_calls(lambda: [serialize(relation) for relation in relations], 1)
+            results.append(report(f'serialize_recipe_ingredient_{name}', durations,
+                                  relations=len(relations), lazy_loads=counters['statements']))
+    return results
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,51 @@
+"""
+Benchmark of the cold start of a worker: the import of ``project.app``, which creates the app, timed in fresh
+interpreters with ``python -X importtime``. Reports the import time and the slowest top-level packages.
+
+Usage: ``python -m benchmarks.bench_startup [runs] [top]``
+"""
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from benchmarks.common import report
+
+APP_MODULE = 'project.app'
+
+
+def import_times(module: str = APP_MODULE) -> dict:
+    """
+    :param module: The imported module.
+    :return: The cumulative import time in seconds of every module imported by a fresh interpreter importing
+             ``module``, keyed by module name.
+    """
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               capture_output=True, text=True, env=os.environ.copy(), check=True)
+    times = {}
+    # import time: self [us] | cumulative | imported package
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def main(runs: int = 10, top: int = 10) -> list:
+    durations, packages = [], defaultdict(list)
+    for _ in range(runs):
+        times = import_times()
+        durations.append(times[APP_MODULE])
+        for name, seconds in times.items():
+            if '.' not in name:
+                packages[name].append(seconds)
+    results = [report('import_app', durations, modules=len(times))]
+
+    slowest = sorted(packages.items(), key=lambda item: -sum(item[1]))[:top]
+    results += [report(f'import_{name}', samples) for name, samples in slowest]
+    return results
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,83 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+from project import create_app
+
+load_dotenv()
+
+
+def bench_app():
+    """
+    :return: The app bound to the database of the ``SQLALCHEMY_DATABASE_URI`` environment variable.
+    """
+    return create_app()
+
+
+@contextmanager
+def count_database_calls(engine):
+    """
+    Count the SQL statements and the commits issued on ``engine`` while the context is open.
+
+    :param engine: The engine to watch.
+    :return: A dict with the ``statements`` and ``commits`` counters.
+    """
+    counters = {'statements': 0, 'commits': 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counters['statements'] += 1
+
+    def commit(conn):
+        counters['commits'] += 1
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'commit', commit)
+    try:
+        yield counters
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+        event.remove(engine, 'commit', commit)
+
+
+def time_calls(func, repeat: int) -> list:
+    """
+    :param func: Called without argument ``repeat`` times.
+    :return: The duration of each call in seconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(name: str, durations: list, **extra) -> dict:
+    """
+    Print and return the latency summary of a benchmark.
+
+    :param name: The name of the benchmarked operation.
+    :param durations: The duration of each call in seconds.
+    :param extra: Additional figures to report, such as query counts.
+    """
+    result = {
+        'name': name,
+        'runs': len(durations),
+        'mean_ms': statistics.fmean(durations) * 1000,
+        'p50_ms': percentile(durations, 50) * 1000,
+        'p95_ms': percentile(durations, 95) * 1000,
+        'p99_ms': percentile(durations, 99) * 1000,
+    }
+    result.update(extra)
+    print(' '.join(f'{key}={value:.3f}' if isinstance(value, float) else f'{key}={value}'
+                   for key, value in result.items()))
+    return result
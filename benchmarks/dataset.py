@@ -0,0 +1,169 @@
+"""
+Deterministic synthetic dataset: users, ingredients with their allergens, recipes with their ingredients, and
+the meal plans of the last weeks, drawn from a seeded generator with realistic distributions:
+
+* ingredient popularity follows a Zipf law, a few staples (oil, onion, garlic...) are in most recipes,
+* recipes have 3 to 20 ingredients, 9 on average, and log-normal calories,
+* diets and allergies are skewed towards ``flex`` and no allergy, as in production.
+
+The same seed and sizes always produce the same rows; plan dates are relative to the current week so that
+``get_current_meal_plan`` finds them.
+
+Usage: ``python -m benchmarks.dataset [--users N] [--recipes N] [--ingredients N] [--weeks N] [--seed N] --reset``
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from project.database.database import db
+from project.database.models import User, Ingredient, Recipe, RecipeIngredient, MealPlans, MealPlanRecipe
+from project.utils.RecipeManager import MEAL_PLAN_SIZE, meal_plan_recipe_rows
+from benchmarks.common import bench_app
+
+DEFAULT_PASSWORD = 'kebab'
+DIETS = {'flex': 0.55, 'vegetarien': 0.18, 'vegetalien': 0.07, 'sans gluten': 0.06, 'sans lactose': 0.05,
+         'keto': 0.05, 'paleo': 0.04}
+ALLERGENS = ('gluten', 'lactose', 'arachide', 'oeuf', 'soja', 'fruits a coque', 'poisson', 'crustaces',
+             'celeri', 'moutarde', 'sesame', 'sulfites', 'lupin', 'mollusques')
+# Share of the users with 0, 1, 2 and 3 allergies
+ALLERGY_COUNTS = {0: 0.7, 1: 0.2, 2: 0.08, 3: 0.02}
+ALLERGEN_SHARE = 0.12
+CATEGORIES = ('Légume', 'Fruit', 'Viande', 'Poisson', 'Céréale', 'Légumineuse', 'Produit laitier', 'Épices',
+              'Condiment', 'Huile')
+UNITS = ('g', 'ml', 'pièce', 'cuillère à soupe', 'pincée')
+INSERT_BATCH_SIZE = 5000
+
+
+def weighted_choice(rng: random.Random, weights: dict):
+    return rng.choices(list(weights), list(weights.values()))[0]
+
+
+def generate_dataset(users: int = 1000, recipes: int = 2000, ingredients: int = 500, weeks: int = 2,
+                     seed: int = 0, today: date = None) -> dict:
+    """
+    :param users: The number of users.
+    :param recipes: The number of recipes.
+    :param ingredients: The number of ingredients.
+    :param weeks: The number of weeks planned per user, up to the current week.
+    :param seed: The seed of the generator.
+    :param today: The reference day of the plans, today by default.
+    :return: The rows of each table, keyed by model. Rows reference each other by their position in the
+             ``ingredients``, ``recipes`` and ``users`` lists; ``load_dataset`` resolves them to database IDs.
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    current_week = today - timedelta(days=today.weekday())
+
+    ingredient_rows = [{'name': f'ingredient {idx}', 'category': rng.choice(CATEGORIES),
+                        'allergen': rng.choice(ALLERGENS) if rng.random() < ALLERGEN_SHARE else None}
+                       for idx in range(ingredients)]
+    popularity = [1 / (rank + 1) for rank in range(ingredients)]
+
+    recipe_rows, recipe_ingredient_rows = [], []
+    for idx in range(recipes):
+        calories = min(1500, max(150, int(rng.lognormvariate(6.2, 0.35))))
+        shares = [rng.uniform(0.15, 0.3), rng.uniform(0.3, 0.6), rng.uniform(0.2, 0.4)]
+        total = sum(shares)
+        recipe_rows.append({
+            'title': f'Recette {idx}', 'description': f'Description de la recette {idx}.',
+            'diet': weighted_choice(rng, DIETS), 'servings': rng.choice((1, 2, 2, 4, 4, 6)),
+            'prepTime': rng.randint(5, 45), 'cookTime': rng.randint(0, 90), 'calories': calories,
+            'protein': int(calories * shares[0] / total / 4), 'carbohydrates': int(calories * shares[1] / total / 4),
+            'fat': int(calories * shares[2] / total / 9),
+            'instructions': [f'Étape {step + 1}.' for step in range(rng.randint(3, 9))], 'breakfast': False,
+        })
+        size = min(20, max(3, round(rng.gauss(9, 3))))
+        picked = set()
+        while len(picked) < min(size, ingredients):
+            picked.update(rng.choices(range(ingredients), popularity, k=size - len(picked)))
+        recipe_ingredient_rows += [{'recipe': idx, 'ingredient': ingredient, 'quantity': rng.randint(1, 50) * 10,
+                                    'unit': rng.choice(UNITS)} for ingredient in sorted(picked)]
+
+    user_rows, meal_plan_rows = [], []
+    for idx in range(users):
+        allergy_count = weighted_choice(rng, ALLERGY_COUNTS)
+        user_rows.append({
+            'last_name': f'Nom {idx}', 'first_name': f'Prénom {idx}', 'email': f'user{idx}@bench.local',
+            'birthdate': date(1950, 1, 1) + timedelta(days=rng.randint(0, 365 * 55)), 'gender': rng.randint(0, 4),
+            'dietaryPreference': weighted_choice(rng, DIETS), 'allergies': rng.sample(ALLERGENS, allergy_count),
+            'goals': rng.choice((1600, 1800, 2000, 2000, 2200, 2500)), 'tokenCount': 10,
+        })
+        for week in range(weeks):
+            start_date = current_week - timedelta(weeks=week)
+            meal_plan_rows.append({'user': idx, 'start_date': start_date, 'end_date': start_date + timedelta(days=6),
+                                   'recipes': rng.sample(range(recipes), min(MEAL_PLAN_SIZE, recipes))})
+
+    return {Ingredient: ingredient_rows, Recipe: recipe_rows, RecipeIngredient: recipe_ingredient_rows,
+            User: user_rows, MealPlans: meal_plan_rows}
+
+
+def _insert(model, rows: list) -> list:
+    """
+    :return: The IDs of the inserted rows, in the order of ``rows``.
+    """
+    primary_key = model.__table__.primary_key.columns.values()[0]
+    ids = []
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        ids += db.session.execute(insert(model).returning(primary_key, sort_by_parameter_order=True),
+                                  rows[start:start + INSERT_BATCH_SIZE]).scalars().all()
+    return ids
+
+
+def load_dataset(dataset: dict, reset: bool = False) -> dict:
+    """
+    Insert a dataset in bulk, in the database of the current app context.
+
+    :param dataset: The rows of ``generate_dataset``.
+    :param reset: Drop and create every table first.
+    :return: The number of rows inserted per table.
+    """
+    if reset:
+        db.drop_all()
+        db.create_all()
+
+    password_hash = generate_password_hash(DEFAULT_PASSWORD)
+    ingredient_ids = _insert(Ingredient, dataset[Ingredient])
+    recipe_ids = _insert(Recipe, dataset[Recipe])
+    _insert(RecipeIngredient, [{'recipe_id': recipe_ids[row['recipe']],
+                                'ingredient_id': ingredient_ids[row['ingredient']],
+                                'quantity': row['quantity'], 'unit': row['unit']}
+                               for row in dataset[RecipeIngredient]])
+    user_ids = _insert(User, [{**row, 'password_hash': password_hash} for row in dataset[User]])
+    meal_plan_ids = _insert(MealPlans, [{'user_id': user_ids[row['user']], 'start_date': row['start_date'],
+                                         'end_date': row['end_date']} for row in dataset[MealPlans]])
+    meal_plan_recipes = []
+    for meal_plan_id, row in zip(meal_plan_ids, dataset[MealPlans]):
+        meal_plan_recipes += meal_plan_recipe_rows(meal_plan_id, row['start_date'],
+                                                   [recipe_ids[recipe] for recipe in row['recipes']])
+    _insert(MealPlanRecipe, meal_plan_recipes)
+    db.session.commit()
+
+    counts = {model.__tablename__: len(rows) for model, rows in dataset.items()}
+    counts[MealPlanRecipe.__tablename__] = len(meal_plan_recipes)
+    return counts
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description='Load a synthetic dataset in SQLALCHEMY_DATABASE_URI.')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--recipes', type=int, default=2000)
+    parser.add_argument('--ingredients', type=int, default=500)
+    parser.add_argument('--weeks', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--reset', action='store_true', help='Drop and create every table first, required when '
+                                                             'the database is not empty.')
+    args = parser.parse_args(argv)
+
+    dataset = generate_dataset(args.users, args.recipes, args.ingredients, args.weeks, args.seed)
+    app = bench_app()
+    with app.app_context():
+        counts = load_dataset(dataset, reset=args.reset)
+    print(' '.join(f'{table}={count}' for table, count in counts.items()))
+    return counts
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+HTTP load test of one app process: the app is served by a threaded werkzeug server, by default on a
+temporary SQLite file seeded with ``benchmarks.dataset``, and concurrent virtual users drive it with httpx.
+
+Each virtual user logs in once, then repeats the ``generate -> plan -> swap`` flow on the next week until the
+duration is spent. Throughput, latency percentiles and error rate are reported per endpoint.
+
+Usage: ``python -m benchmarks.loadtest [--users N] [--duration S] [--database URI [--reset]]``
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+import httpx
+from sqlalchemy import event
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from benchmarks.common import report
+from benchmarks.dataset import DEFAULT_PASSWORD, generate_dataset
+
+SQLITE_BUSY_TIMEOUT_MS = 30000
+
+
+def configure_sqlite(engine) -> None:
+    """
+    Let the server threads share a SQLite file: WAL journal, so that readers do not block the writer, and a
+    busy timeout instead of immediate ``database is locked`` errors.
+    """
+    @event.listens_for(engine, 'connect')
+    def connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+        cursor.close()
+
+    engine.dispose()
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, code='-', size='-'):
+        pass
+
+
+class VirtualUser(threading.Thread):
+    """
+    A client looping on the meal plan flow, recording the latency and status of each request.
+    """
+    def __init__(self, base_url: str, email: str, deadline: float, rng: random.Random, samples: dict):
+        super().__init__(daemon=True)
+        self.client = httpx.Client(base_url=base_url, timeout=60)
+        self.email = email
+        self.deadline = deadline
+        self.rng = rng
+        self.samples = samples
+        today = date.today()
+        self.start_date = (today + timedelta(days=(7 - today.weekday()))).isoformat()
+
+    def request(self, endpoint: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        start = time.perf_counter()
+        try:
+            response = self.client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.samples[endpoint].append((time.perf_counter() - start, ok))
+        return response if ok else None
+
+    def run(self) -> None:
+        with self.client:
+            response = self.request('POST /user/login', 'POST', '/user/login',
+                                    json={'email': self.email, 'password': DEFAULT_PASSWORD})
+            if response is None:
+                return
+            self.client.headers['Authorization'] = f"Bearer {response.json()['jwtoken']}"
+
+            while time.perf_counter() < self.deadline:
+                self.request('POST /meal/generate', 'POST', '/meal/generate', json={'start_date': self.start_date})
+                response = self.request('GET /meal/plan', 'GET', '/meal/plan', params={'start': self.start_date})
+                meals = [meal for day in response.json() for meal in day] if response is not None else []
+                if meals:
+                    meal = self.rng.choice(meals)
+                    self.request('POST /meal/swap', 'POST', '/meal/swap',
+                                 json={'recipe_id': meal['recipe_id'], 'date': meal['date']})
+
+
+def main(argv=None) -> list:
+    parser = argparse.ArgumentParser(description='Load test the meal plan flow of one app process.')
+    parser.add_argument('--users', type=int, default=8, help='Concurrent virtual users.')
+    parser.add_argument('--duration', type=float, default=20, help='Duration of the test in seconds.')
+    parser.add_argument('--database', default=None, help='Database URI, a temporary SQLite file by default.')
+    parser.add_argument('--reset', action='store_true', help='Drop the tables of --database and seed it, its '
+                                                             'users are used as they are otherwise.')
+    parser.add_argument('--dataset-users', type=int, default=200)
+    parser.add_argument('--recipes', type=int, default=1000)
+    parser.add_argument('--ingredients', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    database = args.database or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'loadtest.db')}"
+    # The routes are registered on the app of ``project.app``, bound to ``SQLALCHEMY_DATABASE_URI`` at import
+    os.environ['SQLALCHEMY_DATABASE_URI'] = database
+    os.environ.setdefault('SECRET_KEY', 'loadtest')
+    from project.app import app
+    from project.database.database import db
+    from project.database.models import User
+    from benchmarks.dataset import load_dataset
+
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            configure_sqlite(db.engine)
+        if args.database is None or args.reset:
+            load_dataset(generate_dataset(args.dataset_users, args.recipes, args.ingredients, seed=args.seed),
+                         reset=True)
+        emails = [email for email, in db.session.query(User.email).order_by(User.user_id).limit(args.users)]
+        dialect = db.engine.dialect.name
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    samples = defaultdict(list)
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    virtual_users = [VirtualUser(base_url, emails[idx % len(emails)], start + args.duration,
+                                 random.Random(rng.random()), samples) for idx in range(args.users)]
+    for virtual_user in virtual_users:
+        virtual_user.start()
+    for virtual_user in virtual_users:
+        virtual_user.join()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    results = []
+    for endpoint, endpoint_samples in samples.items():
+        errors = sum(not ok for _, ok in endpoint_samples)
+        results.append(report(endpoint, [duration for duration, _ in endpoint_samples],
+                              requests_per_second=len(endpoint_samples) / elapsed,
+                              error_rate=errors / len(endpoint_samples)))
+    total = sum(len(endpoint_samples) for endpoint_samples in samples.values())
+    print(f'database={dialect} users={args.users} seconds={elapsed:.1f} requests={total} '
+          f'requests_per_second={total / elapsed:.1f}')
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark suite of the main operations of the API, against the database of ``SQLALCHEMY_DATABASE_URI``:
+latency percentiles and SQL statements per call of each operation, compared with stored baselines.
+
+An operation regresses when its median latency exceeds the baseline by more than ``--tolerance`` and
+``MIN_REGRESSION_MS``, or when it issues more statements per call than the baseline. Statement counts are
+reproducible for a given dataset and seed, latencies depend on the machine: save baselines on the machine
+that runs the comparison. The suite exits with status 1 on a regression.
+
+Load a synthetic dataset first with ``--load-dataset``, which drops every table, or with ``benchmarks.dataset``.
+
+Usage: ``python -m benchmarks.suite [--runs N] [--only NAME ...] [--load-dataset] [--save] [--tolerance 0.5]``
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from project.database.database import db
+from project.database.models import User, Recipe, MealPlans, MealPlanRecipe
+from project.utils.CatalogCache import catalog_cache
+from project.utils.RecipeManager import RecipeManager
+from project.utils.UserManager import UserManager
+from benchmarks.common import bench_app, count_database_calls, report
+from benchmarks.dataset import DEFAULT_PASSWORD, generate_dataset, load_dataset
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+DEFAULT_TOLERANCE = 0.5
+# Latency increases below this are noise, whatever the tolerance
+MIN_REGRESSION_MS = 1.0
+
+
+def measure(name: str, engine, runs: int, prepare, call) -> dict:
+    """
+    :param name: The name of the operation.
+    :param engine: The engine whose statements are counted.
+    :param runs: The number of calls.
+    :param prepare: Called before each call, untimed, returns the arguments of the call.
+    :param call: The measured operation.
+    :return: The report of the operation, see ``report``.
+    """
+    durations, statements = [], 0
+    for _ in range(runs):
+        # Each call runs in a fresh session, like a request
+        db.session.remove()
+        args = prepare()
+        with count_database_calls(engine) as counters:
+            start = time.perf_counter()
+            call(*args)
+            durations.append(time.perf_counter() - start)
+        statements += counters['statements']
+    return report(name, durations, statements_per_call=statements / runs)
+
+
+def operations(app, rng: random.Random) -> dict:
+    """
+    :return: The ``(prepare, call)`` pair of each benchmarked operation, keyed by name.
+    """
+    recipe_mgt = RecipeManager()
+    user_manager = UserManager(app)
+    user_ids = [user_id for user_id, in db.session.query(User.user_id).order_by(User.user_id)]
+    emails = [email for email, in db.session.query(User.email).order_by(User.user_id)]
+    recipe_ids = [recipe_id for recipe_id, in db.session.query(Recipe.recipe_id).order_by(Recipe.recipe_id)]
+    diets = sorted({diet for diet, in db.session.query(Recipe.diet).distinct() if diet})
+    planned_user_ids = [user_id for user_id, in db.session.query(MealPlans.user_id)
+                        .filter(MealPlans.start_date == recipe_mgt.current_week_date)
+                        .order_by(MealPlans.user_id)]
+    if not user_ids or not recipe_ids:
+        raise SystemExit('The database is empty, run benchmarks.dataset or pass --load-dataset')
+
+    def random_user():
+        return db.session.get(User, rng.choice(user_ids))
+
+    def planned_meal():
+        user = db.session.get(User, rng.choice(planned_user_ids))
+        relation = rng.choice(MealPlanRecipe.query
+                              .join(MealPlans, MealPlans.meal_plan_id == MealPlanRecipe.meal_plan_id)
+                              .filter(MealPlans.user_id == user.user_id,
+                                      MealPlans.start_date == recipe_mgt.current_week_date).all())
+        return relation.recipe_id, relation.date.isoformat(), user
+
+    def cold_catalog(*args):
+        catalog_cache.bump()
+        return args
+
+    def warm_catalog(call, *args):
+        call(*args)
+        return args
+
+    return {
+        'login': (lambda: (rng.choice(emails),),
+                  lambda email: user_manager.login({'email': email, 'password': DEFAULT_PASSWORD})),
+        'generate_meal': (lambda: (random_user(), recipe_mgt.next_week_date.isoformat()),
+                          recipe_mgt.generate_meal),
+        'get_current_meal_plan': (lambda: (db.session.get(User, rng.choice(planned_user_ids)),),
+                                  recipe_mgt.get_current_meal_plan),
+        'swap_recipe': (planned_meal, recipe_mgt.swap_recipe),
+        'get_recipe_by_id_cold': (lambda: cold_catalog(rng.choice(recipe_ids)), recipe_mgt.get_recipe_by_id),
+        'get_recipe_by_id_warm': (lambda: warm_catalog(recipe_mgt.get_recipe_by_id, rng.choice(recipe_ids)),
+                                  recipe_mgt.get_recipe_by_id),
+        'list_recipe_by_diet_cold': (lambda: cold_catalog(rng.choice(diets)), recipe_mgt.list_recipe_by_diet),
+        'list_recipe_by_diet_warm': (lambda: warm_catalog(recipe_mgt.list_recipe_by_diet, rng.choice(diets)),
+                                     recipe_mgt.list_recipe_by_diet),
+    }
+
+
+def compare(results: list, baselines: dict, tolerance: float) -> list:
+    """
+    :param results: The reports of the operations.
+    :param baselines: The baseline reports, keyed by operation name.
+    :param tolerance: The accepted relative increase of the median latency.
+    :return: The description of each regression.
+    """
+    regressions = []
+    for result in results:
+        baseline = baselines.get(result['name'])
+        if baseline is None:
+            continue
+        if result['p50_ms'] > max(baseline['p50_ms'] * (1 + tolerance), baseline['p50_ms'] + MIN_REGRESSION_MS):
+            regressions.append(f"{result['name']}: p50 {result['p50_ms']:.2f} ms, "
+                               f"baseline {baseline['p50_ms']:.2f} ms")
+        if result['statements_per_call'] > baseline['statements_per_call']:
+            regressions.append(f"{result['name']}: {result['statements_per_call']:.1f} statements per call, "
+                               f"baseline {baseline['statements_per_call']:.1f}")
+    return regressions
+
+
+def main(argv=None) -> list:
+    parser = argparse.ArgumentParser(description='Benchmark the main operations against stored baselines.')
+    parser.add_argument('--runs', type=int, default=100)
+    parser.add_argument('--only', nargs='*', help='The operations to run, all by default.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--load-dataset', action='store_true', help='Reset the database with the default '
+                                                                    'synthetic dataset first.')
+    parser.add_argument('--baselines', default=BASELINES_PATH)
+    parser.add_argument('--save', action='store_true', help='Store the results as the new baselines.')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    app = bench_app()
+    with app.app_context():
+        if args.load_dataset:
+            load_dataset(generate_dataset(seed=args.seed), reset=True)
+        rng = random.Random(args.seed)
+        engine = db.engine
+        results = [measure(name, engine, args.runs, prepare, call)
+                   for name, (prepare, call) in operations(app, rng).items()
+                   if not args.only or name in args.only]
+
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as baselines_file:
+            baselines = json.load(baselines_file)
+
+    if args.save:
+        baselines.update({result['name']: result for result in results})
+        with open(args.baselines, 'w') as baselines_file:
+            json.dump(baselines, baselines_file, indent=2, sort_keys=True)
+            baselines_file.write('\n')
+        return results
+
+    regressions = compare(results, baselines, args.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    if regressions:
+        sys.exit(1)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,78 @@
 import os
 
+from dotenv import load_dotenv
 from flask import Flask
-from flask_migrate import Migrate
+from flask_cors import CORS
 
+from project.commands import meal_plan_cli, ingredient_cli, migrate_cli
 from project.database.database import db
+from project.route import route_blueprint
+from project.utils.CatalogCache import catalog_cache
+from project.utils.IngredientIndex import ingredient_index, DEFAULT_MATCH_THRESHOLD
+from project.utils.LogSink import log_sink
+from project.utils.Metrics import metrics
+from project.utils.PrincipalCache import principal_cache
+from project.utils.ReplicaRouter import replica_router, DEFAULT_STICKY_SECONDS
+from project.utils.SearchIndex import search_index
 
-def create_app(database_uri = "sqlite:///project.db"):
+def pool_options(prefix: str) -> dict:
+    """
+    :param prefix: The prefix of the ``<prefix>_POOL_SIZE`` and ``<prefix>_MAX_OVERFLOW`` environment variables.
+    :return: The connection pool options they set, the SQLAlchemy defaults are kept for the missing ones.
+    """
+    options = {}
+    if os.getenv(f'{prefix}_POOL_SIZE'):
+        options['pool_size'] = int(os.getenv(f'{prefix}_POOL_SIZE'))
+    if os.getenv(f'{prefix}_MAX_OVERFLOW'):
+        options['max_overflow'] = int(os.getenv(f'{prefix}_MAX_OVERFLOW'))
+    return options
+
+def create_app(database_uri = None):
+    """
+    :param database_uri: The database of the app, ``SQLALCHEMY_DATABASE_URI`` from the environment or the
+                         ``.env`` file when missing, a local SQLite file by default.
+    :return: The app, with its routes and extensions. It is the single entry point of the workers, the tests,
+             the benchmarks and the ``flask`` commands.
+    """
+    load_dotenv()
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri or os.getenv('SQLALCHEMY_DATABASE_URI', 'sqlite:///project.db')
+    # Pool options of the primary, and the defaults of the replicas
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = pool_options('SQLALCHEMY')
+    replica_uris = [uri for uri in os.getenv('SQLALCHEMY_REPLICA_URIS', '').split(',') if uri]
+    app.config['SQLALCHEMY_BINDS'] = {f'replica_{idx}': {'url': uri, **pool_options('REPLICA')}
+                                      for idx, uri in enumerate(replica_uris)}
+    app.config['REPLICA_BIND_KEYS'] = list(app.config['SQLALCHEMY_BINDS'])
+    app.config['REPLICA_SELECTION'] = os.getenv('REPLICA_SELECTION', 'round_robin')
+    app.config['REPLICA_STICKY_SECONDS'] = float(os.getenv('REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS))
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY') #secrets.token_hex(20)
+    app.config['INGESTION_CONCURRENCY'] = int(os.getenv('INGESTION_CONCURRENCY', 8))
+    app.config['CATALOG_CACHE_SIZE'] = int(os.getenv('CATALOG_CACHE_SIZE', catalog_cache.DEFAULT_MAXSIZE))
+    app.config['LOG_SINK_MODE'] = os.getenv('LOG_SINK_MODE', 'async')
+    app.config['LOG_SINK_BATCH_SIZE'] = int(os.getenv('LOG_SINK_BATCH_SIZE', 100))
+    app.config['LOG_SINK_FLUSH_INTERVAL_MS'] = int(os.getenv('LOG_SINK_FLUSH_INTERVAL_MS', 500))
+    app.config['LOG_SINK_MAX_QUEUE'] = int(os.getenv('LOG_SINK_MAX_QUEUE', 10000))
+    app.config['LOG_SINK_OVERFLOW'] = os.getenv('LOG_SINK_OVERFLOW', 'drop')
+    app.config['ACTION_TOKEN_ALLOWANCE'] = int(os.getenv('ACTION_TOKEN_ALLOWANCE', 10))
+    app.config['ACTION_TOKEN_REFILL_DAYS'] = int(os.getenv('ACTION_TOKEN_REFILL_DAYS', 7))
+    app.config['PRINCIPAL_CACHE_TTL'] = float(os.getenv('PRINCIPAL_CACHE_TTL', 0))
+    app.config['MEAL_PLAN_OPTIMIZER_BUDGET_MS'] = float(os.getenv('MEAL_PLAN_OPTIMIZER_BUDGET_MS', 20))
+    app.config['SEARCH_INDEX_WARM'] = os.getenv('SEARCH_INDEX_WARM', '1') == '1'
+    app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', '1') == '1'
+    # /metrics is only served to the scrapers holding this token, see Metrics
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+    app.config['INGREDIENT_MATCH_THRESHOLD'] = float(os.getenv('INGREDIENT_MATCH_THRESHOLD', DEFAULT_MATCH_THRESHOLD))
     db.init_app(app)
-    migrate = Migrate(app, db)
+    catalog_cache.init_app(app)
+    ingredient_index.init_app(app)
+    log_sink.init_app(app)
+    principal_cache.init_app(app)
+    search_index.init_app(app)
+    metrics.init_app(app)
+    replica_router.init_app(app)
+    app.register_blueprint(route_blueprint)
+    CORS(app)
+    app.cli.add_command(meal_plan_cli)
+    app.cli.add_command(ingredient_cli)
+    app.cli.add_command(migrate_cli)
     return app
@@ -0,0 +1,90 @@
+from datetime import datetime, date, timedelta
+import os
+
+import click
+from flask.cli import AppGroup, ScriptInfo
+
+from project.database.database import db
+from project.database.models import Ingredient
+from project.utils.BatchMealPlanner import BatchMealPlanner
+from project.utils.IngredientManager import IngredientManager
+
+meal_plan_cli = AppGroup('meal-plan', help='Meal plan maintenance commands.')
+ingredient_cli = AppGroup('ingredient', help='Ingredient maintenance commands.')
+
+
+class MigrateGroup(click.Group):
+    """
+    The ``flask db`` commands of Flask-Migrate. Flask-Migrate imports alembic, which the workers never use:
+    the extension is only set up when a ``db`` command is looked up.
+    """
+    def migrate_commands(self, ctx: click.Context) -> click.Group:
+        app = ctx.ensure_object(ScriptInfo).load_app()
+        if 'migrate' not in app.extensions:
+            from flask_migrate import Migrate
+            Migrate(app, db)
+        from flask_migrate.cli import db as db_cli
+        return db_cli
+
+    def list_commands(self, ctx: click.Context) -> list:
+        return self.migrate_commands(ctx).list_commands(ctx)
+
+    def get_command(self, ctx: click.Context, name: str):
+        return self.migrate_commands(ctx).get_command(ctx, name)
+
+
+migrate_cli = MigrateGroup('db', help='Perform database migrations.')
+
+
+@meal_plan_cli.command('generate-week')
+@click.option('--start-date', default=None, help='Monday of the week to plan (YYYY-MM-DD), next week by default.')
+@click.option('--from-user-id', type=int, default=None, help='First user ID to process, to resume a run.')
+@click.option('--to-user-id', type=int, default=None, help='Last user ID to process.')
+@click.option('--workers', type=int, default=os.cpu_count(), show_default=True, help='Planning processes.')
+@click.option('--batch-size', type=int, default=1000, show_default=True, help='Users saved per transaction.')
+@click.option('--seed', type=int, default=None, help='Seed of the draws, for reproducible plans.')
+def generate_week(start_date, from_user_id, to_user_id, workers, batch_size, seed):
+    """
+    Generate the meal plans of a week for every user.
+    """
+    if start_date is None:
+        today = date.today()
+        start_date = today + timedelta(days=(7 - today.weekday()))
+    else:
+        start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+
+    def progress(stats: dict):
+        click.echo(f"{stats['users']} users, {stats['plans']} plans, {stats['skipped']} skipped, "
+                   f"last_user_id={stats['last_user_id']}, {stats['users_per_second']:.0f} users/s")
+
+    planner = BatchMealPlanner(start_date, workers=workers, batch_size=batch_size, seed=seed)
+    stats = planner.run(from_user_id, to_user_id, progress=progress)
+    click.echo(f"Done: {stats['plans']} plans for the week of {start_date.isoformat()} in {stats['seconds']:.1f}s")
+
+
+@ingredient_cli.command('dedupe')
+@click.option('--fuzzy', is_flag=True, help='Also merge similar names, not only case, accent and plural variants.')
+@click.option('--threshold', type=float, default=None, help='Minimal similarity of the fuzzy matches.')
+@click.option('--dry-run', is_flag=True, help='List the duplicates without merging them.')
+def dedupe(fuzzy, threshold, dry_run):
+    """
+    Merge the duplicated ingredients into the oldest one and rewrite their recipe relations.
+
+    Restart the web workers afterwards: their ingredient indexes still map names to the merged ingredients.
+    """
+    ingredient_mgt = IngredientManager()
+    duplicates = ingredient_mgt.find_duplicates(fuzzy=fuzzy, threshold=threshold)
+    names = dict(Ingredient.query.with_entities(Ingredient.ingredient_id, Ingredient.name).filter(
+        Ingredient.ingredient_id.in_([ingredient_id for canonical_id, duplicate_ids in duplicates.items()
+                                      for ingredient_id in [canonical_id, *duplicate_ids]])))
+    for canonical_id, duplicate_ids in duplicates.items():
+        click.echo(f"{names[canonical_id]} <- {', '.join(names[duplicate_id] for duplicate_id in duplicate_ids)}")
+
+    if dry_run:
+        click.echo(f"{sum(map(len, duplicates.values()))} duplicates in {len(duplicates)} groups, nothing merged")
+        return
+
+    merged = ingredient_mgt.merge_duplicates(duplicates)
+    click.echo(f"Done: {merged} duplicates merged into {len(duplicates)} ingredients")
+    if merged:
+        click.echo("Restart the web workers, their ingredient indexes still map names to the merged ingredients")
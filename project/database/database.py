@@ -1,3 +1,30 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy.dialects import postgresql, sqlite
 
-db = SQLAlchemy()
\ No newline at end of file
+from project.utils.ReplicaRouter import replica_router
+
+
+class RoutingSession(Session):
+    """
+    The session of the app: the reads of the read-only requests go to a replica, see ``ReplicaRouter``.
+    """
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None:
+            return engine
+        return replica_router.route(self._db, engine, clause, self._flushing)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def upsert(table):
+    """
+    :param table: The model or table to insert into.
+    :return: An INSERT statement of the dialect of the bound engine, supporting ``on_conflict_do_update``
+             and ``on_conflict_do_nothing``.
+    """
+    if db.engine.dialect.name == 'sqlite':
+        return sqlite.insert(table)
+    return postgresql.insert(table)
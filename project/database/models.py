@@ -1,12 +1,80 @@
+import datetime
+import operator
+
 from sqlalchemy import ForeignKey, inspect, func
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from project.database.database import db
+from project.database.types import PortableArray
 
 class Serializer(object):
+    """
+    Column-only serializer, compiled once per model by ``compile_serializer``.
+
+    Only the declared columns are read, minus the ones listed in ``__serialize_exclude__``, so serializing never
+    triggers a lazy load. Dates are converted to ISO strings and arrays to lists. Relationships are only
+    serialized when explicitly asked with ``include``.
+    """
+    __serialize_exclude__ = ()
+    __serialize_fields__ = ()
+    __serialize_converters__ = ()
+    __serializer__ = None
+
+    @classmethod
+    def compile_serializer(cls):
+        keys = []
+        converters = []
+        for column_attr in inspect(cls).column_attrs:
+            if column_attr.key in cls.__serialize_exclude__:
+                continue
+            keys.append(column_attr.key)
+            column_type = column_attr.columns[0].type
+            if isinstance(column_type, (db.Date, db.DateTime)):
+                converters.append((column_attr.key, datetime.date.isoformat if isinstance(column_type, db.Date)
+                                   else datetime.datetime.isoformat))
+            elif isinstance(column_type, (db.ARRAY, PortableArray)):
+                converters.append((column_attr.key, list))
+
+        keys = tuple(keys)
+        converters = tuple(converters)
+        get_values = operator.attrgetter(*keys)
+        cls.__serialize_fields__ = keys
+        cls.__serialize_converters__ = converters
+
+        def serialize(instance):
+            d = dict(zip(keys, get_values(instance)))
+            for key, convert in converters:
+                if d[key] is not None:
+                    d[key] = convert(d[key])
+            return d
+
+        cls.__serializer__ = staticmethod(serialize)
+
+    def serialize(self, include=()):
+        """
+        :param include: The names of the relationships to serialize along with the columns.
+        :return: A dict of the column values, JSON serializable.
+        """
+        d = self.__serializer__(self)
+        for name in include:
+            related = getattr(self, name)
+            if related is None or isinstance(related, Serializer):
+                d[name] = related.serialize() if related is not None else None
+            else:
+                d[name] = Serializer.serialize_list(related)
+        return d
 
-    def serialize(self):
-        return {c: getattr(self, c) for c in inspect(self).attrs.keys()}
+    @classmethod
+    def serialize_row(cls, row) -> dict:
+        """
+        :param row: A result row of some of the model columns, labeled with their attribute names.
+        :return: A dict of the row values, converted like the ones of ``serialize``.
+        """
+        d = dict(row._mapping)
+        for key, convert in cls.__serialize_converters__:
+            if d.get(key) is not None:
+                d[key] = convert(d[key])
+        return d
 
     @staticmethod
     def serialize_list(l):
@@ -14,6 +82,7 @@ class Serializer(object):
 
 class Recipe(db.Model, Serializer):
     __tablename__ = 'recipe'
+    __table_args__ = (db.Index('ix_recipe_diet_recipe_id', 'diet', 'recipe_id'),)
 
     recipe_id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100))
@@ -27,35 +96,27 @@ class Recipe(db.Model, Serializer):
     carbohydrates = db.Column(db.Integer())
     protein = db.Column(db.Integer())
     fat = db.Column(db.Integer())
-    instructions = db.Column(db.ARRAY(db.String), nullable=False)
+    instructions = db.Column(PortableArray(db.String), nullable=False)
     breakfast = db.Column(db.Boolean, unique=False, default=False)
 
     def __repr__(self):
         return f"<Recipe(title='{self.title}', description='{self.description}', diet='{self.diet}')>"
 
-    def serialize(self):
-        d = Serializer.serialize(self)
-        return d
-
 
 class MealPlans(db.Model, Serializer):
     __tablename__ = 'meal_plans'
+    __table_args__ = (db.UniqueConstraint('user_id', 'start_date', name='uq_meal_plans_user_id_start_date'),)
 
     meal_plan_id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, ForeignKey('user.user_id'), nullable=False, index=True)
     user = db.relationship('User', foreign_keys=[user_id])
     start_date = db.Column(db.Date)
     end_date = db.Column(db.Date)
+    revision = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
     def __repr__(self):
         return f"<MealPlan(meal_plan_id='{self.meal_plan_id}'>"
 
-    def serialize(self):
-        d = Serializer.serialize(self)
-        d['start_date'] = d['start_date'].isoformat()
-        d['end_date'] = d['end_date'].isoformat()
-        return d
-
 
 class MealPlanRecipe(db.Model, Serializer):
     __tablename__ = 'meal_plans_recipe_relations'
@@ -71,13 +132,8 @@ class MealPlanRecipe(db.Model, Serializer):
     def __repr__(self):
         return f"<MealPlanRecipe(meal_plan_id='{self.meal_plan_id}', recipe_id='{self.recipe_id}')>"
 
-    def serialize(self):
-        d = Serializer.serialize(self)
-        d['date'] = d['date'].isoformat()
-        return d
-
 
-class Ingredient(db.Model):
+class Ingredient(db.Model, Serializer):
     __tablename__ = 'ingredient'
 
     ingredient_id = db.Column(db.Integer, primary_key=True)
@@ -88,11 +144,7 @@ class Ingredient(db.Model):
     def __repr__(self):
         return f"<Ingredient(name='{self.name}', category='{self.category}')>"
 
-    def serialize(self):
-        d = Serializer.serialize(self)
-        return d
-
-class RecipeIngredient(db.Model):
+class RecipeIngredient(db.Model, Serializer):
     __tablename__ = 'recipe_ingredient_relation'
 
     recipeIngredient_id = db.Column(db.Integer, primary_key=True)
@@ -106,12 +158,9 @@ class RecipeIngredient(db.Model):
     def __repr__(self):
         return f"<RecipeIngredient(recipe_id='{self.recipe_id}', ingredient_id='{self.ingredient_id}')>"
 
-    def serialize(self):
-        d = Serializer.serialize(self)
-        return d
-
-class User(db.Model):
+class User(db.Model, Serializer):
     __tablename__ = 'user'
+    __serialize_exclude__ = ('password_hash', 'joinDate', 'lastTokenReset')
 
     user_id = db.Column(db.Integer, primary_key=True)
     last_name = db.Column(db.String(100))
@@ -121,7 +170,7 @@ class User(db.Model):
     birthdate = db.Column(db.Date)
     gender = db.Column(db.Integer) # 0 Male, 1 Female, 2 Non-binary, 3 Other, 4 won't say it
     dietaryPreference = db.Column(db.String, server_default='flex')
-    allergies = db.Column(db.ARRAY(db.String))
+    allergies = db.Column(PortableArray(db.String))
     goals = db.Column(db.Integer)
     tokenCount = db.Column(db.Integer, default=10, nullable=False)
     lastTokenReset = db.Column(db.DateTime, server_default=func.now())
@@ -136,14 +185,6 @@ class User(db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
-    def serialize(self):
-        d = Serializer.serialize(self)
-        del d['password_hash']
-        del d['joinDate']
-        del d['lastTokenReset']
-        d['birthdate'] = d['birthdate'].isoformat()
-        return d
-
 class Log(db.Model):
     __tablename__ = 'logs'
 
@@ -159,16 +200,19 @@ class Log(db.Model):
     def __repr__(self):
         return f"<Log(id='{self.log_id}', user='{self.user_id}')>"
 
-class ShoppingLists(db.Model):
+class ShoppingLists(db.Model, Serializer):
     __tablename__ = 'shopping_lists'
+    __table_args__ = (db.UniqueConstraint('meal_plan_id', name='uq_shopping_lists_meal_plan_id'),)
 
     shopping_list_id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, ForeignKey('user.user_id'), nullable=False, index=True)
     user = db.relationship('User', foreign_keys=[user_id])
+    meal_plan_id = db.Column(db.Integer, ForeignKey('meal_plans.meal_plan_id'), nullable=True)
+    meal_plan = db.relationship('MealPlans', foreign_keys=[meal_plan_id])
     last_update = db.Column(db.DateTime(timezone=True), server_default=func.now())
 
 
-class ShoppingListItem(db.Model):
+class ShoppingListItem(db.Model, Serializer):
     __tablename__ = 'recipe_shopping_list_relations'
 
     shopping_list_item_id = db.Column(db.Integer, primary_key=True)
@@ -178,3 +222,8 @@ class ShoppingListItem(db.Model):
     ingredient = db.relationship('Ingredient', foreign_keys=[ingredient_id])
     quantity = db.Column(db.Float)
     unit = db.Column(db.String(50))
+
+
+for model in (Recipe, MealPlans, MealPlanRecipe, Ingredient, RecipeIngredient, User, ShoppingLists,
+              ShoppingListItem):
+    model.compile_serializer()
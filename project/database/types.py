@@ -0,0 +1,33 @@
+from sqlalchemy import JSON
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator
+
+
+class PortableArray(TypeDecorator):
+    """
+    A list column: a native ``ARRAY`` on PostgreSQL, a JSON array on the other databases, such as the SQLite
+    file databases of the local runs and load tests. Values are always read back as lists.
+
+    The PostgreSQL schema is unchanged, array operators are only available on PostgreSQL.
+    """
+    impl = JSON
+    cache_ok = True
+
+    def __init__(self, item_type):
+        super().__init__()
+        self.item_type = item_type
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(postgresql.ARRAY(self.item_type))
+        return dialect.type_descriptor(JSON())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return list(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return list(value)
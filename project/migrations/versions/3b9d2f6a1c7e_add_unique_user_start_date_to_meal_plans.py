@@ -0,0 +1,41 @@
+"""Add unique (user_id, start_date) to MealPlans model
+
+Revision ID: 3b9d2f6a1c7e
+Revises: c6f07241174b
+Create Date: 2026-10-18 09:12:31.418502
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9d2f6a1c7e'
+down_revision = 'c6f07241174b'
+branch_labels = None
+depends_on = None
+
+
+DUPLICATED_MEAL_PLANS = """
+    SELECT meal_plan_id FROM meal_plans AS older
+    WHERE EXISTS (
+        SELECT 1 FROM meal_plans AS newer
+        WHERE newer.user_id = older.user_id
+          AND newer.start_date = older.start_date
+          AND newer.meal_plan_id > older.meal_plan_id
+    )
+"""
+
+
+def upgrade():
+    # Keep only the latest plan of each (user_id, start_date) before adding the constraint
+    op.execute(f"DELETE FROM meal_plans_recipe_relations WHERE meal_plan_id IN ({DUPLICATED_MEAL_PLANS})")
+    op.execute(f"DELETE FROM meal_plans WHERE meal_plan_id IN ({DUPLICATED_MEAL_PLANS})")
+
+    with op.batch_alter_table('meal_plans', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_meal_plans_user_id_start_date', ['user_id', 'start_date'])
+
+
+def downgrade():
+    with op.batch_alter_table('meal_plans', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_meal_plans_user_id_start_date', type_='unique')
@@ -0,0 +1,31 @@
+"""Add meal_plan_id to ShoppingLists model
+
+Revision ID: 5a2f7c81e9d4
+Revises: d17a9e3c5f60
+Create Date: 2026-10-18 14:37:15.902417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a2f7c81e9d4'
+down_revision = 'd17a9e3c5f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('shopping_lists', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('meal_plan_id', sa.Integer(), nullable=True))
+        batch_op.create_unique_constraint('uq_shopping_lists_meal_plan_id', ['meal_plan_id'])
+        batch_op.create_foreign_key('fk_shopping_lists_meal_plan_id', 'meal_plans', ['meal_plan_id'],
+                                    ['meal_plan_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('shopping_lists', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_shopping_lists_meal_plan_id', type_='foreignkey')
+        batch_op.drop_constraint('uq_shopping_lists_meal_plan_id', type_='unique')
+        batch_op.drop_column('meal_plan_id')
@@ -0,0 +1,26 @@
+"""Add revision to MealPlans model
+
+Revision ID: 8e41c0d5b2a9
+Revises: 3b9d2f6a1c7e
+Create Date: 2026-10-18 11:04:52.207194
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e41c0d5b2a9'
+down_revision = '3b9d2f6a1c7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('meal_plans', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('meal_plans', schema=None) as batch_op:
+        batch_op.drop_column('revision')
@@ -0,0 +1,26 @@
+"""Add (diet, recipe_id) index to Recipe model
+
+Revision ID: d17a9e3c5f60
+Revises: 8e41c0d5b2a9
+Create Date: 2026-10-18 12:21:07.530118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd17a9e3c5f60'
+down_revision = '8e41c0d5b2a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('recipe', schema=None) as batch_op:
+        batch_op.create_index('ix_recipe_diet_recipe_id', ['diet', 'recipe_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('recipe', schema=None) as batch_op:
+        batch_op.drop_index('ix_recipe_diet_recipe_id')
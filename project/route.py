@@ -1,83 +1,235 @@
-from flask import Blueprint
-from flask import request, Response
 import json
-from openai import OpenAI
-from project.utils.IngredientManager import IngredientManager
-from project.utils.RecipeManager import RecipeManager
+
+from flask import Blueprint, request, Response, current_app, stream_with_context, url_for
+
+from project.utils.Metrics import metrics
+from project.utils.PrincipalCache import Principal
+from project.utils.RecipeManager import RecipeManager, RECIPE_PAGE_MAX_SIZE
+from project.utils.ShoppingListManager import ShoppingListManager
 from project.utils.UserManager import UserManager
+from project.utils.decorator import token_required, log_endpoint_access, pay_action_cost, query_budget, \
+    read_only, read_your_writes
+
+route_blueprint = Blueprint('route', __name__)
+
+RECIPE_CACHE_CONTROL = 'private, max-age=86400'
+MEAL_PLAN_CACHE_CONTROL = 'private, no-cache'
+
+
+def json_body(body) -> str:
+    """
+    :param body: The body of a response.
+    :return: Its JSON document, the time spent is reported in the ``serialize`` span of the request.
+    """
+    with metrics.span('serialize'):
+        return json.dumps(body)
 
 
-route_blueprint = Blueprint('route', __name__,)
+def conditional_response(etag: str, cache_control: str, build_body) -> Response:
+    """
+    :param etag: The strong ETag of the resource.
+    :param cache_control: The Cache-Control header of the response.
+    :param build_body: Called without argument to build the JSON body, only when the client copy is stale.
+    :return: A 304 response when the client sent a matching If-None-Match, a 200 response with the body otherwise.
+    """
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(json_body(build_body()), status=200, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
 
 @route_blueprint.route('/')
-def hello_world():  # put application's code here
+@query_budget(0)
+def hello_world():
     return Response(
         "Method not allowed", status=405, mimetype='text/plain'
     )
 
-def generate_recipe(recipe_name: str, diet_type: str):
-    prompt = ''
-    with open('resources/prompts/recipeGenerationJson.prompt', 'r') as file:
-        prompt = file.read()
-    prompt = prompt.replace('{recipe_name}', recipe_name).replace('{diet_type}', diet_type)
-
-    client = OpenAI()
-    completion = client.chat.completions.create(
-      model="gpt-4o",
-      response_format={"type": "json_object"},
-      messages=[
-        {"role": "system", "content": 'tu es un assistant culinaire.'},
-        {"role": "user", "content": prompt}
-      ]
-    )
-    return completion.choices[0].message.content
-
 @route_blueprint.route('/dev/recipe/generate', methods=['GET'])
+@query_budget(20)
 def handle_generate_recipe():
-    recipe_mgt = RecipeManager()
-    ingredient_mgt = IngredientManager()
-    recipes = set()
-    ideas = []
-    with open('resources/prompts/mealIdeas', 'r') as file:
-        ideas = json.loads(file.read())
+    # The ingestion pipeline is only used by this dev route, it is not imported by the workers at startup
+    from project.utils.IngestionPipeline import RecipeIngestionPipeline, default_backend, read_prompt
+
+    ideas = json.loads(read_prompt('mealIdeas'))
+    backend = current_app.config.get('COMPLETION_BACKEND') or default_backend
+    pipeline = RecipeIngestionPipeline(backend, max_workers=current_app.config['INGESTION_CONCURRENCY'])
+    return pipeline.run(ideas)
 
+@route_blueprint.route('/user/me', methods=['GET'])
+@query_budget(1)
+@read_only
+@token_required
+def handle_get_current_user(current_user: Principal):
 
-    for idea in ideas:
-        recipe_name = idea.get('name')
-        diet_type = idea.get('type')
+    userMgt = UserManager(current_app)
+    user = userMgt.get_current_user(current_user.user_id).serialize()
 
-        recipe = json.loads(generate_recipe(recipe_name, diet_type))
-        recipe_ingredients = recipe.pop('ingredients', None)
+    return Response(
+        json_body(user), status=200, mimetype='application/json'
+    )
 
-        if recipe_mgt.isExist(recipe.get('title')) == -1 :
-            recipe_id = recipe_mgt.save_recipe(recipe)
-            recipes.add((recipe.get('title'), recipe_id))
-            for ingredient in recipe_ingredients:
-                ingredient_mgt.save_ingredient(recipe_id, ingredient)
+@route_blueprint.route('/recipe/diet', methods=['GET'])
+@query_budget(2)
+@read_only
+@token_required
+def handle_get_recipes_by_diet(current_user: Principal):
+    """
+    :param current_user: The current user.
+    :return: The recipes of the ``filter`` diet.
 
-    return list(recipes)
+    Query string parameters:
 
+    * ``limit``: the size of the page, pages are chained with the ``Link: rel="next"`` header,
+    * ``after``: the last ``recipe_id`` of the previous page,
+    * ``fields``: a comma separated list of the recipe fields to return, ``recipe_id`` is always returned,
+    * ``format=ndjson``: stream every recipe after ``after`` as newline delimited JSON.
 
-@route_blueprint.route('/recipe/diet', methods=['GET'])
-def handle_get_recipes_by_diet():
+    Without any of them, the whole listing of the diet is returned.
+    """
     diet = request.args.get('filter')
-    print(diet)
     recipe_mgt = RecipeManager()
-    recipes = recipe_mgt.list_recipe_by_diet(diet)
-    return recipes
+    try:
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+        after = int(request.args['after']) if 'after' in request.args else None
+        fields = recipe_mgt.parse_recipe_fields(request.args.get('fields'))
+        if request.args.get('format') == 'ndjson':
+            recipes = recipe_mgt.iter_recipes_by_diet(diet, after, fields)
+            return Response(
+                stream_with_context(json.dumps(recipe) + '\n' for recipe in recipes),
+                status=200, mimetype='application/x-ndjson'
+            )
+        if limit is None and after is None and fields is None:
+            return recipe_mgt.list_recipe_by_diet(diet)
+
+        if limit is None:
+            limit = RECIPE_PAGE_MAX_SIZE
+        recipes = recipe_mgt.list_recipe_page(diet, limit, after, fields)
+    except ValueError as e:
+        return Response(
+            json.dumps({'error': str(e)}), status=400, mimetype='application/json'
+        )
+
+    response = Response(json_body(recipes), status=200, mimetype='application/json')
+    if len(recipes) == limit:
+        next_args = dict(request.args.to_dict(), after=recipes[-1]['recipe_id'], limit=limit)
+        response.headers['Link'] = f'<{url_for(".handle_get_recipes_by_diet", **next_args)}>; rel="next"'
+    return response
+
+@route_blueprint.route('/recipe/search', methods=['GET'])
+@query_budget(2)
+@read_only
+@token_required
+def handle_search_recipes(current_user: Principal) -> Response:
+    """
+    :param current_user: The current user.
+    :return: The recipes matching the ``q`` query string parameter, best match first.
+
+    Query string parameters:
+
+    * ``q``: the searched text, accents and case are ignored,
+    * ``diet``: the diet of the recipes, any diet when missing or ``flex``,
+    * ``allergies``: a comma separated list of allergens the recipes must not contain,
+    * ``limit``: the maximum number of recipes, 20 by default.
+    """
+    query = request.args.get('q', '').strip()
+    allergies = [allergy for allergy in request.args.get('allergies', '').split(',') if allergy]
+    try:
+        if not query:
+            raise ValueError('The q parameter is required')
+        limit = int(request.args.get('limit', 20))
+        recipes = RecipeManager().search_recipes(query, request.args.get('diet'), allergies, limit)
+    except ValueError as e:
+        return Response(
+            json.dumps({'error': str(e)}), status=400, mimetype='application/json'
+        )
+    return Response(
+        json_body(recipes), status=200, mimetype='application/json'
+    )
+
+@route_blueprint.route('/recipe/pantry', methods=['POST'])
+@query_budget(4)
+@read_only
+@token_required
+@log_endpoint_access
+def handle_find_recipes_by_pantry(current_user: Principal, args: dict) -> Response:
+    """
+    :param current_user: The current user, whose diet and allergies are respected.
+    :param args: The ``ingredients`` of the pantry as IDs or names, the maximum number of recipes ``limit``,
+                 20 by default, and the ``min_coverage`` share of the ingredients of a recipe, 0 by default.
+    :return: The recipes whose ingredients are the most covered by the pantry, best coverage first.
+    """
+    ingredients = args.get('ingredients')
+    try:
+        if not isinstance(ingredients, list) or not ingredients:
+            raise ValueError('The ingredients must be a non empty list')
+        recipes = RecipeManager().find_recipes_by_pantry(current_user, ingredients, int(args.get('limit', 20)),
+                                                         float(args.get('min_coverage', 0)))
+    except (TypeError, ValueError) as e:
+        return Response(
+            json.dumps({'error': str(e)}), status=400, mimetype='application/json'
+        )
+    return Response(
+        json_body(recipes), status=200, mimetype='application/json'
+    )
 
     # list_recipe_by_diet
-@route_blueprint.route('/recipe/id/<recipe_id>', methods=['GET'])
-def handle_get_recipe(recipe_id: int):
+@route_blueprint.route('/recipe/id/<int:recipe_id>', methods=['GET'])
+@query_budget(3)
+@read_only
+@token_required
+@log_endpoint_access
+def handle_get_recipe(current_user: Principal, args: dict) -> Response:
+    """
+    Handle the GET request for retrieving a recipe.
+
+    :param current_user: The current user making the request.
+    :param args: The arguments passed in the request URL.
+    :return: The response containing the retrieved recipe in JSON format.
+    """
     recipe_mgt = RecipeManager()
-    recipe = recipe_mgt.get_recipe_by_id(recipe_id)
-    print(recipe)
-    return recipe
+    etag = recipe_mgt.get_recipe_etag(args['recipe_id'])
+    if etag is None:
+        return Response(
+            "Recipe not found", status=404, mimetype='application/json'
+        )
+    return conditional_response(etag, RECIPE_CACHE_CONTROL, lambda: recipe_mgt.get_recipe_by_id(args['recipe_id']))
+
+@route_blueprint.route('/user/login', methods=['POST'])
+@query_budget(1)
+def handle_user_login() -> Response:
+    """
+    Handles user login process.
+
+    :return: Returns a Response object.
+    :rtype: flask.Response
+    """
+    user_data = request.get_json()
+    user_mgt = UserManager(current_app)
+    is_logged, user = user_mgt.login(user_data)
+    if is_logged:
+        return Response(
+            json_body(user), status=200, mimetype='application/json'
+        )
+    else:
+        return Response(
+            "Bad credentials", status=401, mimetype='application/json'
+        )
 
 @route_blueprint.route('/user', methods=['POST'])
-def handle_add_user():
+@query_budget(1)
+def handle_add_user() -> Response:
+    """
+    Handle Add User
+
+    This method is used to handle the POST request for adding a new user.
+
+    :return: The response object containing relevant information.
+    """
     user_data = request.get_json()
-    user_mgt = UserManager()
+    user_mgt = UserManager(current_app)
     user = user_mgt.add_user(user_data)
     print(user)
     if user == 409:
@@ -86,10 +238,200 @@ def handle_add_user():
         )
     else:
         return Response(
-            json.dumps(user), status=201,mimetype='application/json'
+            json_body(user), status=201,mimetype='application/json'
+        )
+
+@route_blueprint.route('/meal/generate', methods=['POST'])
+@query_budget(9)
+@read_your_writes
+@token_required
+@log_endpoint_access
+@pay_action_cost(cost=0)
+def handle_generate_meal(current_user: Principal, args: dict) -> Response:
+    """
+    :param current_user: The current user, of type Principal, who is requesting to generate a meal.
+    :param args: Additional arguments for the endpoint.
+    :return: The generated meal as a Response object.
+
+    This method is the endpoint for generating a meal. It requires the current user object and any additional arguments passed to the endpoint. It returns the generated meal as a Response
+    * object.
+
+    Example usage:
+
+        current_user = Principal(...)
+        args = {...}
+        response = handle_generate_meal(current_user, args)
+
+    """
+    start_date = args['start_date']
+    generated_meal = []
+    recipe_mgt = RecipeManager()
+    try:
+        recipes = recipe_mgt.generate_meal(current_user, start_date, args.get('mode', 'random'))
+    except ValueError as e:
+        return Response(
+            json.dumps({'error': str(e)}), status=400, mimetype='application/json'
+        )
+
+    for recipe in recipes:
+        generated_meal.append(recipe)
+    return Response(
+        json_body(generated_meal), status=200, mimetype='application/json'
+    )
+
+@route_blueprint.route('/meal/plan', methods=['GET', 'POST'])
+@query_budget(5)
+@read_only
+@token_required
+@log_endpoint_access
+def handle_get_current_meal_plan(current_user: Principal, args: dict) -> Response:
+    """
+    :param current_user: The current user.
+    :param args: The ``start`` date of the week, from the query string or the JSON body. The current week when missing.
+    :return: The meal plan of the week, with an ETag bumped by every generation or swap of the plan.
+    """
+    recipe_mgt = RecipeManager()
+    etag = recipe_mgt.get_meal_plan_etag(current_user, args)
+    if etag is None:
+        return Response(
+            json_body([]), status=200, mimetype='application/json'
+        )
+    return conditional_response(etag, MEAL_PLAN_CACHE_CONTROL,
+                                lambda: recipe_mgt.get_current_meal_plan(current_user, args) or [])
+@route_blueprint.route('/meal/swap', methods=['POST'])
+@query_budget(14)
+@read_your_writes
+@token_required
+@log_endpoint_access
+@pay_action_cost(cost=0)
+def handle_swap_recipe_in_meal(current_user: Principal, args: dict) -> Response:
+    recipe_id_to_swap = args['recipe_id']
+    date_to_act = args['date']
+
+    recipe_mgt = RecipeManager()
+    new_meal_plan = recipe_mgt.swap_recipe(recipe_id_to_swap, date_to_act, current_user)
+
+    if new_meal_plan:
+        return Response(
+            json_body(new_meal_plan), status=200, mimetype='application/json'
+        )
+    else:
+        return Response(
+            "Recipe not found", status=404, mimetype='application/json'
+        )
+
+def week_start_date(args: dict):
+    """
+    :param args: The endpoint arguments, with an optional ``start`` date of the week.
+    :return: The monday of the ``start`` week, of the current week when missing.
+    :raise ValueError: If the date is not a ``YYYY-MM-DD`` date.
+    """
+    recipe_mgt = RecipeManager()
+    if not args.get('start'):
+        return recipe_mgt.current_week_date
+    return recipe_mgt._start_of_week(args['start']).date()
+
+@route_blueprint.route('/shopping/list', methods=['GET'])
+@query_budget(5)
+@read_only
+@token_required
+@log_endpoint_access
+def handle_get_shopping_list(current_user: Principal, args: dict) -> Response:
+    """
+    :param current_user: The current user.
+    :param args: The ``start`` date of the week, the current week when missing.
+    :return: The shopping list of the meal plan of the week, aggregated by ingredient and unit.
+    """
+    try:
+        start_date = week_start_date(args)
+    except ValueError as e:
+        return Response(
+            json.dumps({'error': str(e)}), status=400, mimetype='application/json'
         )
 
-@route_blueprint.errorhandler(404)
-def page_not_found(e):
-    print('404')
-    return f'{request.path} - Not found'
+    shopping_list = ShoppingListManager().get_shopping_list(current_user.user_id, start_date)
+    if shopping_list is None:
+        return Response(
+            "Meal plan not found", status=404, mimetype='application/json'
+        )
+    return Response(
+        json_body(shopping_list), status=200, mimetype='application/json'
+    )
+
+@route_blueprint.route('/shopping/list', methods=['DELETE'])
+@query_budget(5)
+@read_your_writes
+@token_required
+@log_endpoint_access
+def handle_flush_shopping_list(current_user: Principal, args: dict) -> Response:
+    """
+    :param current_user: The current user.
+    :param args: The ``start`` date of the week, the current week when missing.
+    :return: An empty response once the items of the shopping list are removed.
+    """
+    try:
+        start_date = week_start_date(args)
+    except ValueError as e:
+        return Response(
+            json.dumps({'error': str(e)}), status=400, mimetype='application/json'
+        )
+
+    if not ShoppingListManager().flush(current_user.user_id, start_date):
+        return Response(
+            "Shopping list not found", status=404, mimetype='application/json'
+        )
+    return Response(status=204)
+
+@route_blueprint.route('/shopping/list/item/<int:item_id>', methods=['PATCH'])
+@query_budget(5)
+@read_your_writes
+@token_required
+@log_endpoint_access
+def handle_update_shopping_list_item(current_user: Principal, args: dict) -> Response:
+    """
+    :param current_user: The current user.
+    :param args: The ``item_id`` of the item and its new ``quantity`` and/or ``unit``.
+    :return: The updated item.
+    """
+    values = {key: value for key, value in args.items() if key != 'item_id'}
+    try:
+        item = ShoppingListManager().update_item(current_user.user_id, args['item_id'], values)
+    except ValueError as e:
+        return Response(
+            json.dumps({'error': str(e)}), status=400, mimetype='application/json'
+        )
+
+    if item is None:
+        return Response(
+            "Shopping list item not found", status=404, mimetype='application/json'
+        )
+    return Response(
+        json_body(item), status=200, mimetype='application/json'
+    )
+
+@route_blueprint.route('/shopping/list/item/<int:item_id>', methods=['DELETE'])
+@query_budget(4)
+@read_your_writes
+@token_required
+@log_endpoint_access
+def handle_delete_shopping_list_item(current_user: Principal, args: dict) -> Response:
+    """
+    :param current_user: The current user.
+    :param args: The ``item_id`` of the item.
+    :return: An empty response once the item is removed.
+    """
+    if not ShoppingListManager().delete_item(current_user.user_id, args['item_id']):
+        return Response(
+            "Shopping list item not found", status=404, mimetype='application/json'
+        )
+    return Response(status=204)
+
+@route_blueprint.app_errorhandler(404)
+def page_not_found(e:Exception) -> Response:
+    """
+    :param e: The exception object that caused the 404 error.
+    :return: A Response object with the error message and status code 404.
+    """
+    return Response(
+        f'{request.path} - Not found', status=404
+    )
@@ -0,0 +1,67 @@
+import threading
+
+from project.database.database import db
+from project.database.models import RecipeIngredient, Ingredient
+
+
+class AllergenIndex:
+    """
+    Process-wide ``recipe_id -> frozenset(allergens)`` index.
+
+    Allergens of the recipes that are not indexed yet are resolved with a single grouped
+    ``RecipeIngredient JOIN Ingredient`` query, whatever the number of recipes asked.
+    Recipes without any allergen are indexed too (empty frozenset), so they are never queried twice.
+
+    The index must be invalidated when new ingredient relations are added to a recipe,
+    see ``IngredientManager.save_ingredient``.
+    """
+    def __init__(self):
+        self._allergens: dict[int, frozenset] = {}
+        self._lock = threading.Lock()
+
+    def get(self, recipe_id: int) -> frozenset:
+        return self.get_many([recipe_id])[recipe_id]
+
+    def get_many(self, recipe_ids, whole_catalog: bool = False) -> dict[int, frozenset]:
+        """
+        :param recipe_ids: The IDs of the recipes to resolve.
+        :param whole_catalog: True when ``recipe_ids`` is the whole catalog, the missing recipes are then
+                              loaded without filtering on their IDs instead of with a huge ``IN`` clause.
+        :return: A dict mapping each recipe ID to the frozenset of its allergens.
+        """
+        recipe_ids = set(recipe_ids)
+        missing = recipe_ids.difference(self._allergens)
+        if missing:
+            self._load(missing, filtered=not whole_catalog)
+
+        return {recipe_id: self._allergens.get(recipe_id, frozenset()) for recipe_id in recipe_ids}
+
+    def _load(self, recipe_ids: set, filtered: bool = True) -> None:
+        query = (db.session.query(RecipeIngredient.recipe_id, Ingredient.allergen)
+                 .join(Ingredient, Ingredient.ingredient_id == RecipeIngredient.ingredient_id)
+                 .filter(Ingredient.allergen.isnot(None)))
+        if filtered:
+            query = query.filter(RecipeIngredient.recipe_id.in_(recipe_ids))
+        rows = query.group_by(RecipeIngredient.recipe_id, Ingredient.allergen).all()
+
+        loaded = {recipe_id: set() for recipe_id in recipe_ids}
+        for recipe_id, allergen in rows:
+            if allergen and recipe_id in loaded:
+                loaded[recipe_id].add(allergen)
+
+        with self._lock:
+            for recipe_id, allergens in loaded.items():
+                self._allergens[recipe_id] = frozenset(allergens)
+
+    def invalidate(self, recipe_id: int = None) -> None:
+        """
+        :param recipe_id: The ID of the recipe to forget, the whole index is cleared when None.
+        """
+        with self._lock:
+            if recipe_id is None:
+                self._allergens.clear()
+            else:
+                self._allergens.pop(recipe_id, None)
+
+
+allergen_index = AllergenIndex()
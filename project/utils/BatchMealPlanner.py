@@ -0,0 +1,146 @@
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from itertools import groupby
+
+from sqlalchemy import insert, delete
+
+from project.database.database import db, upsert
+from project.database.models import User, MealPlans, MealPlanRecipe
+from project.utils.RecipeManager import RecipeManager, pick_week, meal_plan_recipe_rows
+from project.utils.ShoppingListManager import ShoppingListManager
+
+
+def build_meal_plans(recipe_ids: tuple, user_ids: list, seed: int | None) -> list:
+    """
+    Pick the recipes of a week for users sharing the same eligible recipes, runs in the worker processes.
+
+    :param recipe_ids: The IDs of the recipes eligible for the users.
+    :param user_ids: The IDs of the users.
+    :param seed: The seed of the draws, each user gets its own random generator. Random draws when None.
+    :return: A list of ``(user_id, recipe_ids)`` tuples.
+    """
+    recipe_ids = list(recipe_ids)
+    plans = []
+    for user_id in user_ids:
+        rng = random.Random(f'{seed}:{user_id}') if seed is not None else random
+        plans.append((user_id, pick_week(recipe_ids, rng)))
+    return plans
+
+
+class BatchMealPlanner:
+    """
+    Generate the meal plans of a week for the whole user base.
+
+    Users are processed by batches of ``batch_size`` in ``user_id`` order. In each batch, users are grouped by
+    ``(dietaryPreference, allergies)`` profile, the eligible recipes are computed once per profile, and plan
+    construction is fanned out across ``workers`` processes. Each batch is saved with a few bulk statements
+    in its own transaction, so an interrupted run can be resumed from the last reported ``user_id``.
+    """
+    def __init__(self, start_date: date, workers: int = 1, batch_size: int = 1000, seed: int = None):
+        self.start_date = start_date
+        self.end_date = start_date + timedelta(days=6)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.seed = seed
+        self.recipe_mgt = RecipeManager()
+        self._pools = {}
+
+    def _profile(self, dietary_preference: str, allergies: list) -> tuple:
+        return dietary_preference, tuple(sorted({allergy.lower() for allergy in allergies or []}))
+
+    def _eligible_recipe_ids(self, profile: tuple) -> tuple:
+        if profile not in self._pools:
+            self._pools[profile] = tuple(self.recipe_mgt._eligible_recipe_ids(*profile))
+        return self._pools[profile]
+
+    def _user_batches(self, from_user_id: int | None, to_user_id: int | None):
+        # Keyset batches, each one is read in its own transaction since every batch is committed
+        last_user_id = None
+        while True:
+            query = db.session.query(User.user_id, User.dietaryPreference, User.allergies)
+            if last_user_id is not None:
+                query = query.filter(User.user_id > last_user_id)
+            elif from_user_id is not None:
+                query = query.filter(User.user_id >= from_user_id)
+            if to_user_id is not None:
+                query = query.filter(User.user_id <= to_user_id)
+
+            batch = query.order_by(User.user_id).limit(self.batch_size).all()
+            if not batch:
+                return
+            yield batch
+            last_user_id = batch[-1].user_id
+
+    def _plan_batch(self, users: list, pool: ProcessPoolExecutor | None) -> list:
+        tasks = []
+        users = sorted(users, key=lambda user: self._profile(user.dietaryPreference, user.allergies))
+        for profile, profile_users in groupby(users, key=lambda user: self._profile(user.dietaryPreference,
+                                                                                     user.allergies)):
+            recipe_ids = self._eligible_recipe_ids(profile)
+            if recipe_ids:
+                tasks.append((recipe_ids, [user.user_id for user in profile_users], self.seed))
+
+        if pool is None:
+            return [plan for task in tasks for plan in build_meal_plans(*task)]
+
+        futures = [pool.submit(build_meal_plans, *task) for task in tasks]
+        return [plan for future in futures for plan in future.result()]
+
+    def _save_batch(self, plans: list) -> None:
+        try:
+            statement = upsert(MealPlans).values([
+                {'user_id': user_id, 'start_date': self.start_date, 'end_date': self.end_date}
+                for user_id, _ in plans
+            ])
+            statement = statement.on_conflict_do_update(index_elements=['user_id', 'start_date'],
+                                                        set_={'end_date': statement.excluded.end_date,
+                                                              'revision': MealPlans.revision + 1})
+            meal_plan_ids = dict(
+                (user_id, meal_plan_id) for meal_plan_id, user_id in
+                db.session.execute(statement.returning(MealPlans.meal_plan_id, MealPlans.user_id)).all()
+            )
+
+            db.session.execute(delete(MealPlanRecipe)
+                               .where(MealPlanRecipe.meal_plan_id.in_(list(meal_plan_ids.values()))))
+            ShoppingListManager().discard(list(meal_plan_ids.values()))
+            db.session.execute(insert(MealPlanRecipe), [
+                row for user_id, recipe_ids in plans
+                for row in meal_plan_recipe_rows(meal_plan_ids[user_id], self.start_date, recipe_ids)
+            ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def run(self, from_user_id: int = None, to_user_id: int = None, progress=None) -> dict:
+        """
+        :param from_user_id: The first user ID to process, from the first user when None.
+        :param to_user_id: The last user ID to process, up to the last user when None.
+        :param progress: Called with the stats after each saved batch.
+        :return: The stats of the run: users processed, plans saved, users skipped for lack of eligible
+                 recipes, last processed user ID, elapsed seconds and throughput in users per second.
+        """
+        stats = {'users': 0, 'plans': 0, 'skipped': 0, 'last_user_id': None, 'seconds': 0.0,
+                 'users_per_second': 0.0}
+        start = time.perf_counter()
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            for users in self._user_batches(from_user_id, to_user_id):
+                plans = self._plan_batch(users, pool)
+                if plans:
+                    self._save_batch(plans)
+
+                stats['users'] += len(users)
+                stats['plans'] += len(plans)
+                stats['skipped'] += len(users) - len(plans)
+                stats['last_user_id'] = users[-1].user_id
+                stats['seconds'] = time.perf_counter() - start
+                stats['users_per_second'] = stats['users'] / stats['seconds']
+                if progress is not None:
+                    progress(dict(stats))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return stats
@@ -0,0 +1,35 @@
+import random
+
+
+class CandidatePool:
+    """
+    The recipes eligible for a ``(diet, allergies)`` profile, as an immutable tuple of IDs.
+
+    ``sample`` draws a recipe out of a small excluded set, such as the recipes already in the week, in
+    constant expected time: random draws are rejected while they hit the excluded set, and only after
+    ``MAX_DRAWS`` rejections is the pool filtered.
+    """
+    MAX_DRAWS = 16
+
+    def __init__(self, recipe_ids):
+        self.recipe_ids = tuple(recipe_ids)
+
+    def __len__(self):
+        return len(self.recipe_ids)
+
+    def sample(self, exclude=frozenset(), rng=random) -> int | None:
+        """
+        :param exclude: The IDs of the recipes that must not be drawn.
+        :param rng: The random generator.
+        :return: The ID of a recipe of the pool out of ``exclude``, None if there is none.
+        """
+        if not self.recipe_ids:
+            return None
+
+        for _ in range(self.MAX_DRAWS):
+            recipe_id = self.recipe_ids[rng.randrange(len(self.recipe_ids))]
+            if recipe_id not in exclude:
+                return recipe_id
+
+        remaining = [recipe_id for recipe_id in self.recipe_ids if recipe_id not in exclude]
+        return rng.choice(remaining) if remaining else None
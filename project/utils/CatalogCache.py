@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+
+
+class CatalogCache:
+    """
+    In-process, read-through cache of the recipe catalog.
+
+    Entries are serialized recipes, recipe details with their ingredients, diet listings and the
+    diet/allergen facets of the whole catalog. They are stored with the catalog version they were
+    loaded at: ``bump`` is called by every catalog write (``RecipeManager.save_recipe``,
+    ``IngredientManager.save_ingredient``) and makes every stored entry stale at once.
+
+    The cache is bounded to ``maxsize`` entries, the least recently used ones are evicted first.
+    It only lives in the current process, each worker has its own copy.
+    """
+    DEFAULT_MAXSIZE = 4096
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        self.maxsize = int(app.config.get('CATALOG_CACHE_SIZE', self.maxsize))
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != self.version:
+            self.misses += 1
+            return False, None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[1]
+
+    def _store(self, key, version: int, value) -> None:
+        if version != self.version:
+            return
+
+        self._entries[key] = (version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key, loader):
+        """
+        :param key: The key of the entry, a hashable tuple such as ``('recipe', 12)``.
+        :param loader: Called without argument to load the value on a miss.
+        :return: The cached value, loaded and stored first on a miss.
+        """
+        with self._lock:
+            found, value = self._lookup(key)
+            version = self.version
+        if found:
+            return value
+
+        value = loader()
+        with self._lock:
+            self._store(key, version, value)
+        return value
+
+    def get_many(self, keys, loader) -> dict:
+        """
+        :param keys: The keys of the entries.
+        :param loader: Called with the list of missing keys, returns a dict of the loaded values by key.
+        :return: A dict of the values by key, keys unknown to the loader are left out.
+        """
+        values = {}
+        missing = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                found, value = self._lookup(key)
+                if found:
+                    values[key] = value
+                else:
+                    missing.append(key)
+            version = self.version
+
+        if missing:
+            loaded = loader(missing)
+            with self._lock:
+                for key, value in loaded.items():
+                    self._store(key, version, value)
+            values.update(loaded)
+
+        return values
+
+    def bump(self) -> int:
+        """
+        Invalidate every entry, to be called after a write to the catalog.
+
+        :return: The new catalog version.
+        """
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            return self.version
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': self.version,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,205 @@
+import contextvars
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from importlib import resources
+
+from project.utils.IngredientManager import IngredientManager
+from project.utils.Metrics import metrics
+from project.utils.RecipeManager import RecipeManager
+
+SYSTEM_PROMPT = 'tu es un assistant culinaire.'
+RECIPE_PROMPT_FIELDS = ('recipe_name', 'diet_type')
+
+
+class PromptTemplate:
+    """
+    A prompt whose ``{field}`` placeholders are located once: rendering joins the literal parts with the
+    values, in one pass. Only the given fields are placeholders, the braces of the JSON examples are kept.
+    """
+    __slots__ = ('literals', 'fields')
+
+    def __init__(self, text: str, fields: tuple):
+        pattern = re.compile('{(' + '|'.join(map(re.escape, fields)) + ')}')
+        parts = pattern.split(text)
+        self.literals = parts[0::2]
+        self.fields = parts[1::2]
+
+    def render(self, **values) -> str:
+        """
+        :param values: The value of each field.
+        :return: The prompt.
+        """
+        parts = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            parts.append(values[field])
+            parts.append(literal)
+        return ''.join(parts)
+
+
+@lru_cache(maxsize=None)
+def read_prompt(name: str) -> str:
+    """
+    :param name: The name of a file of ``project/resources/prompts``.
+    :return: Its content, read once per process from the package resources, whatever the working directory.
+    """
+    return resources.files('project').joinpath('resources', 'prompts', name).read_text(encoding='utf-8')
+
+
+@lru_cache(maxsize=None)
+def load_prompt(name: str, fields: tuple = RECIPE_PROMPT_FIELDS) -> PromptTemplate:
+    """
+    :param name: The name of a file of ``project/resources/prompts``.
+    :param fields: The placeholders of the prompt.
+    :return: The compiled template of the prompt, shared by every pipeline.
+    """
+    return PromptTemplate(read_prompt(name), fields)
+
+
+class CompletionBackend(ABC):
+    """
+    Chat completion backend used by the ingestion pipeline, must be safe to call from several threads.
+    """
+    @abstractmethod
+    def complete(self, prompt: str) -> str:
+        """
+        :param prompt: The user prompt.
+        :return: The content of the completion, a recipe JSON document.
+        """
+
+
+class OpenAICompletionBackend(CompletionBackend):
+    """
+    OpenAI chat completions through one client, whose HTTP connection pool is shared by every completion.
+    """
+    def __init__(self, model: str = 'gpt-4o', max_connections: int = 32):
+        self.model = model
+        self.max_connections = max_connections
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                import httpx
+                from openai import OpenAI
+
+                limits = httpx.Limits(max_connections=self.max_connections,
+                                      max_keepalive_connections=self.max_connections)
+                self._client = OpenAI(http_client=httpx.Client(limits=limits))
+            return self._client
+
+    def complete(self, prompt: str) -> str:
+        completion = self.client.chat.completions.create(
+            model=self.model,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
+        )
+        return completion.choices[0].message.content
+
+
+class FakeCompletionBackend(CompletionBackend):
+    """
+    Local stand-in model for tests and benchmarks: answers a deterministic recipe after ``latency`` seconds.
+    """
+    def __init__(self, latency: float = 0.0, ingredient_count: int = 5):
+        self.latency = latency
+        self.ingredient_count = ingredient_count
+
+    def complete(self, prompt: str) -> str:
+        time.sleep(self.latency)
+        digest = hashlib.sha1(prompt.encode()).hexdigest()[:10]
+        return json.dumps({
+            "title": f"Recette {digest}",
+            "description": "Recette générée localement.",
+            "prepTime": 10,
+            "cookTime": 20,
+            "servings": 2,
+            "calories": 300 + int(digest[:2], 16),
+            "protein": 10 + int(digest[2], 16),
+            "carbohydrates": 30 + int(digest[3], 16),
+            "fat": 10 + int(digest[4], 16),
+            "ingredients": [
+                {"name": f"Ingrédient {digest[idx]}", "quantity": idx + 1, "unit": "g", "category": "Légume"}
+                for idx in range(self.ingredient_count)
+            ],
+            "instructions": ["Préparer les ingrédients.", "Cuire."],
+            "diet": "Végétarien"
+        })
+
+
+class RecipeIngestionPipeline:
+    """
+    Generate recipes from meal ideas with up to ``max_workers`` completions in flight.
+
+    Completions run in a thread pool, parsed recipes are handed to a single writer stage running in the
+    calling thread, which owns the database session.
+    """
+    def __init__(self, backend: CompletionBackend, max_workers: int = 8,
+                 prompt_name: str = 'recipeGenerationJson.prompt'):
+        self.backend = backend
+        self.max_workers = max_workers
+        self.prompt = load_prompt(prompt_name)
+        self.errors = 0
+
+    def build_prompt(self, idea: dict) -> str:
+        return self.prompt.render(recipe_name=idea.get('name'), diet_type=idea.get('type'))
+
+    def _generate(self, idea: dict) -> dict:
+        with metrics.span('llm'):
+            content = self.backend.complete(self.build_prompt(idea))
+        return json.loads(content)
+
+    def run(self, ideas: list, writer=None) -> list:
+        """
+        :param ideas: The meal ideas, dicts with the ``name`` and ``type`` of the recipe to generate.
+        :param writer: Called with each parsed recipe, returns a result or None. Saves to the database by default.
+        :return: The results of the writer which are not None.
+        """
+        writer = writer or save_generated_recipe
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            # The workers run in a copy of the caller context, to time the completions of the current request
+            futures = [pool.submit(contextvars.copy_context().run, self._generate, idea) for idea in ideas]
+            for future in as_completed(futures):
+                try:
+                    recipe = future.result()
+                except Exception as e:
+                    self.errors += 1
+                    logging.exception(e)
+                    continue
+
+                result = writer(recipe)
+                if result is not None:
+                    results.append(result)
+        return results
+
+
+def save_generated_recipe(recipe: dict) -> tuple | None:
+    """
+    :param recipe: A recipe generated by the completion backend.
+    :return: The title and the ID of the recipe, None if a recipe with the same title already exists.
+    """
+    recipe_mgt = RecipeManager()
+    ingredient_mgt = IngredientManager()
+    recipe_ingredients = recipe.pop('ingredients', None) or []
+
+    if recipe_mgt.isExist(recipe.get('title')) != -1:
+        return None
+
+    recipe_id = recipe_mgt.save_recipe(recipe)
+    ingredient_mgt.save_ingredients(recipe_id, recipe_ingredients)
+    return recipe.get('title'), recipe_id
+
+
+default_backend = OpenAICompletionBackend()
@@ -0,0 +1,185 @@
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+from project.database.database import db
+from project.database.models import Ingredient
+
+STOP_WORDS = frozenset(('de', 'du', 'des', 'd', 'la', 'le', 'les', 'l', 'a', 'au', 'aux', 'en', 'et'))
+# Words changing what the ingredient is, kept in the keys as written and compared word for word by the fuzzy match
+QUALIFIER_WORDS = frozenset(('sans', 'avec', 'non', 'pas', 'peu', 'demi', 'extra', 'allege', 'light', 'zero'))
+DEFAULT_MATCH_THRESHOLD = 0.8
+
+
+def singularize(word: str) -> str:
+    """
+    :param word: A lowercase, accent free French word.
+    :return: Its singular form for the regular plurals, such as ``tomates`` or ``poireaux``. Qualifier words,
+             such as ``sans``, are left as is.
+    """
+    if word in QUALIFIER_WORDS:
+        return word
+    if len(word) > 3 and word[-1] in 'sx':
+        return word[:-1]
+    return word
+
+
+def fold_words(text: str) -> list:
+    """
+    :param text: A French text.
+    :return: Its words, lowercase and without accents.
+    """
+    folded = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode().lower()
+    return re.findall(r'[a-z0-9]+', folded)
+
+
+def normalize_ingredient_name(name: str) -> str:
+    """
+    :param name: The name of an ingredient, as written by the recipe generator.
+    :return: The key of the name: case and accent folded, stop words removed and words singularized.
+             ``Tomates cerises`` and ``tomate cerise`` share the key ``tomate cerise``.
+    """
+    words = fold_words(name)
+    return ' '.join(singularize(word) for word in words if word not in STOP_WORDS)
+
+
+def trigrams(key: str) -> Counter:
+    padded = f'  {key} '
+    return Counter(padded[idx:idx + 3] for idx in range(len(padded) - 2))
+
+
+def similarity(left: Counter, right: Counter) -> float:
+    """
+    :return: The Dice coefficient of two trigram multisets, 1.0 for identical keys.
+    """
+    total = sum(left.values()) + sum(right.values())
+    return 2 * sum((left & right).values()) / total if total else 0.0
+
+
+class IngredientIndex:
+    """
+    Process-wide index of the ``ingredient`` table, mapping ingredient names to their ID.
+
+    Names are matched exactly first, then on their normalized key (see ``normalize_ingredient_name``), then
+    with a character trigram similarity against the known keys, above ``threshold``. Keys containing
+    different numbers or different qualifier words (see ``QUALIFIER_WORDS``) never match fuzzily, so that
+    ``farine de gluten`` is not taken for ``farine sans gluten``. When several ingredients share a key, the oldest one wins.
+
+    The index is warmed with a single query the first time it is used, then kept up to date by
+    ``IngredientManager`` with the ingredients it inserts.
+    """
+    def __init__(self, threshold: float = DEFAULT_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self._ids: dict[str, int] | None = None
+        self._keys: dict[str, int] = {}
+        self._key_trigrams: dict[str, Counter] = {}
+        self._postings: dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        self.threshold = float(app.config.get('INGREDIENT_MATCH_THRESHOLD', self.threshold))
+
+    def _add(self, name: str, ingredient_id: int) -> None:
+        self._ids[name] = ingredient_id
+        key = normalize_ingredient_name(name)
+        if not key or key in self._keys:
+            return
+
+        self._keys[key] = ingredient_id
+        self._key_trigrams[key] = trigrams(key)
+        for trigram in self._key_trigrams[key]:
+            self._postings.setdefault(trigram, set()).add(key)
+
+    def load(self, rows) -> None:
+        """
+        :param rows: The ``(name, ingredient_id)`` rows to index, oldest ingredients first.
+        """
+        with self._lock:
+            self._ids = {}
+            self._keys, self._key_trigrams, self._postings = {}, {}, {}
+            for name, ingredient_id in rows:
+                self._add(name, ingredient_id)
+
+    def _warm(self) -> dict:
+        ids = self._ids
+        if ids is None:
+            rows = db.session.query(Ingredient.name, Ingredient.ingredient_id).order_by(Ingredient.ingredient_id).all()
+            if self._ids is None:
+                self.load(rows)
+            ids = self._ids
+        return ids
+
+    def get(self, name: str) -> int | None:
+        return self._warm().get(name)
+
+    def get_many(self, names) -> dict[str, int]:
+        """
+        :param names: The names of the ingredients to resolve.
+        :return: A dict mapping the known names to their ingredient ID, unknown names are left out.
+        """
+        ids = self._warm()
+        return {name: ids[name] for name in names if name in ids}
+
+    def _fuzzy_match(self, key: str) -> int | None:
+        key_trigrams = trigrams(key)
+        numbers = set(re.findall(r'\d+', key))
+        qualifiers = QUALIFIER_WORDS.intersection(key.split())
+        shared = Counter()
+        for trigram in key_trigrams:
+            shared.update(self._postings.get(trigram, ()))
+
+        best_key, best_score = None, self.threshold
+        # Only the keys sharing enough trigrams can reach the threshold
+        for candidate, _ in shared.most_common(20):
+            if set(re.findall(r'\d+', candidate)) != numbers:
+                continue
+            if QUALIFIER_WORDS.intersection(candidate.split()) != qualifiers:
+                continue
+            score = similarity(key_trigrams, self._key_trigrams[candidate])
+            if score >= best_score:
+                best_key, best_score = candidate, score
+        return self._keys[best_key] if best_key is not None else None
+
+    def match(self, name: str, fuzzy: bool = True) -> int | None:
+        """
+        :param name: The name of an ingredient.
+        :param fuzzy: Also match the names which are similar to a known one, not only the equivalent ones.
+        :return: The ID of the same or of a similar ingredient, None if there is none.
+        """
+        ids = self._warm()
+        if name in ids:
+            return ids[name]
+
+        key = normalize_ingredient_name(name)
+        if not key:
+            return None
+        if key in self._keys:
+            return self._keys[key]
+        return self._fuzzy_match(key) if fuzzy else None
+
+    def match_many(self, names, fuzzy: bool = True) -> dict[str, int]:
+        """
+        :param names: The names of the ingredients to resolve.
+        :param fuzzy: Also match the names which are similar to a known one, see ``match``.
+        :return: A dict mapping the names matching an ingredient to its ID, unmatched names are left out.
+        """
+        matches = {}
+        for name in names:
+            ingredient_id = self.match(name, fuzzy=fuzzy)
+            if ingredient_id is not None:
+                matches[name] = ingredient_id
+        return matches
+
+    def update(self, ingredient_ids: dict[str, int]) -> None:
+        with self._lock:
+            if self._ids is not None:
+                for name, ingredient_id in ingredient_ids.items():
+                    self._add(name, ingredient_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids = None
+
+
+ingredient_index = IngredientIndex()
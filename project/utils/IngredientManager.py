@@ -1,38 +1,201 @@
-from project.database.database import db
-from project.database.models import Ingredient, RecipeIngredient
+import logging
+
+from sqlalchemy import insert, update, delete, case
+
+from project.database.database import db, upsert
+from project.database.models import Ingredient, RecipeIngredient, ShoppingListItem
+from project.utils.AllergenIndex import allergen_index
+from project.utils.CatalogCache import catalog_cache
+from project.utils.IngredientIndex import IngredientIndex, ingredient_index, normalize_ingredient_name
+from project.utils.SearchIndex import search_index
+
+
+def ingredient_field(ingredient: dict, field: str):
+    """
+    :param ingredient: An ingredient of a generated recipe, whose keys may be capitalized (``Name``, ``Quantity``).
+    :param field: The lowercase name of the field.
+    :return: The value of the field, None when missing.
+    """
+    value = ingredient.get(field)
+    return value if value is not None else ingredient.get(field.capitalize())
+
 
 class IngredientManager:
     def __init__(self):
         pass
 
     def isExist(self, ingredient: str) -> float:
-        try:
-            ingredient = Ingredient.query.filter_by(name=ingredient).first()
-            return ingredient.ingredient_id
-        except:
-            return -1
+        ingredient_id = ingredient_index.match(ingredient, fuzzy=False)
+        return ingredient_id if ingredient_id is not None else -1
 
     def save_ingredient(self, recipe_id: int, ingredient: dict) -> bool:
-        ingredient['ingredient_id'] = self.isExist(ingredient.get('name'))
-        if ingredient['ingredient_id'] == -1:
-            new_ingredient = Ingredient(name=ingredient.get('name'), category=ingredient.get('category'))
-            db.session.add(new_ingredient)
+        return self.save_ingredients(recipe_id, [ingredient])
+
+    def save_ingredients(self, recipe_id: int, ingredients: list) -> bool:
+        """
+        Save the full ingredient list of a recipe in a single transaction.
+
+        Names are resolved through the in-memory ingredient index, which maps the case, accent and plural variants
+        of a known name to the existing ingredient. Similar names are not merged here, but by the reviewed
+        ``flask ingredient dedupe --fuzzy``. Unknown ingredients are inserted with one conflict tolerant bulk upsert on their
+        unique name, one per normalized name, then every relation is inserted in one batch.
+
+        :param recipe_id: The ID of the recipe.
+        :param ingredients: The ingredients of the recipe, dicts with their name, category, quantity and unit.
+        :return: True if every ingredient has been related to the recipe, False otherwise.
+        """
+        names = {ingredient_field(ingredient, 'name'): ingredient for ingredient in ingredients
+                 if ingredient_field(ingredient, 'name')}
+        ingredient_ids = ingredient_index.match_many(names, fuzzy=False)
+
+        # One new ingredient per normalized name, the other variants of the recipe are mapped to it
+        missing = {}
+        for name in names:
+            if name not in ingredient_ids:
+                missing.setdefault(normalize_ingredient_name(name) or name, name)
+
+        try:
+            new_ingredient_ids = {}
+            if missing:
+                db.session.execute(
+                    upsert(Ingredient)
+                    .values([{'name': name, 'category': ingredient_field(names[name], 'category')}
+                             for name in missing.values()])
+                    .on_conflict_do_nothing(index_elements=['name'])
+                )
+                new_ingredient_ids = dict(db.session.query(Ingredient.name, Ingredient.ingredient_id)
+                                          .filter(Ingredient.name.in_(list(missing.values()))).all())
+                for name in names:
+                    if name not in ingredient_ids:
+                        new_name = missing[normalize_ingredient_name(name) or name]
+                        if new_name in new_ingredient_ids:
+                            ingredient_ids[name] = new_ingredient_ids[new_name]
+                logging.debug('New ingredients: %s', list(missing.values()))
+
+            recipe_ingredients = []
+            for ingredient in ingredients:
+                ingredient['ingredient_id'] = ingredient_ids.get(ingredient_field(ingredient, 'name'), -1)
+                if ingredient['ingredient_id'] != -1:
+                    recipe_ingredients.append({
+                        'recipe_id': recipe_id,
+                        'ingredient_id': ingredient['ingredient_id'],
+                        'quantity': ingredient_field(ingredient, 'quantity'),
+                        'unit': ingredient_field(ingredient, 'unit')
+                    })
+
+            if recipe_ingredients:
+                db.session.execute(insert(RecipeIngredient), recipe_ingredients)
             db.session.commit()
-            print('ADD INGREDIENT', new_ingredient)
-            ingredient['ingredient_id'] = new_ingredient.ingredient_id
+        except Exception:
+            db.session.rollback()
+            raise
+
+        ingredient_index.update(new_ingredient_ids)
+        allergen_index.invalidate(recipe_id)
+        catalog_cache.bump()
+        search_index.add_ingredients(recipe_id, [ingredient_field(ingredient, 'name') for ingredient in ingredients
+                                                 if ingredient['ingredient_id'] != -1])
+        # NumPy is only needed by the pantry lookup, keep it out of the import of the app
+        from project.utils.PantryIndex import pantry_index
+        pantry_index.add_relations(recipe_id, [relation['ingredient_id'] for relation in recipe_ingredients])
+
+        return len(recipe_ingredients) == len(ingredients)
+
+    def find_duplicates(self, fuzzy: bool = False, threshold: float = None) -> dict[int, list]:
+        """
+        :param fuzzy: Also group the ingredients whose names are similar, not only equivalent.
+        :param threshold: The minimal trigram similarity of the fuzzy groups, the one of the index by default.
+        :return: A dict mapping the ID of the oldest ingredient of each group to the IDs of its duplicates.
+        """
+        index = IngredientIndex(threshold if threshold is not None else ingredient_index.threshold)
+        index.load([])
+        duplicates = {}
+        for name, ingredient_id in (db.session.query(Ingredient.name, Ingredient.ingredient_id)
+                                    .order_by(Ingredient.ingredient_id)):
+            canonical_id = index.match(name, fuzzy=fuzzy)
+            if canonical_id is None:
+                index.update({name: ingredient_id})
+            else:
+                duplicates.setdefault(canonical_id, []).append(ingredient_id)
+        return duplicates
+
+    @staticmethod
+    def _collapse_relations(primary_key, parent_id, ingredient_ids: list) -> None:
+        """
+        Collapse the relations of a parent to the same ingredient and unit into the oldest one, whose quantity
+        becomes their sum, and delete the others. Quantities in different units are kept apart.
+
+        :param primary_key: The primary key column of the relation model.
+        :param parent_id: The column of the recipe or shopping list of the relation.
+        :param ingredient_ids: The IDs of the ingredients whose relations are collapsed.
+        """
+        model = primary_key.class_
+        kept, totals, extra_ids, collapsed_ids = {}, {}, [], set()
+        for relation_id, parent, ingredient_id, unit, quantity in (
+                db.session.query(primary_key, parent_id, model.ingredient_id, model.unit, model.quantity)
+                .filter(model.ingredient_id.in_(ingredient_ids))
+                .order_by(primary_key)):
+            kept_id = kept.setdefault((parent, ingredient_id, unit), relation_id)
+            if kept_id == relation_id:
+                totals[kept_id] = quantity
+                continue
+            extra_ids.append(relation_id)
+            if quantity is not None:
+                totals[kept_id] = (totals[kept_id] or 0) + quantity
+            collapsed_ids.add(kept_id)
+        if not extra_ids:
+            return
 
-        if ingredient['ingredient_id'] == -1:
-            return False
+        db.session.execute(update(model), [{primary_key.key: kept_id, 'quantity': totals[kept_id]}
+                                           for kept_id in collapsed_ids])
+        db.session.execute(delete(model).where(primary_key.in_(extra_ids)))
 
-        else:
-            return self.add_recipe_ingredient_relation(recipe_id, ingredient)
+    def merge_duplicates(self, duplicates: dict[int, list]) -> int:
+        """
+        Merge duplicated ingredients into the oldest one of their group in a single transaction: the recipe and
+        shopping list relations are rewritten, the allergen of a duplicate is kept when the oldest one has none,
+        then the duplicates are deleted. A recipe or shopping list which listed several variants ends up with
+        one relation per unit, see ``_collapse_relations``.
+
+        The in-memory indexes are only reset in the current process: the running web workers keep mapping
+        names to the deleted ingredients, and must be restarted after a merge.
+
+        :param duplicates: The groups of duplicates, see ``find_duplicates``.
+        :return: The number of deleted ingredients.
+        """
+        merged_ids = {duplicate_id: canonical_id for canonical_id, duplicate_ids in duplicates.items()
+                      for duplicate_id in duplicate_ids}
+        if not merged_ids:
+            return 0
+
+        try:
+            allergens = dict(db.session.query(Ingredient.ingredient_id, Ingredient.allergen)
+                             .filter(Ingredient.ingredient_id.in_(set(merged_ids) | set(duplicates))))
+            for duplicate_id, canonical_id in merged_ids.items():
+                if not allergens.get(canonical_id) and allergens.get(duplicate_id):
+                    allergens[canonical_id] = allergens[duplicate_id]
+                    db.session.execute(update(Ingredient).where(Ingredient.ingredient_id == canonical_id)
+                                       .values(allergen=allergens[duplicate_id]))
+
+            for model in (RecipeIngredient, ShoppingListItem):
+                db.session.execute(update(model)
+                                   .where(model.ingredient_id.in_(list(merged_ids)))
+                                   .values(ingredient_id=case(merged_ids, value=model.ingredient_id)))
+            self._collapse_relations(RecipeIngredient.recipeIngredient_id, RecipeIngredient.recipe_id,
+                                     list(duplicates))
+            self._collapse_relations(ShoppingListItem.shopping_list_item_id, ShoppingListItem.shopping_list_id,
+                                     list(duplicates))
+            db.session.execute(delete(Ingredient).where(Ingredient.ingredient_id.in_(list(merged_ids))))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
 
-    def add_recipe_ingredient_relation(self, recipe_id: int, ingredient:dict) -> bool:
-        new_rir = RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient.get('ingredient_id'), quantity=ingredient.get('quantity'), unit=ingredient.get('unit') )
-        db.session.add(new_rir)
-        db.session.commit()
+        ingredient_index.clear()
+        allergen_index.invalidate()
+        catalog_cache.bump()
+        search_index.clear()
+        from project.utils.PantryIndex import pantry_index
+        pantry_index.clear()
+        return len(merged_ids)
 
-        if new_rir.recipeIngredient_id:
-            return True
-        else:
-            return False
\ No newline at end of file
@@ -0,0 +1,172 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from sqlalchemy import insert
+
+from project.database.database import db
+from project.database.models import Log
+
+
+class LogSink:
+    """
+    Write-behind sink for the endpoint access logs.
+
+    In ``async`` mode records are put in a bounded in-memory queue, drained by a background worker which
+    batch-inserts them every ``flush_interval_ms`` or every ``batch_size`` records, on its own connection.
+    When the queue is full, the overflow policy applies:
+
+    * ``drop``: the record is dropped,
+    * ``block``: the caller waits for room in the queue,
+    * ``sample``: one record out of ``sample_rate`` waits for room, the others are dropped.
+
+    In ``sync`` mode, meant for tests, each record is inserted before ``emit`` returns.
+    Remaining records are flushed when the process exits.
+    """
+    MODES = ('async', 'sync')
+    OVERFLOW_POLICIES = ('drop', 'block', 'sample')
+
+    def __init__(self, mode: str = 'async', batch_size: int = 100, flush_interval_ms: int = 500,
+                 max_queue: int = 10000, overflow: str = 'drop', sample_rate: int = 10, writer=None):
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval_ms = flush_interval_ms
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.sample_rate = sample_rate
+        self.writer = writer
+        self.app = None
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self._overflowed = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._worker = None
+        self._worker_pid = None
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    def init_app(self, app) -> None:
+        self.app = app
+        self.mode = app.config.get('LOG_SINK_MODE', self.mode)
+        self.batch_size = int(app.config.get('LOG_SINK_BATCH_SIZE', self.batch_size))
+        self.flush_interval_ms = int(app.config.get('LOG_SINK_FLUSH_INTERVAL_MS', self.flush_interval_ms))
+        self.max_queue = int(app.config.get('LOG_SINK_MAX_QUEUE', self.max_queue))
+        self.overflow = app.config.get('LOG_SINK_OVERFLOW', self.overflow)
+        self.sample_rate = int(app.config.get('LOG_SINK_SAMPLE_RATE', self.sample_rate))
+        if self.mode not in self.MODES:
+            raise ValueError(f'Unknown log sink mode: {self.mode}')
+        if self.overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f'Unknown log sink overflow policy: {self.overflow}')
+        self._queue = queue.Queue(maxsize=self.max_queue)
+
+    def emit(self, record: dict) -> None:
+        """
+        :param record: The values of the ``Log`` row to insert.
+        """
+        if self.mode == 'sync':
+            self._write([record])
+            return
+
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+
+        with self._lock:
+            self._overflowed += 1
+            admitted = self.overflow == 'block' or (
+                self.overflow == 'sample' and self._overflowed % self.sample_rate == 0)
+            if not admitted:
+                self.dropped += 1
+        if admitted:
+            self._queue.put(record)
+
+    def _ensure_worker(self) -> None:
+        # The worker thread does not survive a fork, start one per process
+        if self._worker is not None and self._worker.is_alive() and self._worker_pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive() or self._worker_pid != os.getpid():
+                self._worker = threading.Thread(target=self._run, name='log-sink', daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+
+    def _run(self) -> None:
+        batch = []
+        waiters = []
+        deadline = time.monotonic() + self.flush_interval_ms / 1000
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not None:
+                batch.append(item)
+
+            if waiters or len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                if batch:
+                    self._write(batch)
+                    batch = []
+                for waiter in waiters:
+                    waiter.set()
+                waiters = []
+                deadline = time.monotonic() + self.flush_interval_ms / 1000
+
+    def _write(self, records: list) -> None:
+        try:
+            if self.writer is not None:
+                self.writer(records)
+            else:
+                with self.app.app_context(), db.engine.begin() as connection:
+                    connection.execute(insert(Log), records)
+        except Exception as e:
+            logging.exception(e)
+            with self._lock:
+                self.failed += len(records)
+            return
+
+        with self._lock:
+            self.flushed += len(records)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Wait until the records queued so far are written.
+
+        :param timeout: The maximum time to wait, in seconds.
+        :return: True if the records have been written in time.
+        """
+        if self._worker is None or not self._worker.is_alive() or self._worker_pid != os.getpid():
+            return self._queue.empty()
+
+        deadline = time.monotonic() + timeout
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(max(0.0, deadline - time.monotonic()))
+
+    def shutdown(self) -> None:
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'flushed': self.flushed,
+                'dropped': self.dropped,
+                'failed': self.failed,
+            }
+
+
+log_sink = LogSink()
@@ -0,0 +1,92 @@
+import time
+
+import numpy as np
+
+MACROS = ('calories', 'protein', 'carbohydrates', 'fat')
+DEFAULT_DAILY_CALORIES = 2000
+# Share of the daily intake covered by lunch and dinner, and split of the calories between the macros
+MEALS_SHARE = 0.7
+MACRO_CALORIES_SHARE = {'protein': 0.2, 'carbohydrates': 0.5, 'fat': 0.3}
+CALORIES_PER_GRAM = {'protein': 4, 'carbohydrates': 4, 'fat': 9}
+
+
+def daily_targets(daily_calories: int | None) -> np.ndarray:
+    """
+    :param daily_calories: The daily calorie goal of the user, ``DEFAULT_DAILY_CALORIES`` when None.
+    :return: The calorie, protein, carbohydrates and fat targets of the lunch and dinner of a day.
+    """
+    calories = (daily_calories or DEFAULT_DAILY_CALORIES) * MEALS_SHARE
+    return np.array([calories] + [calories * MACRO_CALORIES_SHARE[macro] / CALORIES_PER_GRAM[macro]
+                                  for macro in MACROS[1:]], dtype=np.float64)
+
+
+class MealPlanOptimizer:
+    """
+    Pick the recipes of a week closest to daily nutrition targets.
+
+    Candidate weeks are rows of a ``(candidates, days * meals_per_day)`` matrix of recipe indexes, scored all
+    at once against the ``(recipes, 4)`` macro matrix: the score of a week is the mean squared relative error
+    of its daily calories and macros, plus a penalty per repeated recipe. Each round draws half of the
+    candidates at random and derives the other half from the best week so far by replacing one or two meals,
+    until ``time_budget_ms`` is spent or ``max_rounds`` rounds are done.
+    """
+    def __init__(self, days: int = 7, meals_per_day: int = 2, candidates: int = 512, time_budget_ms: float = 20,
+                 max_rounds: int = 50, repeat_penalty: float = 1.0, seed: int = None):
+        self.days = days
+        self.meals_per_day = meals_per_day
+        self.candidates = candidates
+        self.time_budget_ms = time_budget_ms
+        self.max_rounds = max_rounds
+        self.repeat_penalty = repeat_penalty
+        self.rng = np.random.default_rng(seed)
+        self.rounds = 0
+
+    @property
+    def week_size(self) -> int:
+        return self.days * self.meals_per_day
+
+    def score(self, weeks: np.ndarray, macros: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """
+        :param weeks: A ``(candidates, week_size)`` matrix of recipe indexes, lunch then dinner of each day.
+        :param macros: The ``(recipes, 4)`` matrix of the recipe calories, protein, carbohydrates and fat.
+        :param targets: The daily targets, see ``daily_targets``.
+        :return: The score of each week, lower is better.
+        """
+        daily = macros[weeks].reshape(len(weeks), self.days, self.meals_per_day, -1).sum(axis=2)
+        errors = ((daily - targets) / targets) ** 2
+        repeats = (np.diff(np.sort(weeks, axis=1), axis=1) == 0).sum(axis=1)
+        return errors.mean(axis=(1, 2)) + self.repeat_penalty * repeats
+
+    def _mutate(self, week: np.ndarray, count: int, recipe_count: int) -> np.ndarray:
+        weeks = np.repeat(week[np.newaxis], count, axis=0)
+        rows = np.arange(count)
+        for _ in range(2):
+            slots = self.rng.integers(0, self.week_size, count)
+            weeks[rows, slots] = self.rng.integers(0, recipe_count, count)
+        return weeks
+
+    def optimize(self, macros: np.ndarray, targets: np.ndarray) -> tuple[np.ndarray, float]:
+        """
+        :param macros: The ``(recipes, 4)`` macro matrix of the eligible recipes.
+        :param targets: The daily targets, see ``daily_targets``.
+        :return: The recipe indexes of the best week found and its score.
+        """
+        macros = np.asarray(macros, dtype=np.float64)
+        recipe_count = len(macros)
+        deadline = time.perf_counter() + self.time_budget_ms / 1000
+        best_week, best_score = None, np.inf
+
+        self.rounds = 0
+        while self.rounds < self.max_rounds and (self.rounds == 0 or time.perf_counter() < deadline):
+            weeks = self.rng.integers(0, recipe_count, (self.candidates, self.week_size))
+            if best_week is not None:
+                half = self.candidates // 2
+                weeks[half:] = self._mutate(best_week, self.candidates - half, recipe_count)
+
+            scores = self.score(weeks, macros, targets)
+            best = int(scores.argmin())
+            if scores[best] < best_score:
+                best_week, best_score = weeks[best].copy(), float(scores[best])
+            self.rounds += 1
+
+        return best_week, best_score
@@ -0,0 +1,221 @@
+import bisect
+import contextvars
+import hmac
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Response, request
+from sqlalchemy import event
+
+from project.database.database import db
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Span name -> (Server-Timing metric, histogram name)
+SPANS = {'serialize': ('serialize', 'http_request_serialize_duration_seconds'),
+         'llm': ('llm', 'http_request_llm_duration_seconds')}
+
+
+class RequestTimings:
+    """
+    The timings of the request in progress: SQL statements and time, and time spent in the named spans.
+    Spans may be recorded from several threads, such as the completion workers of the ingestion pipeline.
+    """
+    __slots__ = ('start', 'sql_statements', 'sql_seconds', 'spans', '_lock')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.spans = dict.fromkeys(SPANS, 0.0)
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.spans[name] += seconds
+
+
+class Histogram:
+    """
+    Cumulative histogram in the Prometheus exposition format, one series per label values.
+    """
+    def __init__(self, name: str, help_text: str, buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            # Bucket counts, then the +Inf count and the sum
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def expose(self, label_names: tuple) -> list:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(self._series.items()):
+            label_text = ','.join(f'{name}="{value}"' for name, value in zip(label_names, labels))
+            count = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), series):
+                count += bucket_count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {series[-1]}')
+            lines.append(f'{self.name}_count{{{label_text}}} {count}')
+        return lines
+
+
+class Metrics:
+    """
+    Per-request performance instrumentation.
+
+    For every request, records the wall time, the number and duration of the SQL statements, through the
+    engine events, and the time of the ``serialize`` and ``llm`` spans. The timings are sent back in a
+    ``Server-Timing`` header and aggregated per endpoint into histograms, exposed in the Prometheus text
+    format on ``/metrics``.
+
+    The traffic of every endpoint is not public: ``/metrics`` answers 404 unless ``METRICS_TOKEN`` is set, then
+    401 to the requests without the ``Authorization: Bearer <METRICS_TOKEN>`` header of the scraper.
+
+    Nothing is registered when ``METRICS_ENABLED`` is off, spans then cost a context variable lookup.
+    """
+    LABELS = ('endpoint', 'method')
+
+    def __init__(self):
+        self.enabled = False
+        self.token = None
+        self._current = contextvars.ContextVar('request_timings', default=None)
+        self._requests: dict[tuple, int] = {}
+        self._histograms = {
+            'duration': Histogram('http_request_duration_seconds', 'Wall time of the requests.',
+                                  DURATION_BUCKETS),
+            'sql_statements': Histogram('http_request_sql_statements', 'SQL statements per request.',
+                                        STATEMENT_BUCKETS),
+            'sql_duration': Histogram('http_request_sql_duration_seconds', 'SQL time per request.',
+                                      DURATION_BUCKETS),
+        }
+        for span, (_, histogram_name) in SPANS.items():
+            self._histograms[span] = Histogram(histogram_name, f'Time spent in {span} per request.',
+                                               DURATION_BUCKETS)
+        self._lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        self.enabled = bool(app.config.get('METRICS_ENABLED', False))
+        self.token = app.config.get('METRICS_TOKEN') or None
+        if not self.enabled:
+            return
+
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self.handle_metrics, methods=['GET'])
+
+    def current(self) -> RequestTimings | None:
+        """
+        :return: The timings of the request in progress in this context, None outside of a request.
+        """
+        return self._current.get()
+
+    @contextmanager
+    def span(self, name: str):
+        """
+        Add the time spent in the block to the ``name`` span of the current request, if any.
+        """
+        timings = self._current.get()
+        if timings is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings.add_span(name, time.perf_counter() - start)
+
+    def timed(self, name: str):
+        """
+        :return: A decorator adding the time spent in the decorated function to the ``name`` span.
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._current.get() is not None:
+            conn.info['metrics_query_start'] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        timings = self._current.get()
+        start = conn.info.pop('metrics_query_start', None)
+        if timings is not None and start is not None:
+            timings.sql_statements += 1
+            timings.sql_seconds += time.perf_counter() - start
+
+    def _before_request(self) -> None:
+        self._current.set(RequestTimings())
+
+    def _after_request(self, response: Response) -> Response:
+        timings = self._current.get()
+        if timings is None:
+            return response
+
+        duration = time.perf_counter() - timings.start
+        entries = [f'app;dur={duration * 1000:.1f}',
+                   f'db;dur={timings.sql_seconds * 1000:.1f};desc="{timings.sql_statements} queries"']
+        entries += [f'{metric};dur={timings.spans[span] * 1000:.1f}' for span, (metric, _) in SPANS.items()
+                    if timings.spans[span]]
+        response.headers['Server-Timing'] = ', '.join(entries)
+
+        labels = (request.url_rule.rule if request.url_rule else 'unmatched', request.method)
+        with self._lock:
+            request_key = labels + (str(response.status_code),)
+            self._requests[request_key] = self._requests.get(request_key, 0) + 1
+            self._histograms['duration'].observe(labels, duration)
+            self._histograms['sql_statements'].observe(labels, timings.sql_statements)
+            self._histograms['sql_duration'].observe(labels, timings.sql_seconds)
+            for span in SPANS:
+                self._histograms[span].observe(labels, timings.spans[span])
+        return response
+
+    def _teardown_request(self, exception=None) -> None:
+        self._current.set(None)
+
+    def expose(self) -> str:
+        """
+        :return: The metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            lines = ['# HELP http_requests_total Requests per endpoint, method and status.',
+                     '# TYPE http_requests_total counter']
+            lines += [f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}'
+                      for (endpoint, method, status), count in sorted(self._requests.items())]
+            for histogram in self._histograms.values():
+                lines += histogram.expose(self.LABELS)
+        return '\n'.join(lines) + '\n'
+
+    def handle_metrics(self) -> Response:
+        if self.token is None:
+            return Response(status=404)
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(token.encode(), self.token.encode()):
+            return Response(status=401, headers={'WWW-Authenticate': 'Bearer'})
+        return Response(self.expose(), status=200, mimetype='text/plain; version=0.0.4')
+
+    def reset(self) -> None:
+        with self._lock:
+            self._requests.clear()
+            for histogram in self._histograms.values():
+                histogram._series.clear()
+
+
+metrics = Metrics()
@@ -0,0 +1,151 @@
+import threading
+
+import numpy as np
+
+from project.database.database import db
+from project.database.models import RecipeIngredient
+
+
+class PantryIndex:
+    """
+    Process-wide sparse ``recipe x ingredient`` matrix, to rank the recipes by the share of their ingredients
+    found in a pantry.
+
+    The ingredient sets of the recipes are stored in CSR form: the ingredient columns of row ``i`` are
+    ``indices[indptr[i]:indptr[i + 1]]``. Scoring a pantry marks its columns in a boolean vector, gathers it
+    over ``indices`` and sums each row with ``np.add.reduceat``, for the whole catalog at once.
+
+    The matrix is loaded with a single query on first use. ``IngredientManager.save_ingredients`` then
+    registers the new relations of a recipe, appended as a new row on the next lookup; the previous row of
+    the recipe, if any, is masked until the next full load.
+    """
+    def __init__(self):
+        self._recipe_ids = np.empty(0, dtype=np.int64)
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.empty(0, dtype=np.int32)
+        self._alive = np.empty(0, dtype=bool)
+        self._rows: dict[int, int] = {}
+        self._columns: dict[int, int] = {}
+        self._pending: dict[int, set] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _column(self, ingredient_id: int) -> int:
+        return self._columns.setdefault(ingredient_id, len(self._columns))
+
+    def load(self, relations) -> None:
+        """
+        Replace the content of the index.
+
+        :param relations: The ``(recipe_id, ingredient_id)`` pairs of the recipe ingredients.
+        """
+        ingredients = {}
+        for recipe_id, ingredient_id in relations:
+            ingredients.setdefault(recipe_id, set()).add(ingredient_id)
+
+        with self._lock:
+            self._columns, self._rows, self._pending = {}, {}, {}
+            self._recipe_ids = np.empty(0, dtype=np.int64)
+            self._indptr = np.zeros(1, dtype=np.int64)
+            self._indices = np.empty(0, dtype=np.int32)
+            self._alive = np.empty(0, dtype=bool)
+            self._append(ingredients)
+            self._loaded = True
+
+    def _append(self, ingredients: dict[int, set]) -> None:
+        if not ingredients:
+            return
+
+        for recipe_id in ingredients:
+            if recipe_id in self._rows:
+                self._alive[self._rows[recipe_id]] = False
+        first_row = len(self._recipe_ids)
+        recipe_ids = list(ingredients)
+        columns = [sorted(self._column(ingredient_id) for ingredient_id in ingredients[recipe_id])
+                   for recipe_id in recipe_ids]
+
+        lengths = np.fromiter((len(row) for row in columns), dtype=np.int64, count=len(columns))
+        self._indptr = np.concatenate([self._indptr, self._indptr[-1] + np.cumsum(lengths)])
+        self._indices = np.concatenate([self._indices, np.fromiter(
+            (column for row in columns for column in row), dtype=np.int32, count=int(lengths.sum()))])
+        self._recipe_ids = np.concatenate([self._recipe_ids, np.asarray(recipe_ids, dtype=np.int64)])
+        self._alive = np.concatenate([self._alive, np.ones(len(recipe_ids), dtype=bool)])
+        for row, recipe_id in enumerate(recipe_ids, first_row):
+            self._rows[recipe_id] = row
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load(db.session.query(RecipeIngredient.recipe_id, RecipeIngredient.ingredient_id).all())
+        elif self._pending:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                column_ids = {column: ingredient_id for ingredient_id, column in self._columns.items()}
+                for recipe_id, ingredient_ids in pending.items():
+                    if recipe_id in self._rows:
+                        row = self._rows[recipe_id]
+                        ingredient_ids.update(column_ids[int(column)] for column in
+                                              self._indices[self._indptr[row]:self._indptr[row + 1]])
+                self._append(pending)
+
+    def add_relations(self, recipe_id: int, ingredient_ids) -> None:
+        """
+        Register new ingredients of a recipe, indexed on the next lookup. Nothing is done before the index is
+        loaded, the relations are loaded with it.
+
+        :param recipe_id: The ID of the recipe.
+        :param ingredient_ids: The IDs of its new ingredients.
+        """
+        with self._lock:
+            if self._loaded:
+                self._pending.setdefault(recipe_id, set()).update(ingredient_ids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._loaded = False
+            self._pending = {}
+
+    def rank(self, ingredient_ids, eligible_recipe_ids=None, limit: int = 20,
+             min_coverage: float = 0.0) -> list[tuple[int, int, int]]:
+        """
+        :param ingredient_ids: The IDs of the ingredients of the pantry.
+        :param eligible_recipe_ids: The IDs of the recipes to rank, every recipe when None.
+        :param limit: The maximum number of recipes.
+        :param min_coverage: The minimum share of the ingredients of a recipe found in the pantry.
+        :return: The ``(recipe_id, matched, total)`` of the best covered recipes, with their number of
+                 ingredients found in the pantry and their number of ingredients, best coverage first,
+                 then most matched ingredients. Recipes without any ingredient of the pantry are left out.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            recipe_ids, indptr, indices, alive = self._recipe_ids, self._indptr, self._indices, self._alive
+            pantry = np.zeros(len(self._columns), dtype=bool)
+            columns = [self._columns[ingredient_id] for ingredient_id in ingredient_ids
+                       if ingredient_id in self._columns]
+        if not columns or not len(recipe_ids):
+            return []
+        pantry[columns] = True
+
+        totals = np.diff(indptr)
+        # The padding keeps the offset of trailing empty rows in bounds, reduceat returns the single element
+        # at the offset of an empty row
+        hits = np.append(pantry[indices], False).astype(np.int32)
+        matched = np.add.reduceat(hits, indptr[:-1])
+        matched[totals == 0] = 0
+
+        rows = np.flatnonzero(alive & (matched > 0))
+        if eligible_recipe_ids is not None:
+            rows = rows[np.isin(recipe_ids[rows], np.fromiter(eligible_recipe_ids, dtype=np.int64))]
+        coverage = matched[rows] / totals[rows]
+        rows, coverage = rows[coverage >= min_coverage], coverage[coverage >= min_coverage]
+
+        # Best coverage first, then most matched ingredients, then lowest recipe ID
+        order = np.lexsort((recipe_ids[rows], -matched[rows], -coverage))[:limit]
+        rows = rows[order]
+        return [(int(recipe_id), int(count), int(total))
+                for recipe_id, count, total in zip(recipe_ids[rows], matched[rows], totals[rows])]
+
+
+pantry_index = PantryIndex()
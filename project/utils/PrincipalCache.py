@@ -0,0 +1,82 @@
+import threading
+import time
+
+from sqlalchemy import event, inspect
+
+from project.database.models import User
+
+
+class Principal:
+    """
+    Authenticated user as seen by the endpoints: the identity and the profile used to build meal plans.
+    """
+    __slots__ = ('user_id', 'dietaryPreference', 'allergies', 'goals')
+
+    def __init__(self, user_id: int, dietaryPreference: str, allergies: list, goals: int):
+        self.user_id = user_id
+        self.dietaryPreference = dietaryPreference
+        self.allergies = allergies
+        self.goals = goals
+
+    @classmethod
+    def from_user(cls, user: User) -> 'Principal':
+        return cls(user.user_id, user.dietaryPreference, list(user.allergies or []), user.goals)
+
+    def __repr__(self):
+        return f"<Principal(id='{self.user_id}')>"
+
+
+class PrincipalCache:
+    """
+    Short-TTL cache of the principals, keyed on the ``user_id`` of the JWT.
+
+    Entries are dropped as soon as the profile of the user is updated through the ORM in this process,
+    other processes see the update when their entry expires. A TTL of 0 disables the cache.
+    """
+    PROFILE_ATTRIBUTES = ('dietaryPreference', 'allergies', 'goals')
+
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl
+        self._principals: dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        self.ttl = float(app.config.get('PRINCIPAL_CACHE_TTL', self.ttl))
+
+    def get(self, user_id: int) -> Principal | None:
+        if not self.ttl:
+            return None
+
+        entry = self._principals.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def put(self, principal: Principal) -> None:
+        if not self.ttl:
+            return
+
+        with self._lock:
+            self._principals[principal.user_id] = (time.monotonic() + self.ttl, principal)
+
+    def invalidate(self, user_id: int = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._principals.clear()
+            else:
+                self._principals.pop(user_id, None)
+
+
+principal_cache = PrincipalCache()
+
+
+@event.listens_for(User, 'after_update')
+def invalidate_updated_principal(mapper, connection, user: User) -> None:
+    state = inspect(user)
+    if any(state.attrs[attribute].history.has_changes() for attribute in PrincipalCache.PROFILE_ATTRIBUTES):
+        principal_cache.invalidate(user.user_id)
+
+
+@event.listens_for(User, 'after_delete')
+def invalidate_deleted_principal(mapper, connection, user: User) -> None:
+    principal_cache.invalidate(user.user_id)
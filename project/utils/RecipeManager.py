@@ -1,11 +1,57 @@
 from datetime import date, timedelta, datetime
+import hashlib
+import json
 import random
 
 import math
-from sqlalchemy import func, and_
+from flask import current_app
+from sqlalchemy import and_, insert, delete, select, update
 
-from project.database.database import db
+from project.database.database import db, upsert
 from project.database.models import Recipe, RecipeIngredient, Ingredient, MealPlans, MealPlanRecipe, User
+from project.utils.AllergenIndex import allergen_index
+from project.utils.CandidatePool import CandidatePool
+from project.utils.CatalogCache import catalog_cache
+from project.utils.IngredientIndex import ingredient_index
+from project.utils.SearchIndex import search_index
+from project.utils.ShoppingListManager import ShoppingListManager
+
+MEAL_PLAN_SIZE = 14
+DAY_PLAN_SIZE = 2
+RECIPE_PAGE_MAX_SIZE = 500
+RECIPE_STREAM_BATCH_SIZE = 500
+RECIPE_SEARCH_MAX_SIZE = 100
+GENERATION_MODES = ('random', 'optimize')
+
+
+def pick_week(recipe_ids: list, rng=random) -> list:
+    """
+    :param recipe_ids: The IDs of the eligible recipes.
+    :param rng: The random generator to draw with.
+    :return: The IDs of the recipes of a week, recipes are repeated when there are not enough to fill it.
+    """
+    picked = rng.sample(recipe_ids, min(MEAL_PLAN_SIZE, len(recipe_ids)))
+    if 0 < len(picked) < MEAL_PLAN_SIZE:
+        picked = picked * math.ceil(MEAL_PLAN_SIZE / len(picked))
+    return picked[:MEAL_PLAN_SIZE]
+
+
+def meal_plan_recipe_rows(meal_plan_id: int, start_date: date, recipe_ids: list) -> list:
+    """
+    :param meal_plan_id: The ID of the meal plan.
+    :param start_date: The first day of the meal plan.
+    :param recipe_ids: The IDs of the recipes of the week, lunch then dinner of each day.
+    :return: The ``meal_plans_recipe_relations`` rows of the week.
+    """
+    return [
+        {
+            'meal_plan_id': meal_plan_id,
+            'recipe_id': recipe_id,
+            'mealType': 'lunch' if meal_idx % DAY_PLAN_SIZE == 0 else 'dinner',
+            'date': start_date + timedelta(days=meal_idx // DAY_PLAN_SIZE)
+        }
+        for meal_idx, recipe_id in enumerate(recipe_ids)
+    ]
 
 
 class RecipeManager:
@@ -26,23 +72,55 @@ class RecipeManager:
         except:
             return -1
 
-    def get_recipe_by_id(self, recipe_id: int) -> Recipe:
-        ingredient_relations = RecipeIngredient.query.filter_by(recipe_id=recipe_id).all()
-        recipe = {}
-        for ingredient_relation in ingredient_relations:
-            if 'recipe_id' not in recipe:
-                recipe = ingredient_relation.recipe.serialize()
-            if 'ingredients' not in recipe:
-                recipe['ingredients'] = []
-            serialize_ingredient_relation = ingredient_relation.serialize()
-            del serialize_ingredient_relation['recipe']
-            ingredient = serialize_ingredient_relation['ingredient'].serialize()
-            del serialize_ingredient_relation['ingredient']
-            ingredient.update(serialize_ingredient_relation)
-            recipe['ingredients'].append(ingredient)
+    def get_recipe_by_id(self, recipe_id: int) -> dict | None:
+        """
+        :param recipe_id: The ID of the recipe.
+        :return: The serialized recipe with its ingredients, None if the recipe does not exist.
+        """
+        recipe_id = int(recipe_id)
+        return catalog_cache.get(('recipe_detail', recipe_id), lambda: self._load_recipe_detail(recipe_id))
+
+    def get_recipe_etag(self, recipe_id: int) -> str | None:
+        """
+        :param recipe_id: The ID of the recipe.
+        :return: The strong ETag of the recipe detail, a hash of its content cached along with it.
+                 None if the recipe does not exist.
+        """
+        recipe_id = int(recipe_id)
+        return catalog_cache.get(('recipe_etag', recipe_id),
+                                 lambda: self._recipe_etag(self.get_recipe_by_id(recipe_id)))
+
+    @staticmethod
+    def _recipe_etag(recipe: dict | None) -> str | None:
+        if recipe is None:
+            return None
+        return hashlib.sha1(json.dumps(recipe, sort_keys=True).encode()).hexdigest()
+
+    def _load_recipe_detail(self, recipe_id: int) -> dict | None:
+        # One row per ingredient, a single row with no ingredient for a recipe without any
+        rows = (db.session.query(Recipe, RecipeIngredient, Ingredient)
+                .outerjoin(RecipeIngredient, RecipeIngredient.recipe_id == Recipe.recipe_id)
+                .outerjoin(Ingredient, Ingredient.ingredient_id == RecipeIngredient.ingredient_id)
+                .filter(Recipe.recipe_id == recipe_id)
+                .order_by(RecipeIngredient.recipeIngredient_id)
+                .all())
+        if not rows:
+            return None
+
+        recipe = rows[0][0].serialize()
+        recipe['ingredients'] = []
+        for _, ingredient_relation, ingredient in rows:
+            if ingredient_relation is None:
+                continue
+            serialized_ingredient = ingredient.serialize()
+            serialized_ingredient.update(ingredient_relation.serialize())
+            recipe['ingredients'].append(serialized_ingredient)
         return recipe
 
     def list_recipe_by_diet(self, diet: str) -> [Recipe]:
+        return catalog_cache.get(('diet', diet), lambda: self._load_recipes_by_diet(diet))
+
+    def _load_recipes_by_diet(self, diet: str) -> list:
         recipe_objects = Recipe.query.filter_by(diet=diet).all()
         recipes = []
         for recipe_object in recipe_objects:
@@ -50,6 +128,194 @@ class RecipeManager:
             recipes.append(serialize_recipe)
         return recipes
 
+    @staticmethod
+    def parse_recipe_fields(fields: str | None) -> tuple | None:
+        """
+        :param fields: A comma separated list of recipe fields, such as ``title,calories``.
+        :return: The fields to project, ``recipe_id`` first, None for every field.
+        :raise ValueError: If a field is not a serialized recipe field.
+        """
+        if not fields:
+            return None
+        projection = ['recipe_id']
+        for field in fields.split(','):
+            field = field.strip()
+            if field not in Recipe.__serialize_fields__:
+                raise ValueError(f'Unknown recipe field: {field}')
+            if field not in projection:
+                projection.append(field)
+        return tuple(projection)
+
+    def _recipe_listing(self, diet: str, fields: tuple | None, after: int | None):
+        columns = [getattr(Recipe, field) for field in fields or Recipe.__serialize_fields__]
+        statement = select(*columns).where(Recipe.diet == diet)
+        if after is not None:
+            statement = statement.where(Recipe.recipe_id > after)
+        return statement.order_by(Recipe.recipe_id)
+
+    def list_recipe_page(self, diet: str, limit: int, after: int = None, fields: tuple = None) -> list:
+        """
+        Keyset pagination of the recipes of a diet, served by the ``(diet, recipe_id)`` index.
+
+        :param diet: The diet of the recipes.
+        :param limit: The maximum number of recipes of the page, at most ``RECIPE_PAGE_MAX_SIZE``.
+        :param after: The last ``recipe_id`` of the previous page, from the first recipe when None.
+        :param fields: The fields to project, see ``parse_recipe_fields``. Every field when None.
+        :return: The serialized recipes of the page, in ``recipe_id`` order.
+        """
+        if not 0 < limit <= RECIPE_PAGE_MAX_SIZE:
+            raise ValueError(f'The limit must be between 1 and {RECIPE_PAGE_MAX_SIZE}')
+        rows = db.session.execute(self._recipe_listing(diet, fields, after).limit(limit))
+        return [Recipe.serialize_row(row) for row in rows]
+
+    def iter_recipes_by_diet(self, diet: str, after: int = None, fields: tuple = None):
+        """
+        Stream the recipes of a diet from a server side cursor, ``RECIPE_STREAM_BATCH_SIZE`` rows at a time,
+        so memory does not grow with the catalog.
+
+        :param diet: The diet of the recipes.
+        :param after: Stream the recipes after this ``recipe_id``, from the first recipe when None.
+        :param fields: The fields to project, see ``parse_recipe_fields``. Every field when None.
+        :return: A generator of the serialized recipes, in ``recipe_id`` order.
+        """
+        statement = self._recipe_listing(diet, fields, after).execution_options(yield_per=RECIPE_STREAM_BATCH_SIZE)
+        for row in db.session.execute(statement):
+            yield Recipe.serialize_row(row)
+
+    def search_recipes(self, query: str, diet: str = None, allergies: list = None, limit: int = 20) -> list:
+        """
+        :param query: The searched text, matched against the title, ingredients, description and instructions.
+        :param diet: The diet the recipes must follow, any diet when None or 'flex'.
+        :param allergies: The allergens the recipes must not contain.
+        :param limit: The maximum number of recipes, at most ``RECIPE_SEARCH_MAX_SIZE``.
+        :return: The serialized recipes, best match first, with their ``score``.
+        """
+        if not 0 < limit <= RECIPE_SEARCH_MAX_SIZE:
+            raise ValueError(f'The limit must be between 1 and {RECIPE_SEARCH_MAX_SIZE}')
+
+        results = search_index.search(query, diet, allergies, limit)
+        recipes = {recipe['recipe_id']: recipe
+                   for recipe in self._get_recipes([recipe_id for recipe_id, _ in results])}
+        found = []
+        for recipe_id, score in results:
+            if recipe_id in recipes:
+                recipes[recipe_id]['score'] = round(score, 4)
+                found.append(recipes[recipe_id])
+        return found
+
+    def find_recipes_by_pantry(self, current_user: User, ingredients: list, limit: int = 20,
+                               min_coverage: float = 0.0) -> list:
+        """
+        :param current_user: The user, whose diet and allergies are respected.
+        :param ingredients: The ingredients of the pantry, as IDs or names. Names are matched like the ones of
+                            the generated recipes, see ``IngredientIndex.match``.
+        :param limit: The maximum number of recipes, at most ``RECIPE_SEARCH_MAX_SIZE``.
+        :param min_coverage: The minimum share of the ingredients of a recipe found in the pantry.
+        :return: The serialized recipes covered the most by the pantry, with their ``coverage``, number of
+                 ``matched_ingredients`` and ``ingredient_count``.
+        :raise ValueError: If an ingredient is neither an ID nor a name, or the limit is out of range.
+        """
+        if not 0 < limit <= RECIPE_SEARCH_MAX_SIZE:
+            raise ValueError(f'The limit must be between 1 and {RECIPE_SEARCH_MAX_SIZE}')
+        if any(isinstance(ingredient, bool) or not isinstance(ingredient, (int, str)) for ingredient in ingredients):
+            raise ValueError('The ingredients must be IDs or names')
+
+        ingredient_ids = {ingredient for ingredient in ingredients if isinstance(ingredient, int)}
+        ingredient_ids.update(ingredient_index.match_many(
+            [ingredient for ingredient in ingredients if isinstance(ingredient, str)]).values())
+
+        # NumPy is only needed by the pantry lookup, keep it out of the import of the app
+        from project.utils.PantryIndex import pantry_index
+
+        pool = self._candidate_pool(current_user.dietaryPreference, current_user.allergies)
+        ranking = pantry_index.rank(ingredient_ids, pool.recipe_ids, limit, min_coverage)
+        recipes = {recipe['recipe_id']: recipe
+                   for recipe in self._get_recipes([recipe_id for recipe_id, _, _ in ranking])}
+        found = []
+        for recipe_id, matched, total in ranking:
+            if recipe_id in recipes:
+                recipes[recipe_id].update(coverage=round(matched / total, 4), matched_ingredients=matched,
+                                          ingredient_count=total)
+                found.append(recipes[recipe_id])
+        return found
+
+    def _get_recipes(self, recipe_ids: list) -> list:
+        """
+        :param recipe_ids: The IDs of the recipes to get, duplicates allowed.
+        :return: A copy of the serialized recipes in the order of ``recipe_ids``, missing ones are left out.
+        """
+        def load_recipes(keys: list) -> dict:
+            recipes = Recipe.query.filter(Recipe.recipe_id.in_([recipe_id for _, recipe_id in keys])).all()
+            return {('recipe', recipe.recipe_id): recipe.serialize() for recipe in recipes}
+
+        recipes = catalog_cache.get_many([('recipe', recipe_id) for recipe_id in recipe_ids], load_recipes)
+        return [dict(recipes[('recipe', recipe_id)]) for recipe_id in recipe_ids if ('recipe', recipe_id) in recipes]
+
+    def _get_catalog_facets(self) -> dict:
+        """
+        :return: A dict mapping each recipe ID of the catalog to its ``(diet, allergens)`` facets.
+        """
+        def load_facets() -> dict:
+            recipe_diets = dict(db.session.query(Recipe.recipe_id, Recipe.diet).all())
+            recipes_allergens = allergen_index.get_many(recipe_diets, whole_catalog=True)
+            return {recipe_id: (diet, frozenset(allergen.lower() for allergen in recipes_allergens[recipe_id]))
+                    for recipe_id, diet in recipe_diets.items()}
+
+        return catalog_cache.get(('facets',), load_facets)
+
+    def _get_catalog_macros(self) -> dict:
+        """
+        :return: A dict mapping each recipe ID of the catalog to its ``(calories, protein, carbohydrates, fat)``.
+        """
+        def load_macros() -> dict:
+            rows = db.session.query(Recipe.recipe_id, Recipe.calories, Recipe.protein, Recipe.carbohydrates,
+                                    Recipe.fat).all()
+            return {recipe_id: tuple(float(value or 0) for value in macros) for recipe_id, *macros in rows}
+
+        return catalog_cache.get(('macros',), load_macros)
+
+    def _optimize_week(self, recipe_ids: list, daily_calories: int | None) -> list:
+        """
+        :param recipe_ids: The IDs of the eligible recipes.
+        :param daily_calories: The daily calorie goal of the user.
+        :return: The IDs of the recipes of the week closest to the nutrition targets, see ``MealPlanOptimizer``.
+        """
+        if not recipe_ids:
+            return []
+
+        # NumPy is only needed by the optimize mode, keep it out of the import of the app
+        import numpy as np
+        from project.utils.MealPlanOptimizer import MealPlanOptimizer, daily_targets
+
+        catalog_macros = self._get_catalog_macros()
+        macros = np.array([catalog_macros[recipe_id] for recipe_id in recipe_ids])
+        optimizer = MealPlanOptimizer(days=MEAL_PLAN_SIZE // DAY_PLAN_SIZE, meals_per_day=DAY_PLAN_SIZE,
+                                      time_budget_ms=current_app.config.get('MEAL_PLAN_OPTIMIZER_BUDGET_MS', 20))
+        week, _ = optimizer.optimize(macros, daily_targets(daily_calories))
+        return [recipe_ids[idx] for idx in week]
+
+    def _candidate_pool(self, diet: str | None, allergies: list | None) -> CandidatePool:
+        """
+        :param diet: The diet the recipes must follow, any diet when None or 'flex'.
+        :param allergies: The allergens the recipes must not contain.
+        :return: The pool of the eligible recipes, built once per profile and catalog version.
+        """
+        diet = None if diet is None or diet.lower() == 'flex' else diet
+        allergies = tuple(sorted({allergy.lower() for allergy in allergies or []}))
+        return catalog_cache.get(('pool', diet, allergies),
+                                 lambda: CandidatePool(self._eligible_recipe_ids(diet, allergies)))
+
+    def _eligible_recipe_ids(self, diet: str | None, allergies: list | None) -> list:
+        """
+        :param diet: The diet the recipes must follow, any diet when None or 'flex'.
+        :param allergies: The allergens the recipes must not contain.
+        :return: The sorted IDs of the eligible recipes.
+        """
+        allergies = {allergy.lower() for allergy in allergies or []}
+        any_diet = diet is None or diet.lower() == 'flex'
+        return sorted(recipe_id for recipe_id, (recipe_diet, allergens) in self._get_catalog_facets().items()
+                      if (any_diet or recipe_diet == diet) and allergens.isdisjoint(allergies))
+
     def save_recipe(self, recipe: dict) -> int:
         recipe_to_save = recipe.copy()
         recipe_to_save['breakfast'] = True
@@ -58,69 +324,58 @@ class RecipeManager:
             new_recipe = Recipe(**recipe_to_save)
             db.session.add(new_recipe)
             db.session.commit()
+            catalog_cache.bump()
             recipe['recipe_id'] = new_recipe.recipe_id
+            search_index.add_recipe(recipe)
 
         return recipe['recipe_id']
 
-    def swap_recipe(self, current_recipe_id: int, date_to_act: str, current_user: User) -> list:
+    def swap_recipe(self, current_recipe_id: int, date_to_act: str, current_user: User) -> list | None:
         """
         :param current_recipe_id: The ID of the current recipe to be swapped.
         :param date_to_act: The date on which the swap should be made.
         :param current_user: The user for whom the recipe swap is being done.
-        :return: The updated current meal plan for the user.
+        :return: The updated current meal plan for the user, None if the recipe is not planned that day.
 
-        This method swaps the current recipe with a randomly selected recipe from the meal plan for a specific date and user.
+        This method swaps the current recipe with a random recipe of the user's candidate pool which is not in the
+        week yet. When every candidate is already in the week, any other candidate is drawn.
 
         """
-        safe_recipe_ingredients = RecipeIngredient.query.join(Ingredient).filter(
-            Ingredient.allergen.notin_(current_user.allergies)).all()
-
-        safe_recipes_ids = {ingredient_relation.recipe_id for ingredient_relation in safe_recipe_ingredients}
-        safe_recipes_ids.remove(current_recipe_id)
-
-        new_recipe_id = random.choice(list(safe_recipes_ids))
-
-        current_meal_plan = MealPlans.query.filter(
-            and_(
-                MealPlans.start_date == self._start_of_week(date_to_act),
-                MealPlans.user_id == current_user.user_id)
-        ).first()
-
-        meal_plan_recipe_relation_to_swap = MealPlanRecipe.query.filter(
-            and_(
-                MealPlanRecipe.meal_plan_id == current_meal_plan.meal_plan_id,
-                MealPlanRecipe.recipe_id == current_recipe_id,
-                MealPlanRecipe.date == datetime.strptime(date_to_act, "%Y-%m-%d")
-            )).first()
-
-        meal_plan_recipe_relation_to_swap.recipe_id = new_recipe_id
-
-        db.session.commit()
-
-        return self.get_current_meal_plan(current_user, {"start": self._start_of_week(date_to_act)})
-
-    def _extract_allergen(self, ingredient) -> str:
-
-        allergen = ingredient.allergen
-        if allergen:
-            return allergen
-
-        return None
-
-    def _get_recipe_allergen(self, recipe_id) -> set:
-        allergens = set()
+        day = datetime.strptime(date_to_act, "%Y-%m-%d").date()
+        start_of_week = self._start_of_week(date_to_act).date()
+        week = (db.session.query(MealPlanRecipe)
+                .join(MealPlans, MealPlans.meal_plan_id == MealPlanRecipe.meal_plan_id)
+                .filter(MealPlans.user_id == current_user.user_id, MealPlans.start_date == start_of_week)
+                .all())
+
+        meal_plan_recipe_relation_to_swap = next(
+            (relation for relation in week
+             if relation.recipe_id == int(current_recipe_id) and relation.date == day), None)
+        if meal_plan_recipe_relation_to_swap is None:
+            return None
 
-        raw_recipe_ingredients = (RecipeIngredient.query
-                                  .join(Ingredient)
-                                  .filter(
-                                    RecipeIngredient.recipe_id == recipe_id).all())
+        pool = self._candidate_pool(current_user.dietaryPreference, current_user.allergies)
+        new_recipe_id = pool.sample(exclude={relation.recipe_id for relation in week})
+        if new_recipe_id is None:
+            new_recipe_id = pool.sample(exclude={meal_plan_recipe_relation_to_swap.recipe_id})
+
+        if new_recipe_id is not None:
+            ShoppingListManager().apply_swap(meal_plan_recipe_relation_to_swap.meal_plan_id,
+                                             meal_plan_recipe_relation_to_swap.recipe_id, new_recipe_id)
+            meal_plan_recipe_relation_to_swap.recipe_id = new_recipe_id
+            db.session.execute(update(MealPlans)
+                               .where(MealPlans.meal_plan_id == meal_plan_recipe_relation_to_swap.meal_plan_id)
+                               .values(revision=MealPlans.revision + 1))
+            db.session.commit()
 
-        for raw_recipe_ingredient in raw_recipe_ingredients:
-            allergen = self._extract_allergen(raw_recipe_ingredient.ingredient)
-            if allergen:
-                allergens.add(allergen)
+        return self.get_current_meal_plan(current_user, {"start": start_of_week})
 
-        return allergens
+    def _get_recipes_allergens(self, recipe_ids) -> dict[int, frozenset]:
+        """
+        :param recipe_ids: The IDs of the recipes to resolve.
+        :return: A dict mapping each recipe ID to its allergens, resolved with at most one query.
+        """
+        return allergen_index.get_many(recipe_ids)
 
     def format_meal_plan(self, recipe_list, start_date):
 
@@ -128,18 +383,18 @@ class RecipeManager:
             day_date = start_date + timedelta(days=day_idx)
             return day_date.strftime("%Y-%m-%d")
 
-        DAY_PLAN_SIZE: int = 2
-
         meal_plan: list[list] = []
         day_plan: list = []
 
         day_idx: int = 0
 
+        recipes_allergens = self._get_recipes_allergens(recipe['recipe_id'] for recipe in recipe_list)
+
         for recipe in recipe_list:
 
             recipe_id = recipe['recipe_id']
 
-            recipe['allergens'] = list(self._get_recipe_allergen(recipe_id))
+            recipe['allergens'] = list(recipes_allergens[recipe_id])
             recipe['date'] = get_date_of_meal(day_idx)
 
             day_plan.append(recipe)
@@ -151,92 +406,99 @@ class RecipeManager:
 
         return meal_plan
 
+    def get_meal_plan_etag(self, current_user: User, date=None) -> str | None:
+        """
+        :param current_user: The user owning the meal plan.
+        :param date: A dict with the ``start`` date of the plan, the current week when missing.
+        :return: The strong ETag of the meal plan, derived from its revision without loading its recipes.
+                 None if the user has no plan for that week.
+        """
+        start_date = (date or {}).get('start') or self.current_week_date
+        stamp = (db.session.query(MealPlans.meal_plan_id, MealPlans.revision)
+                 .filter(MealPlans.start_date == start_date, MealPlans.user_id == current_user.user_id)
+                 .first())
+        if stamp is None:
+            return None
+        return f'plan-{stamp.meal_plan_id}-{stamp.revision}'
+
     def get_current_meal_plan(self, current_user: User, date=None) -> None | list:
-        start_date = date['start'] if date else self.current_week_date
+        start_date = (date or {}).get('start') or self.current_week_date
         current_meal_plan = MealPlans.query.filter(
             and_(MealPlans.start_date == start_date, MealPlans.user_id == current_user.user_id)).first()
 
         if current_meal_plan is None:
             return None
 
-        meal_plan_recipe_relations = MealPlanRecipe.query.filter(
-            MealPlanRecipe.meal_plan_id == current_meal_plan.meal_plan_id).order_by(MealPlanRecipe.date,
-                                                                                    MealPlanRecipe.meal_plans_recipe_relation_id).all()
+        meal_plan_recipes = (db.session.query(MealPlanRecipe, Recipe)
+                             .join(Recipe, Recipe.recipe_id == MealPlanRecipe.recipe_id)
+                             .filter(MealPlanRecipe.meal_plan_id == current_meal_plan.meal_plan_id)
+                             .order_by(MealPlanRecipe.date, MealPlanRecipe.meal_plans_recipe_relation_id)
+                             .all())
 
-        recipe_list = [meal_plan_recipe_relation.recipe.serialize() for meal_plan_recipe_relation in
-                       meal_plan_recipe_relations]
+        recipe_list = [recipe.serialize() for _, recipe in meal_plan_recipes]
 
         return self.format_meal_plan(recipe_list, current_meal_plan.start_date)
 
-    def generate_meal(self, current_user: User, start_date: str) -> list:
-        MEAL_PLAN_SIZE = 14
-        DAY_PLAN_SIZE = 2
-
-        def delete_meal_plan_recipes(meal_plan_id: int):
-            MealPlanRecipe.query.filter(MealPlanRecipe.meal_plan_id == meal_plan_id).delete()
-            db.session.commit()
-
-        def query_recipes(filter_condition):
-            return Recipe.query.filter(filter_condition).order_by(func.random()).limit(MEAL_PLAN_SIZE).all()
-
-        def check_week_completion(recipes_list: list, meal_plan_size: int) -> list:
-            missing = meal_plan_size - len(recipes_list)
-            if missing > 0:
-                coeff = DAY_PLAN_SIZE / missing
-                for i in range(1, math.ceil(coeff + 1)):
-                    recipes_list += recipes_list
-
-            return recipes_list[:14]
-
-        safe_ingredients = RecipeIngredient.query.join(Ingredient).filter(
-            Ingredient.allergen.notin_(current_user.allergies)).all()
-        recipes_id = {ingredient_relation.recipe_id for ingredient_relation in safe_ingredients}
-        filter_condition = Recipe.recipe_id.in_(recipes_id)
-
-        if current_user.dietaryPreference.lower() != 'flex':
-            filter_condition = and_(Recipe.diet.__eq__(current_user.dietaryPreference), filter_condition)
-
-        random_recipes = query_recipes(filter_condition)
+    def generate_meal(self, current_user: User, start_date: str, mode: str = 'random') -> list:
+        """
+        :param current_user: The user the meal plan is generated for.
+        :param start_date: The first day of the plan, ``YYYY-MM-DD``.
+        :param mode: ``random`` draws the recipes at random, ``optimize`` picks the week closest to the daily
+                     calorie goal of the user and to a balanced macro split.
+        :return: The generated meal plan, by day.
+        :raise ValueError: If the mode or the start date is invalid.
+        """
+        if mode not in GENERATION_MODES:
+            raise ValueError(f'Unknown generation mode: {mode}')
 
-        recipe_list = [recipe.serialize() for recipe in random_recipes]
-        recipe_list_completed = check_week_completion(recipe_list, MEAL_PLAN_SIZE)
+        eligible_recipe_ids = list(
+            self._candidate_pool(current_user.dietaryPreference, current_user.allergies).recipe_ids)
+        if mode == 'optimize':
+            recipe_ids = self._optimize_week(eligible_recipe_ids, current_user.goals)
+        else:
+            recipe_ids = pick_week(eligible_recipe_ids)
+        recipe_list = self._get_recipes(recipe_ids)
 
-        start_date = datetime.strptime(start_date, "%Y-%m-%d")
+        start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_date = start_date + timedelta(days=6)
 
-        meal_plan_to_save = {
-            'user_id': current_user.user_id,
-            'start_date': start_date,
-            'end_date': end_date
-        }
-
-        meal_plan = self.format_meal_plan(recipe_list_completed, start_date)
+        meal_plan = self.format_meal_plan(recipe_list, start_date)
 
-        meal_plan_obj = MealPlans.query.filter(
-            and_(MealPlans.user_id == current_user.user_id, MealPlans.start_date == start_date)).first()
+        try:
+            self._save_meal_plan(current_user.user_id, start_date, end_date,
+                                 [recipe['recipe_id'] for recipe in recipe_list])
+        except Exception:
+            db.session.rollback()
+            raise
 
-        if meal_plan_obj:
-            meal_plan_obj.user_id = current_user.user_id
-            meal_plan_obj.start_date = start_date
-            meal_plan_obj.end_date = end_date
-        else:
-            meal_plan_obj = MealPlans(**meal_plan_to_save)
-            db.session.add(meal_plan_obj)
+        return meal_plan
 
-        db.session.commit()
+    def _save_meal_plan(self, user_id: int, start_date: date, end_date: date, recipe_ids: list) -> int:
+        """
+        Save a week plan in a single transaction: the ``meal_plans`` row is upserted on ``(user_id, start_date)``,
+        bumping its revision, then its recipe relations are replaced with one bulk insert and its outdated
+        shopping list is discarded.
+
+        :param user_id: The ID of the user owning the plan.
+        :param start_date: The first day of the plan.
+        :param end_date: The last day of the plan.
+        :param recipe_ids: The IDs of the recipes of the week, lunch then dinner of each day.
+        :return: The ID of the saved meal plan.
+        """
+        meal_plan_id = db.session.execute(
+            upsert(MealPlans)
+            .values(user_id=user_id, start_date=start_date, end_date=end_date)
+            .on_conflict_do_update(index_elements=['user_id', 'start_date'],
+                                   set_={'end_date': end_date, 'revision': MealPlans.revision + 1})
+            .returning(MealPlans.meal_plan_id)
+        ).scalar_one()
 
-        delete_meal_plan_recipes(meal_plan_obj.meal_plan_id)
-        for day_idx, day in enumerate(meal_plan):
-            day_date = start_date + timedelta(days=day_idx)
+        db.session.execute(delete(MealPlanRecipe).where(MealPlanRecipe.meal_plan_id == meal_plan_id))
+        ShoppingListManager().discard([meal_plan_id])
 
-            for meal_idx, meal in enumerate(day):
-                meal_plan_recipe = MealPlanRecipe(
-                    meal_plan_id=meal_plan_obj.meal_plan_id,
-                    recipe_id=meal['recipe_id'],
-                    mealType='lunch' if meal_idx == 0 else 'dinner',
-                    date=day_date
-                )
-                db.session.add(meal_plan_recipe)
-                db.session.commit()
+        meal_plan_recipes = meal_plan_recipe_rows(meal_plan_id, start_date, recipe_ids)
+        if meal_plan_recipes:
+            db.session.execute(insert(MealPlanRecipe), meal_plan_recipes)
 
-        return meal_plan
+        db.session.commit()
+        return meal_plan_id
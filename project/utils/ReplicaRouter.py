@@ -0,0 +1,199 @@
+import contextvars
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, request
+
+REPLICA_SELECTIONS = ('round_robin', 'least_busy')
+DEFAULT_STICKY_SECONDS = 5.0
+
+
+class ReplicaSet:
+    """
+    The replica engines of one app, by bind key, with the state of their selection and the read-your-writes
+    deadlines of the users. The state is local to the process.
+    """
+    def __init__(self, bind_keys, selection: str = 'round_robin', sticky_seconds: float = DEFAULT_STICKY_SECONDS):
+        if selection not in REPLICA_SELECTIONS:
+            raise ValueError(f"Unknown replica selection {selection}, expected one of {', '.join(REPLICA_SELECTIONS)}")
+        self.bind_keys = tuple(bind_keys)
+        self.selection = selection
+        self.sticky_seconds = sticky_seconds
+        self.in_flight = dict.fromkeys(self.bind_keys, 0)
+        self._turns = itertools.count()
+        self._sticky_until: dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self) -> str:
+        """
+        :return: The bind key of the replica serving the next reader: the next one in turn, or the one with the
+                 fewest readers in flight, ties in turn. Give it back with ``release``.
+        """
+        with self._lock:
+            turn = next(self._turns) % len(self.bind_keys)
+            ordered = self.bind_keys[turn:] + self.bind_keys[:turn]
+            if self.selection == 'least_busy':
+                bind_key = min(ordered, key=self.in_flight.__getitem__)
+            else:
+                bind_key = ordered[0]
+            self.in_flight[bind_key] += 1
+        return bind_key
+
+    def release(self, bind_key: str) -> None:
+        with self._lock:
+            self.in_flight[bind_key] -= 1
+
+    def stick(self, user_id: int) -> None:
+        """
+        Send the reads of the user to the primary for ``sticky_seconds``, the replication lag to cover.
+        """
+        with self._lock:
+            self._sticky_until[user_id] = time.monotonic() + self.sticky_seconds
+
+    def is_sticky(self, user_id: int) -> bool:
+        deadline = self._sticky_until.get(user_id)
+        if deadline is None:
+            return False
+        if deadline <= time.monotonic():
+            with self._lock:
+                if self._sticky_until.get(user_id) == deadline:
+                    del self._sticky_until[user_id]
+            return False
+        return True
+
+
+class ReadRoute:
+    """
+    The routing of the request in progress: whether its SELECT statements may go to a replica, the
+    authenticated user and the replica acquired at the first routed statement.
+    """
+    __slots__ = ('replicas', 'read_only', 'read_your_writes', 'user_id', 'bind_key')
+
+    def __init__(self, replicas: ReplicaSet, read_only: bool, read_your_writes: bool = False):
+        self.replicas = replicas
+        self.read_only = read_only
+        self.read_your_writes = read_your_writes
+        self.user_id = None
+        self.bind_key = None
+
+
+class ReplicaRouter:
+    """
+    Route the reads of the read-only endpoints to replica engines, everything else to the primary.
+
+    The replicas are binds of ``SQLALCHEMY_BINDS`` listed in ``REPLICA_BIND_KEYS``, selected per request
+    ``round_robin`` or ``least_busy`` by ``REPLICA_SELECTION``. Only the SELECT statements of the endpoints
+    marked ``read_only`` are routed, flushes, DML and ``FOR UPDATE`` reads stay on the primary. After a
+    successful request to an endpoint marked ``read_your_writes``, the reads of its user go to the primary
+    for ``REPLICA_STICKY_SECONDS``.
+
+    Nothing is registered for an app without replicas, the session then only pays a context variable lookup.
+    """
+    def __init__(self):
+        self._current = contextvars.ContextVar('replica_route', default=None)
+
+    def init_app(self, app) -> None:
+        bind_keys = app.config.get('REPLICA_BIND_KEYS') or ()
+        if not bind_keys:
+            return
+
+        app.extensions['replica_router'] = ReplicaSet(
+            bind_keys, app.config.get('REPLICA_SELECTION', 'round_robin'),
+            app.config.get('REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS))
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def identify(self, user_id: int) -> None:
+        """
+        Record the authenticated user of the request in progress, whose reads stay on the primary right after
+        a write. Called by the authentication before the user is loaded.
+        """
+        route = self._current.get()
+        if route is not None:
+            route.user_id = int(user_id)
+
+    def route(self, db, engine, clause, flushing: bool):
+        """
+        :param db: The extension of the session.
+        :param engine: The engine the session would use.
+        :param clause: The executed statement, if any.
+        :param flushing: Whether the session is flushing.
+        :return: The engine of the statement, a replica for the reads of a read-only request.
+        """
+        route = self._current.get()
+        if route is None or not route.read_only or flushing:
+            return engine
+        if clause is None or not clause.is_select or getattr(clause, '_for_update_arg', None) is not None:
+            return engine
+        if route.user_id is not None and route.replicas.is_sticky(route.user_id):
+            return engine
+
+        engines = db.engines
+        if engine is not engines[None]:
+            # The statement targets another bind than the primary
+            return engine
+        if route.bind_key is None:
+            route.bind_key = route.replicas.acquire()
+        return engines[route.bind_key]
+
+    @contextmanager
+    def primary(self):
+        """
+        Send the reads of the block to the primary, such as the reads of rows the request has just written.
+        """
+        route = self._current.get()
+        if route is None or not route.read_only:
+            yield
+            return
+
+        route.read_only = False
+        try:
+            yield
+        finally:
+            route.read_only = True
+
+    @contextmanager
+    def reading(self, user_id: int | None = None):
+        """
+        Route the reads of the block to a replica of the current app, outside of a request, such as in commands
+        and benchmarks. Does nothing for an app without replicas.
+        """
+        replicas = current_app.extensions.get('replica_router')
+        if replicas is None:
+            yield
+            return
+
+        route = ReadRoute(replicas, read_only=True)
+        route.user_id = user_id
+        token = self._current.set(route)
+        try:
+            yield
+        finally:
+            self._current.reset(token)
+            if route.bind_key is not None:
+                replicas.release(route.bind_key)
+
+    def _before_request(self) -> None:
+        view = current_app.view_functions.get(request.endpoint)
+        self._current.set(ReadRoute(current_app.extensions['replica_router'],
+                                    getattr(view, '__read_only__', False),
+                                    getattr(view, '__read_your_writes__', False)))
+
+    def _after_request(self, response):
+        route = self._current.get()
+        if route is not None and route.read_your_writes and route.user_id is not None \
+                and response.status_code < 400:
+            route.replicas.stick(route.user_id)
+        return response
+
+    def _teardown_request(self, exception=None) -> None:
+        route = self._current.get()
+        if route is not None and route.bind_key is not None:
+            route.replicas.release(route.bind_key)
+        self._current.set(None)
+
+
+replica_router = ReplicaRouter()
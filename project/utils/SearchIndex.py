@@ -0,0 +1,242 @@
+import heapq
+import logging
+import math
+import threading
+from collections import Counter
+
+from sqlalchemy import inspect
+
+from project.database.database import db
+from project.database.models import Recipe, RecipeIngredient, Ingredient
+from project.utils.AllergenIndex import allergen_index
+from project.utils.IngredientIndex import fold_words, singularize
+
+FIELD_WEIGHTS = {'title': 3.0, 'ingredients': 2.0, 'description': 1.0, 'instructions': 1.0}
+SEARCH_STOP_WORDS = frozenset((
+    'a', 'au', 'aux', 'avec', 'ce', 'ces', 'dans', 'de', 'des', 'du', 'elle', 'en', 'et', 'il', 'la', 'le', 'les',
+    'leur', 'mais', 'ou', 'par', 'pour', 'sa', 'se', 'son', 'sur', 'un', 'une', 'vos', 'votre', 'y',
+))
+
+
+def tokenize(text: str) -> list:
+    """
+    :param text: A French text.
+    :return: Its search terms: case and accent folded, stop words and single letters removed, words singularized.
+    """
+    return [singularize(word) for word in fold_words(text)
+            if (len(word) > 1 or word.isdigit()) and word not in SEARCH_STOP_WORDS]
+
+
+class SearchIndex:
+    """
+    Process-wide inverted index of the recipes, ranked with BM25.
+
+    Documents are made of the title, ingredient names, description and instructions of the recipes, each field
+    weighting its terms with ``FIELD_WEIGHTS``. Postings map each term to the weighted term frequency of every
+    recipe containing it.
+
+    The index is built with two queries, in a background thread started by the first request of the app when
+    ``SEARCH_INDEX_WARM`` is set, or on the first search. Commands and scripts creating the app, which serve no
+    request, never warm it. It is then updated incrementally by ``RecipeManager.save_recipe`` and
+    ``IngredientManager.save_ingredients``. The length normalization of a recipe uses the average length
+    of the documents at the time it was indexed.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, dict[int, float]] = {}
+        self._doc_terms: dict[int, tuple] = {}
+        self._doc_norms: dict[int, float] = {}
+        self._doc_lengths: dict[int, float] = {}
+        self._doc_diets: dict[int, str] = {}
+        self._doc_ingredients: dict[int, frozenset] = {}
+        self._total_length = 0.0
+        self._built = False
+        self._lock = threading.RLock()
+
+    def init_app(self, app) -> None:
+        if not app.config.get('SEARCH_INDEX_WARM'):
+            return
+
+        def warm():
+            try:
+                with app.app_context():
+                    # Nothing to index in a database without its tables yet
+                    if inspect(db.engine).has_table(Recipe.__tablename__):
+                        self.build()
+            except Exception as e:
+                logging.exception(e)
+
+        # Held forever once acquired: the warm starts once per app
+        warm_started = threading.Lock()
+
+        def start_warm():
+            if warm_started.acquire(blocking=False):
+                threading.Thread(target=warm, name='search-index-warm', daemon=True).start()
+
+        app.before_request(start_warm)
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    @staticmethod
+    def _weighted_terms(fields: dict) -> Counter:
+        terms = Counter()
+        for field, text in fields.items():
+            for term in tokenize(text):
+                terms[term] += FIELD_WEIGHTS[field]
+        return terms
+
+    def _norm(self, length: float) -> float:
+        average_length = self._total_length / len(self._doc_lengths) if self._doc_lengths else length
+        return self.k1 * (1 - self.b + self.b * length / (average_length or 1))
+
+    def _remove(self, recipe_id: int) -> None:
+        for term in self._doc_terms.pop(recipe_id, ()):
+            postings = self._postings[term]
+            del postings[recipe_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(recipe_id, 0.0)
+        self._doc_norms.pop(recipe_id, None)
+
+    def _put(self, recipe_id: int, terms: Counter, diet: str | None) -> None:
+        self._remove(recipe_id)
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[recipe_id] = frequency
+        length = float(sum(terms.values()))
+        self._doc_terms[recipe_id] = tuple(terms)
+        self._doc_lengths[recipe_id] = length
+        self._total_length += length
+        self._doc_norms[recipe_id] = self._norm(length)
+        self._doc_diets[recipe_id] = diet
+
+    def load(self, recipes, recipe_ingredients) -> None:
+        """
+        Replace the content of the index.
+
+        :param recipes: The ``(recipe_id, title, description, instructions, diet)`` of the recipes.
+        :param recipe_ingredients: The ``(recipe_id, ingredient name)`` of the recipe ingredients.
+        """
+        ingredients = {}
+        for recipe_id, name in recipe_ingredients:
+            ingredients.setdefault(recipe_id, set()).add(name)
+
+        with self._lock:
+            self._postings, self._doc_terms, self._doc_norms = {}, {}, {}
+            self._doc_lengths, self._doc_diets, self._doc_ingredients = {}, {}, {}
+            self._total_length = 0.0
+            for recipe_id, title, description, instructions, diet in recipes:
+                names = frozenset(ingredients.get(recipe_id, ()))
+                self._doc_ingredients[recipe_id] = names
+                self._put(recipe_id, self._weighted_terms({
+                    'title': title, 'description': description, 'instructions': ' '.join(instructions or []),
+                    'ingredients': ' '.join(names)}), diet)
+            # The lengths of the first recipes were normalized with a partial average
+            for recipe_id, length in self._doc_lengths.items():
+                self._doc_norms[recipe_id] = self._norm(length)
+            self._built = True
+
+    def build(self) -> None:
+        with self._lock:
+            recipes = db.session.query(Recipe.recipe_id, Recipe.title, Recipe.description, Recipe.instructions,
+                                       Recipe.diet).yield_per(1000)
+            recipe_ingredients = (db.session.query(RecipeIngredient.recipe_id, Ingredient.name)
+                                  .join(Ingredient, Ingredient.ingredient_id == RecipeIngredient.ingredient_id)
+                                  .all())
+            self.load(recipes, recipe_ingredients)
+
+    def _ensure_built(self) -> None:
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.build()
+
+    def add_recipe(self, recipe: dict) -> None:
+        """
+        Index a new or updated recipe. Nothing is done before the index is built, the recipe is loaded with it.
+
+        :param recipe: The recipe, with its ``recipe_id``.
+        """
+        with self._lock:
+            if not self._built:
+                return
+            recipe_id = recipe['recipe_id']
+            names = self._doc_ingredients.setdefault(recipe_id, frozenset())
+            self._put(recipe_id, self._weighted_terms({
+                'title': recipe.get('title'), 'description': recipe.get('description'),
+                'instructions': ' '.join(recipe.get('instructions') or []), 'ingredients': ' '.join(names)}),
+                recipe.get('diet'))
+
+    def add_ingredients(self, recipe_id: int, names) -> None:
+        """
+        Index new ingredients of an indexed recipe.
+
+        :param recipe_id: The ID of the recipe.
+        :param names: The names of its ingredients, the ones already indexed are ignored.
+        """
+        with self._lock:
+            if not self._built or recipe_id not in self._doc_terms:
+                return
+            new_names = set(names).difference(self._doc_ingredients.get(recipe_id, ()))
+            if not new_names:
+                return
+
+            terms = Counter({term: self._postings[term][recipe_id] for term in self._doc_terms[recipe_id]})
+            terms.update(self._weighted_terms({'ingredients': ' '.join(new_names)}))
+            self._doc_ingredients[recipe_id] = self._doc_ingredients.get(recipe_id, frozenset()) | new_names
+            self._put(recipe_id, terms, self._doc_diets.get(recipe_id))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._built = False
+
+    def search(self, query: str, diet: str = None, allergies: list = None, limit: int = 20) -> list:
+        """
+        :param query: The searched text.
+        :param diet: The diet the recipes must follow, any diet when None or 'flex'.
+        :param allergies: The allergens the recipes must not contain.
+        :param limit: The maximum number of results.
+        :return: The ``(recipe_id, score)`` of the best matching recipes, best first.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        self._ensure_built()
+
+        any_diet = diet is None or diet.lower() == 'flex'
+        scores = {}
+        with self._lock:
+            document_count = len(self._doc_terms)
+            norms, diets = self._doc_norms, self._doc_diets
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (document_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                weight = idf * (self.k1 + 1)
+                for recipe_id, frequency in postings.items():
+                    if any_diet or diets[recipe_id] == diet:
+                        score = weight * frequency / (frequency + norms[recipe_id])
+                        scores[recipe_id] = scores.get(recipe_id, 0.0) + score
+
+        allergies = {allergy.lower() for allergy in allergies or []}
+        if not allergies:
+            return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+        # Allergens are only resolved for the best candidates, by chunks, until the page is full
+        results = []
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        chunk_size = max(limit * 2, 50)
+        for start in range(0, len(ranked), chunk_size):
+            chunk = ranked[start:start + chunk_size]
+            recipes_allergens = allergen_index.get_many([recipe_id for recipe_id, _ in chunk])
+            for recipe_id, score in chunk:
+                if allergies.isdisjoint(allergen.lower() for allergen in recipes_allergens[recipe_id]):
+                    results.append((recipe_id, score))
+                    if len(results) == limit:
+                        return results
+        return results
+
+
+search_index = SearchIndex()
@@ -0,0 +1,224 @@
+from datetime import date
+
+from sqlalchemy import and_, case, delete, exists, func, insert, literal, select, update
+from sqlalchemy.orm import aliased
+
+from project.database.database import db, upsert
+from project.database.models import (MealPlans, MealPlanRecipe, RecipeIngredient, Ingredient, ShoppingLists,
+                                     ShoppingListItem)
+from project.utils.ReplicaRouter import replica_router
+
+EDITABLE_ITEM_FIELDS = ('quantity', 'unit')
+
+
+class ShoppingListManager:
+    """
+    Shopping lists of the weekly meal plans, one list per plan.
+
+    A list is built with a single ``GROUP BY ingredient_id, unit`` aggregation of the ingredients of the recipes
+    of the week, inserted in bulk with ``INSERT ... SELECT``. It is then maintained incrementally: swapping a meal
+    subtracts the ingredients of the old recipe and adds the ones of the new recipe, see ``apply_swap``.
+    Regenerating a plan discards its list, which is built again on its next read.
+    """
+
+    def find_meal_plan_id(self, user_id: int, start_date: date) -> int | None:
+        return (db.session.query(MealPlans.meal_plan_id)
+                .filter(MealPlans.user_id == user_id, MealPlans.start_date == start_date)
+                .scalar())
+
+    def build(self, user_id: int, meal_plan_id: int) -> int:
+        """
+        Build the shopping list of a meal plan in a single transaction, replacing its items if it already exists.
+
+        :param user_id: The ID of the user owning the meal plan.
+        :param meal_plan_id: The ID of the meal plan.
+        :return: The ID of the shopping list.
+        """
+        try:
+            shopping_list_id = db.session.execute(
+                upsert(ShoppingLists)
+                .values(user_id=user_id, meal_plan_id=meal_plan_id)
+                .on_conflict_do_update(index_elements=['meal_plan_id'], set_={'last_update': func.now()})
+                .returning(ShoppingLists.shopping_list_id)
+            ).scalar_one()
+
+            db.session.execute(delete(ShoppingListItem)
+                               .where(ShoppingListItem.shopping_list_id == shopping_list_id))
+            # Missing quantities count as zero and empty items are left out, like in ``apply_swap``
+            total = func.sum(func.coalesce(RecipeIngredient.quantity, 0))
+            aggregation = (select(literal(shopping_list_id), RecipeIngredient.ingredient_id, total,
+                                  RecipeIngredient.unit)
+                           .join(MealPlanRecipe, MealPlanRecipe.recipe_id == RecipeIngredient.recipe_id)
+                           .where(MealPlanRecipe.meal_plan_id == meal_plan_id)
+                           .group_by(RecipeIngredient.ingredient_id, RecipeIngredient.unit)
+                           .having(total > 0))
+            db.session.execute(insert(ShoppingListItem).from_select(
+                ['shopping_list_id', 'ingredient_id', 'quantity', 'unit'], aggregation))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return shopping_list_id
+
+    def get_shopping_list(self, user_id: int, start_date: date) -> dict | None:
+        """
+        :param user_id: The ID of the user.
+        :param start_date: The first day of the week.
+        :return: The shopping list of the week with its items, built first if needed.
+                 None if the user has no meal plan for that week.
+        """
+        meal_plan_id = self.find_meal_plan_id(user_id, start_date)
+        if meal_plan_id is None:
+            return None
+
+        shopping_list = ShoppingLists.query.filter_by(meal_plan_id=meal_plan_id).first()
+        if shopping_list is None:
+            shopping_list_id = self.build(user_id, meal_plan_id)
+            # The list is not on the replicas yet, when the request reads from one
+            with replica_router.primary():
+                return self._serialize(db.session.get(ShoppingLists, shopping_list_id))
+        return self._serialize(shopping_list)
+
+    def _serialize(self, shopping_list: ShoppingLists) -> dict:
+        items = (db.session.query(ShoppingListItem, Ingredient)
+                 .join(Ingredient, Ingredient.ingredient_id == ShoppingListItem.ingredient_id)
+                 .filter(ShoppingListItem.shopping_list_id == shopping_list.shopping_list_id)
+                 .order_by(Ingredient.category, Ingredient.name)
+                 .all())
+
+        serialized_list = shopping_list.serialize()
+        serialized_list['items'] = []
+        for item, ingredient in items:
+            serialized_item = item.serialize()
+            serialized_item['name'] = ingredient.name
+            serialized_item['category'] = ingredient.category
+            serialized_list['items'].append(serialized_item)
+        return serialized_list
+
+    def apply_swap(self, meal_plan_id: int, old_recipe_id: int, new_recipe_id: int) -> None:
+        """
+        Update the shopping list of a meal plan after a meal swap, in the transaction of the swap.
+        Items whose quantity drops to zero are removed. Nothing is done when the plan has no list yet, or when
+        its list is empty, flushed by the user, who would otherwise get back only the items of the new recipe.
+
+        :param meal_plan_id: The ID of the meal plan.
+        :param old_recipe_id: The ID of the recipe removed from the plan.
+        :param new_recipe_id: The ID of the recipe added to the plan.
+        """
+        shopping_list = (db.session.query(ShoppingLists.shopping_list_id,
+                                          exists().where(ShoppingListItem.shopping_list_id
+                                                         == ShoppingLists.shopping_list_id))
+                         .filter(ShoppingLists.meal_plan_id == meal_plan_id)
+                         .first())
+        if shopping_list is None or old_recipe_id == new_recipe_id:
+            return
+        shopping_list_id, has_items = shopping_list
+        if not has_items:
+            return
+
+        # Net quantity of an ingredient and unit: added by the new recipe, subtracted for the old one
+        quantity = func.coalesce(RecipeIngredient.quantity, 0)
+        delta = func.sum(case((RecipeIngredient.recipe_id == new_recipe_id, quantity), else_=-quantity))
+        swapped = RecipeIngredient.recipe_id.in_([old_recipe_id, new_recipe_id])
+
+        def same_item(item):
+            return and_(RecipeIngredient.ingredient_id == item.ingredient_id,
+                        RecipeIngredient.unit.is_not_distinct_from(item.unit))
+
+        # The deltas are applied in set form, in three statements whatever the number of ingredients
+        in_list = ShoppingListItem.shopping_list_id == shopping_list_id
+        db.session.execute(
+            update(ShoppingListItem)
+            .where(in_list, exists().where(swapped, same_item(ShoppingListItem)))
+            .values(quantity=func.coalesce(ShoppingListItem.quantity, 0)
+                    + select(delta).where(swapped, same_item(ShoppingListItem)).scalar_subquery())
+            .execution_options(synchronize_session=False))
+
+        existing = aliased(ShoppingListItem)
+        db.session.execute(insert(ShoppingListItem).from_select(
+            ['shopping_list_id', 'ingredient_id', 'quantity', 'unit'],
+            select(literal(shopping_list_id), RecipeIngredient.ingredient_id, delta, RecipeIngredient.unit)
+            .where(swapped, ~exists().where(existing.shopping_list_id == shopping_list_id, same_item(existing)))
+            .group_by(RecipeIngredient.ingredient_id, RecipeIngredient.unit)
+            .having(delta > 0)))
+
+        db.session.execute(delete(ShoppingListItem)
+                           .where(in_list, ShoppingListItem.quantity <= 0)
+                           .execution_options(synchronize_session=False))
+        db.session.execute(update(ShoppingLists)
+                           .where(ShoppingLists.shopping_list_id == shopping_list_id)
+                           .values(last_update=func.now()))
+
+    def discard(self, meal_plan_ids: list) -> None:
+        """
+        Delete the shopping lists of meal plans whose recipes are replaced, in the transaction of the caller.
+
+        :param meal_plan_ids: The IDs of the meal plans.
+        """
+        shopping_list_ids = select(ShoppingLists.shopping_list_id).where(ShoppingLists.meal_plan_id.in_(meal_plan_ids))
+        db.session.execute(delete(ShoppingListItem).where(ShoppingListItem.shopping_list_id.in_(shopping_list_ids)))
+        db.session.execute(delete(ShoppingLists).where(ShoppingLists.meal_plan_id.in_(meal_plan_ids)))
+
+    def flush(self, user_id: int, start_date: date) -> bool:
+        """
+        Empty the shopping list of a week.
+
+        :param user_id: The ID of the user.
+        :param start_date: The first day of the week.
+        :return: False if the user has no shopping list for that week.
+        """
+        shopping_list = (ShoppingLists.query.join(MealPlans, MealPlans.meal_plan_id == ShoppingLists.meal_plan_id)
+                         .filter(MealPlans.user_id == user_id, MealPlans.start_date == start_date)
+                         .first())
+        if shopping_list is None:
+            return False
+
+        db.session.execute(delete(ShoppingListItem)
+                           .where(ShoppingListItem.shopping_list_id == shopping_list.shopping_list_id))
+        shopping_list.last_update = func.now()
+        db.session.commit()
+        return True
+
+    def _get_item(self, user_id: int, item_id: int) -> ShoppingListItem | None:
+        return (ShoppingListItem.query
+                .join(ShoppingLists, ShoppingLists.shopping_list_id == ShoppingListItem.shopping_list_id)
+                .filter(ShoppingListItem.shopping_list_item_id == item_id, ShoppingLists.user_id == user_id)
+                .first())
+
+    def update_item(self, user_id: int, item_id: int, values: dict) -> dict | None:
+        """
+        :param user_id: The ID of the user owning the item.
+        :param item_id: The ID of the shopping list item.
+        :param values: The new ``quantity`` and/or ``unit`` of the item.
+        :return: The updated item, None if the user has no such item.
+        :raise ValueError: If a value is not editable or the quantity is not a positive number.
+        """
+        unknown_fields = set(values).difference(EDITABLE_ITEM_FIELDS)
+        if unknown_fields:
+            raise ValueError(f'Not editable fields: {", ".join(sorted(unknown_fields))}')
+        quantity = values.get('quantity', 1)
+        if isinstance(quantity, bool) or not isinstance(quantity, (int, float)) or quantity <= 0:
+            raise ValueError('The quantity must be a positive number')
+
+        item = self._get_item(user_id, item_id)
+        if item is None:
+            return None
+
+        for field, value in values.items():
+            setattr(item, field, value)
+        db.session.commit()
+        return item.serialize()
+
+    def delete_item(self, user_id: int, item_id: int) -> bool:
+        """
+        :param user_id: The ID of the user owning the item.
+        :param item_id: The ID of the shopping list item.
+        :return: False if the user has no such item.
+        """
+        item = self._get_item(user_id, item_id)
+        if item is None:
+            return False
+
+        db.session.delete(item)
+        db.session.commit()
+        return True
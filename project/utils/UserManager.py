@@ -1,6 +1,8 @@
 from datetime import datetime, timezone, timedelta
 
 import jwt
+from flask import g, has_app_context
+from sqlalchemy import update, case, or_, and_
 
 from project.database.database import db
 from project.database.models import User
@@ -71,10 +73,28 @@ class UserManager:
             Returns:
                 str: The decoded user ID if the token is valid, otherwise an error message indicating the reason for the
                      invalid token.
+
+        debit_tokens(self, user_id: int, cost: int) -> bool
+            Atomically debits action tokens from a user, refilling the allowance first when the refill period is over.
+
+            Parameters:
+                user_id (int): The ID of the user.
+                cost (int): The number of tokens to debit.
+
+            Returns:
+                bool: True if the tokens have been debited, False if the user does not have enough tokens.
+
+        refund_tokens(self, user_id: int, cost: int)
+            Gives back debited action tokens to a user.
+
+            Parameters:
+                user_id (int): The ID of the user.
+                cost (int): The number of tokens to give back.
     """
     def __init__(self, app):
         self.SECRET_KEY = app.config['SECRET_KEY']
-        pass
+        self.token_allowance = app.config.get('ACTION_TOKEN_ALLOWANCE', 10)
+        self.token_refill_period = timedelta(days=app.config.get('ACTION_TOKEN_REFILL_DAYS', 7))
 
     def isExist(self, email: str) -> float:
         try:
@@ -99,7 +119,7 @@ class UserManager:
     def add_user(self, user: dict):
         user_to_save = user.copy()
         del user_to_save['password']
-        user_to_save['tokenCount'] = 10
+        user_to_save['tokenCount'] = self.token_allowance
         user['user_id'] = self.isExist(user_to_save.get('email'))
         if user['user_id'] == -1:
             new_user = User(**user_to_save)
@@ -119,7 +139,17 @@ class UserManager:
         return jwt.encode(payload, self.SECRET_KEY, algorithm='HS256')
 
     def get_current_user(self, user_id) -> User:
-        return User.query.get(user_id)
+        """
+        Load a user at most once per request: the row is kept in the request context once loaded.
+        """
+        if not has_app_context():
+            return db.session.get(User, user_id)
+
+        current_user = g.get('current_user')
+        if current_user is None or current_user.user_id != int(user_id):
+            current_user = db.session.get(User, user_id)
+            g.current_user = current_user
+        return current_user
 
 
     @staticmethod
@@ -130,4 +160,25 @@ class UserManager:
         except jwt.ExpiredSignatureError:
             return 'Token expired. Please log in again.'
         except jwt.InvalidTokenError:
-            return 'Invalid token. Please log in again.'
\ No newline at end of file
+            return 'Invalid token. Please log in again.'
+
+    def debit_tokens(self, user_id: int, cost: int) -> bool:
+        # A single conditional UPDATE, run on its own connection so the row lock is released right away
+        now = datetime.now()
+        refill_due = or_(User.lastTokenReset.is_(None), User.lastTokenReset <= now - self.token_refill_period)
+        statement = (
+            update(User)
+            .where(User.user_id == user_id)
+            .where(or_(User.tokenCount >= cost, and_(refill_due, self.token_allowance >= cost)))
+            .values(
+                tokenCount=case((refill_due, self.token_allowance - cost), else_=User.tokenCount - cost),
+                lastTokenReset=case((refill_due, now), else_=User.lastTokenReset)
+            )
+        )
+        with db.engine.begin() as connection:
+            return connection.execute(statement).rowcount == 1
+
+    def refund_tokens(self, user_id: int, cost: int) -> None:
+        statement = update(User).where(User.user_id == user_id).values(tokenCount=User.tokenCount + cost)
+        with db.engine.begin() as connection:
+            connection.execute(statement)
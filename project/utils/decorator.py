@@ -1,12 +1,14 @@
 import json
 import logging
+from datetime import datetime, timezone
 from functools import wraps
 
 import jwt
 from flask import request, current_app, Response
 
-from project.database.database import db
-from project.database.models import User, Log
+from project.utils.LogSink import log_sink
+from project.utils.PrincipalCache import principal_cache, Principal
+from project.utils.ReplicaRouter import replica_router
 from project.utils.UserManager import UserManager
 
 
@@ -14,6 +16,10 @@ def token_required(f):
     """
     Decorator method for token authentication.
 
+    The endpoint gets the ``Principal`` of the authenticated user, whether it is cached or not. The user is
+    loaded at most once per request, and not at all when its principal is cached, endpoints needing the full
+    row call ``UserManager.get_current_user``.
+
     :param f: The function to be decorated.
     :return: The decorated function.
     """
@@ -36,7 +42,13 @@ def token_required(f):
 
         try:
             data = jwt.decode(token, current_app.config["SECRET_KEY"], algorithms=["HS256"])
-            current_user = User.query.filter_by(user_id=data["user_id"]).first()
+            replica_router.identify(data["user_id"])
+            current_user = principal_cache.get(data["user_id"])
+            if current_user is None:
+                user = UserManager(current_app).get_current_user(data["user_id"])
+                if user is not None:
+                    current_user = Principal.from_user(user)
+                    principal_cache.put(current_user)
             if current_user is None:
                 return {
                     "message": "Invalid Authentication token!",
@@ -45,8 +57,7 @@ def token_required(f):
                 }, 401
 
         except Exception as e:
-            print(e)
-            logging.error(e)
+            logging.exception(e)
             return {
                 "message": "Something went wrong",
                 "data": None,
@@ -76,67 +87,121 @@ def log_endpoint_access(f):
         return jsonify({'message': 'Endpoint accessed successfully'})
     ```
 
-    When the `example_endpoint` function is called, the `log_endpoint_access` decorator will log information about the access and store it in the database.
+    When the `example_endpoint` function is called, the `log_endpoint_access` decorator will log information about the access and hand it to the `log_sink`, which stores it in the database.
+    The response of the endpoint is returned untouched, headers included, so endpoints can answer conditional requests.
+    The endpoint arguments are the URL parameters, plus the JSON body, or the query string of a GET request,
+    which can not override the URL parameters.
 
-    Note: Make sure that the `db` object is properly configured and imported before using the `log_endpoint_access` decorator.
+    Note: Make sure that the `log_sink` object is initialized with the app before using the `log_endpoint_access` decorator.
 
     """
     @wraps(f)
     def decorated(*args, **kwargs):
         args_repr = [a for a in args]
-        endpoint_data = request.json if request.method != "GET" else {}
+        if request.method == "GET":
+            endpoint_data = request.args.to_dict()
+        else:
+            endpoint_data = request.get_json(silent=True) or {}
         log_data = {
-            'user': args_repr[0],
+            'user_id': args_repr[0].user_id,
             'url': request.url,
             'method': request.method,
-            'args': json.dumps(endpoint_data)
+            'args': json.dumps(endpoint_data),
+            'timestamp': datetime.now(timezone.utc)
         }
 
-        kwargs_dict = {}
-        for k, v in kwargs.items():
-            kwargs_dict[k] = v
-
-        kwargs_dict.update(endpoint_data)
+        # The URL parameters win over the body and the query string
+        kwargs_dict = {**endpoint_data, **kwargs}
         try:
             result = f(args_repr[0], kwargs_dict)
-            result_data = result.data
-            log_data["status_code"] = json.dumps(result.status_code)
+            log_data["status_code"] = result.status_code
         except Exception as e:
             logging.exception(e)
-            result_data = {'error': 500}
+            result = Response(
+                json.dumps({'error': 500}), status=500, mimetype='application/json'
+            )
             log_data["status_code"] = 500
 
-        new_log = Log(**log_data)
-        db.session.add(new_log)
-        db.session.commit()
-
-        result_data = json.dumps(result_data) if isinstance(result_data, dict) else result_data
-        return Response(
-            result_data, status=log_data["status_code"], mimetype='application/json'
-        )
+        log_sink.emit(log_data)
+        return result
 
     return decorated
 
 def pay_action_cost(cost):
+    """
+    Decorator debiting ``cost`` action tokens from the current user before calling the endpoint.
 
+    The debit is a single conditional UPDATE, so concurrent calls can not overspend. The tokens are refunded
+    when the endpoint raises or answers with a server error.
+
+    :param cost: The number of action tokens the endpoint costs.
+    :return: The decorator.
+    """
     def decorator(func):
         @wraps(func)
         def wrapper_pay_action_cost(*args, **kwargs):
 
             sign_user = args[0]
-            user = User.query.filter(User.user_id == sign_user.user_id).first()
-            if user is None:
-                return Response(
-                    json.dumps({'error': 'User does not exist'}), status=404, mimetype='application/json'
-                )
-            current_token = user.tokenCount
-            if current_token >= cost:
-                user.tokenCount -= cost
-
+            if cost <= 0:
                 return func(*args, **kwargs)
-            else:
+
+            user_mgt = UserManager(current_app)
+            if not user_mgt.debit_tokens(sign_user.user_id, cost):
+                if user_mgt.get_current_user(sign_user.user_id) is None:
+                    return Response(
+                        json.dumps({'error': 'User does not exist'}), status=404, mimetype='application/json'
+                    )
                 return Response(
                     json.dumps({'error':'No more action token available'}), status=403, mimetype='application/json'
                 )
+
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                user_mgt.refund_tokens(sign_user.user_id, cost)
+                raise
+
+            if result.status_code >= 500:
+                user_mgt.refund_tokens(sign_user.user_id, cost)
+            return result
         return wrapper_pay_action_cost
     return decorator
+
+
+def query_budget(statements: int):
+    """
+    Declare the maximum number of SQL statements an endpoint may issue per request, authentication and access
+    log included, with a cold catalog cache. Nothing is checked at runtime: ``tests/test_query_budgets.py``
+    calls every endpoint and fails when one goes over its budget.
+
+    Apply it right under the route decorator.
+
+    :param statements: The budget of the endpoint.
+    :return: The decorator.
+    """
+    def decorator(func):
+        func.__query_budget__ = statements
+        return func
+    return decorator
+
+
+def read_only(func):
+    """
+    Mark an endpoint as read only: with replicas configured, its reads are served by a replica, unless its user
+    has just written through a ``read_your_writes`` endpoint. Writes, if any, still go to the primary.
+
+    Apply it right under the route decorator.
+    """
+    func.__read_only__ = True
+    return func
+
+
+def read_your_writes(func):
+    """
+    Mark an endpoint whose writes its user expects to read right after: the reads of the user go to the
+    primary for ``REPLICA_STICKY_SECONDS`` after a successful request.
+
+    Apply it right under the route decorator.
+    """
+    func.__read_your_writes__ = True
+    return func
@@ -1,11 +1,17 @@
 import json
 import os, pytest
+import re
+from collections import Counter
+from contextlib import contextmanager
 
 
 from dotenv import load_dotenv
-from sqlalchemy import func
+from sqlalchemy import func, event
+
+os.environ.setdefault('LOG_SINK_MODE', 'sync')
 
 from project.app import app
+from project.database.database import db
 from project.database.models import User
 
 load_dotenv()
@@ -44,3 +50,68 @@ def authentication_header(client, user, user_good_password):
     data = json.loads(response.data)
     token = data['jwtoken']
     return {"authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def app_context():
+    with app.app_context():
+        yield
+
+@pytest.fixture
+def count_queries():
+    """
+    Yield a context manager collecting the SQL statements issued on the app engine while it is open.
+    """
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    with app.app_context():
+        engine = db.engine
+    return counter
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    :param statement: A SQL statement.
+    :return: The statement with its literals and bound parameters replaced by ``?``, and ``IN`` lists collapsed,
+             so that the statements of a N+1 pattern are equal.
+    """
+    statement = re.sub(r"'(?:[^']|'')*'", '?', statement)
+    statement = re.sub(r'%\(\w+\)s|\b\d+(?:\.\d+)?\b', '?', statement)
+    statement = re.sub(r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(?)', statement)
+    return ' '.join(statement.split())
+
+
+def query_report(statements: list) -> str:
+    """
+    :param statements: The SQL statements issued.
+    :return: The statements grouped by normalized SQL, most repeated first.
+    """
+    groups = Counter(normalize_sql(statement) for statement in statements)
+    return '\n'.join(f'{count:4d} x {statement[:300]}' for statement, count in groups.most_common())
+
+
+@pytest.fixture
+def query_budget(count_queries):
+    """
+    Yield a context manager failing the test when more than ``budget`` SQL statements are issued while it is
+    open, with the statements grouped by normalized SQL.
+    """
+    @contextmanager
+    def guard(budget: int, label: str = 'block'):
+        with count_queries() as statements:
+            yield statements
+        if len(statements) > budget:
+            pytest.fail(f'{label} issued {len(statements)} SQL statements, over its budget of {budget}:\n'
+                        f'{query_report(statements)}', pytrace=False)
+
+    return guard
@@ -0,0 +1,62 @@
+import threading
+from datetime import datetime, timedelta
+
+from project.app import app
+from project.database.database import db
+from project.database.models import User
+from project.utils.UserManager import UserManager
+
+
+def set_tokens(user_id: int, token_count: int, last_token_reset: datetime) -> None:
+    user_db = db.session.get(User, user_id)
+    user_db.tokenCount = token_count
+    user_db.lastTokenReset = last_token_reset
+    db.session.commit()
+
+
+def get_token_count(user_id: int) -> int:
+    db.session.expire_all()
+    return db.session.get(User, user_id).tokenCount
+
+
+def test_concurrent_debits_never_overspend(app_context, user):
+    TOKEN_COUNT = 10
+    THREAD_COUNT = 40
+    current_token_count = user.tokenCount
+    set_tokens(user.user_id, TOKEN_COUNT, datetime.now())
+
+    debits = []
+    barrier = threading.Barrier(THREAD_COUNT)
+
+    def debit():
+        with app.app_context():
+            barrier.wait()
+            debits.append(UserManager(app).debit_tokens(user.user_id, 1))
+
+    threads = [threading.Thread(target=debit) for _ in range(THREAD_COUNT)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert debits.count(True) == TOKEN_COUNT
+    assert get_token_count(user.user_id) == 0
+
+    set_tokens(user.user_id, current_token_count, datetime.now())
+
+
+def test_debit_refills_allowance_lazily(app_context, user):
+    current_token_count = user.tokenCount
+    user_mgt = UserManager(app)
+    set_tokens(user.user_id, 0, datetime.now())
+    assert user_mgt.debit_tokens(user.user_id, 1) is False
+
+    set_tokens(user.user_id, 0, datetime.now() - user_mgt.token_refill_period - timedelta(minutes=1))
+    assert user_mgt.debit_tokens(user.user_id, 1) is True
+    assert get_token_count(user.user_id) == user_mgt.token_allowance - 1
+    assert user_mgt.debit_tokens(user.user_id, user_mgt.token_allowance) is False
+
+    user_mgt.refund_tokens(user.user_id, 1)
+    assert get_token_count(user.user_id) == user_mgt.token_allowance
+
+    set_tokens(user.user_id, current_token_count, datetime.now())
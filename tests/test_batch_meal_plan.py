@@ -0,0 +1,26 @@
+from datetime import date
+
+from project.database.models import User, MealPlans, MealPlanRecipe
+from project.utils.BatchMealPlanner import BatchMealPlanner
+from project.utils.RecipeManager import RecipeManager
+
+
+def test_batch_meal_planner_resumes_by_user_range(app_context):
+    start_date = date(2030, 1, 7)
+    user_ids = [user_id for user_id, in User.query.with_entities(User.user_id).order_by(User.user_id).limit(6)]
+    middle = user_ids[len(user_ids) // 2]
+
+    first_run = BatchMealPlanner(start_date, batch_size=2, seed=7).run(user_ids[0], middle - 1)
+    second_run = BatchMealPlanner(start_date, batch_size=2, seed=7).run(middle, user_ids[-1])
+
+    assert first_run['users'] + second_run['users'] == len(user_ids)
+    assert second_run['last_user_id'] == user_ids[-1]
+
+    meal_plans = MealPlans.query.filter(MealPlans.start_date == start_date, MealPlans.user_id.in_(user_ids)).all()
+    assert len(meal_plans) == first_run['plans'] + second_run['plans']
+    for meal_plan in meal_plans:
+        meal_plan_recipes = MealPlanRecipe.query.filter_by(meal_plan_id=meal_plan.meal_plan_id).all()
+        assert len(meal_plan_recipes) == 14
+        user = User.query.get(meal_plan.user_id)
+        eligible_recipe_ids = RecipeManager()._eligible_recipe_ids(user.dietaryPreference, user.allergies)
+        assert {relation.recipe_id for relation in meal_plan_recipes} <= set(eligible_recipe_ids)
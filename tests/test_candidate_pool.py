@@ -0,0 +1,31 @@
+import random
+
+from project.utils.CandidatePool import CandidatePool
+from project.utils.RecipeManager import RecipeManager
+
+
+def test_candidate_pool_sample_excludes():
+    pool = CandidatePool(range(20))
+    rng = random.Random(0)
+
+    assert all(pool.sample(exclude=set(range(19)), rng=rng) == 19 for _ in range(20))
+    assert pool.sample(exclude=set(range(20)), rng=rng) is None
+    assert CandidatePool([]).sample() is None
+
+
+def test_swap_recipe_respects_profile_and_week(app_context, user, count_queries):
+    recipe_mgt = RecipeManager()
+    meal_plan = recipe_mgt.generate_meal(user, recipe_mgt.current_week_date.isoformat())
+    meal = meal_plan[3][1]
+    week_recipe_ids = {planned['recipe_id'] for day_plan in meal_plan for planned in day_plan}
+    eligible_recipe_ids = set(recipe_mgt._eligible_recipe_ids(user.dietaryPreference, user.allergies))
+
+    with count_queries() as statements:
+        new_meal_plan = recipe_mgt.swap_recipe(meal['recipe_id'], meal['date'], user)
+
+    new_recipe_id = new_meal_plan[3][1]['recipe_id']
+    assert new_recipe_id in eligible_recipe_ids
+    if len(eligible_recipe_ids) > len(week_recipe_ids):
+        assert new_recipe_id not in week_recipe_ids
+    assert len([statement for statement in statements if 'recipe_ingredient' in statement]) == 0
+    assert recipe_mgt.swap_recipe(-1, meal['date'], user) is None
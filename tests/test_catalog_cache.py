@@ -0,0 +1,55 @@
+from project.utils.CatalogCache import CatalogCache, catalog_cache
+from project.utils.RecipeManager import RecipeManager
+
+
+def test_catalog_cache_read_through():
+    cache = CatalogCache(maxsize=8)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return {'recipe_id': 1}
+
+    assert cache.get(('recipe', 1), loader) == {'recipe_id': 1}
+    assert cache.get(('recipe', 1), loader) == {'recipe_id': 1}
+    assert len(loads) == 1
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_catalog_cache_lru_eviction():
+    cache = CatalogCache(maxsize=2)
+    cache.get(('recipe', 1), lambda: 1)
+    cache.get(('recipe', 2), lambda: 2)
+    cache.get(('recipe', 1), lambda: 1)
+    cache.get(('recipe', 3), lambda: 3)
+
+    assert cache.get(('recipe', 1), lambda: -1) == 1
+    assert cache.get(('recipe', 2), lambda: -2) == -2
+    assert cache.stats()['evictions'] == 2
+
+
+def test_catalog_cache_version_bump():
+    cache = CatalogCache()
+    cache.get_many([('recipe', 1), ('recipe', 2)], lambda keys: {key: key[1] for key in keys})
+    version = cache.bump()
+
+    assert version == 1
+    assert cache.stats()['size'] == 0
+    assert cache.get(('recipe', 1), lambda: 'reloaded') == 'reloaded'
+
+
+def test_catalog_cache_removes_recipe_queries(app_context, user, count_queries):
+    recipe_mgt = RecipeManager()
+    catalog_cache.bump()
+    recipe_mgt.generate_meal(user, recipe_mgt.current_week_date.isoformat())
+    recipe_id = recipe_mgt.get_current_meal_plan(user)[0][0]['recipe_id']
+    recipe_mgt.get_recipe_by_id(recipe_id)
+    recipe_mgt.list_recipe_by_diet(user.dietaryPreference)
+
+    with count_queries() as statements:
+        recipe_mgt.get_recipe_by_id(recipe_id)
+        recipe_mgt.list_recipe_by_diet(user.dietaryPreference)
+        recipe_mgt._eligible_recipe_ids(user.dietaryPreference, user.allergies)
+
+    assert statements == []
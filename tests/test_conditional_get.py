@@ -0,0 +1,50 @@
+from project.app import app
+from project.database.models import RecipeIngredient
+from project.utils.RecipeManager import RecipeManager
+
+
+def test_recipe_not_modified(client, authentication_header):
+    with app.app_context():
+        recipe_id = RecipeIngredient.query.first().recipe_id
+
+    response = client.get(f'/recipe/id/{recipe_id}', headers=authentication_header)
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+    assert 'max-age' in response.headers['Cache-Control']
+
+    response = client.get(f'/recipe/id/{recipe_id}', headers={**authentication_header, 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+
+def test_meal_plan_etag_changes_with_revision(client, user, authentication_header):
+    recipe_mgt = RecipeManager()
+    with app.app_context():
+        recipe_mgt.generate_meal(user, recipe_mgt.current_week_date.isoformat())
+
+    response = client.get('/meal/plan', headers=authentication_header)
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+    assert len(response.json) == 7
+
+    response = client.get('/meal/plan', headers={**authentication_header, 'If-None-Match': etag})
+    assert response.status_code == 304
+
+    with app.app_context():
+        recipe_mgt.generate_meal(user, recipe_mgt.current_week_date.isoformat())
+
+    response = client.get('/meal/plan', headers={**authentication_header, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_query_string_does_not_override_url_parameters(client, authentication_header):
+    with app.app_context():
+        recipe_id = RecipeIngredient.query.first().recipe_id
+
+    response = client.get(f'/recipe/id/{recipe_id}', headers=authentication_header)
+    overridden = client.get(f'/recipe/id/{recipe_id}?recipe_id=abc', headers=authentication_header)
+
+    assert overridden.status_code == 200
+    assert overridden.headers['ETag'] == response.headers['ETag']
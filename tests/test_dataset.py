@@ -0,0 +1,31 @@
+from collections import Counter
+from datetime import date
+
+from benchmarks.dataset import generate_dataset
+from project.database.models import User, Recipe, RecipeIngredient, MealPlans
+
+
+def test_dataset_is_deterministic():
+    first = generate_dataset(users=50, recipes=100, ingredients=80, seed=3, today=date(2026, 10, 14))
+    second = generate_dataset(users=50, recipes=100, ingredients=80, seed=3, today=date(2026, 10, 14))
+    other = generate_dataset(users=50, recipes=100, ingredients=80, seed=4, today=date(2026, 10, 14))
+
+    assert first == second
+    assert first[RecipeIngredient] != other[RecipeIngredient]
+
+
+def test_dataset_distributions():
+    dataset = generate_dataset(users=500, recipes=1000, ingredients=300, weeks=2, seed=0,
+                               today=date(2026, 10, 14))
+
+    ingredient_counts = Counter(row['recipe'] for row in dataset[RecipeIngredient])
+    assert min(ingredient_counts.values()) >= 3 and max(ingredient_counts.values()) <= 20
+    popularity = Counter(row['ingredient'] for row in dataset[RecipeIngredient])
+    assert popularity[0] > 10 * popularity.get(299, 1)
+
+    assert Counter(row['dietaryPreference'] for row in dataset[User]).most_common(1)[0][0] == 'flex'
+    assert sum(not row['allergies'] for row in dataset[User]) > len(dataset[User]) / 2
+    assert all(150 <= row['calories'] <= 1500 for row in dataset[Recipe])
+
+    assert len(dataset[MealPlans]) == 1000
+    assert {row['start_date'] for row in dataset[MealPlans]} == {date(2026, 10, 12), date(2026, 10, 5)}
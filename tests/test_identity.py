@@ -0,0 +1,61 @@
+import json
+import re
+
+from project.app import app
+from project.utils.PrincipalCache import Principal, principal_cache
+from project.utils.decorator import token_required
+
+# "user" is quoted on PostgreSQL, where it is a reserved word, not on SQLite
+USER_SELECT = re.compile(r'^\s*SELECT\b.*\bFROM\s+"?user"?(\s|$)', re.IGNORECASE | re.DOTALL)
+
+
+def count_user_selects(statements: list) -> int:
+    return sum(1 for statement in statements if USER_SELECT.match(statement))
+
+
+def test_count_user_selects_matches_both_quoting_styles():
+    statements = ['SELECT "user".user_id FROM "user" WHERE "user".user_id = %(pk_1)s',
+                  'SELECT user.user_id FROM user WHERE user.user_id = ?',
+                  'SELECT logs.log_id FROM logs JOIN user_goals ON 1 = 1',
+                  'INSERT INTO logs (user_id) VALUES (?)']
+    assert count_user_selects(statements) == 2
+
+
+def test_user_loaded_once_per_request(client, authentication_header, count_queries):
+    with count_queries() as statements:
+        response = client.post('/meal/plan', headers=authentication_header, json={})
+
+    assert response.status_code == 200
+    assert count_user_selects(statements) == 1
+
+
+def test_principal_cache_skips_user_select(client, user, authentication_header, count_queries):
+    principal_cache.ttl = 60
+    try:
+        client.get('/user/me', headers=authentication_header)
+        with count_queries() as statements:
+            response = client.get('/recipe/diet', headers=authentication_header,
+                                  query_string={'filter': user.dietaryPreference})
+    finally:
+        principal_cache.ttl = 0
+        principal_cache.invalidate()
+
+    assert response.status_code == 200
+    assert isinstance(json.loads(response.data), list)
+    assert count_user_selects(statements) == 0
+
+
+def test_endpoints_get_a_principal_with_a_cold_or_warm_cache(authentication_header):
+    endpoint = token_required(lambda current_user: current_user)
+    principal_cache.ttl = 60
+    try:
+        with app.test_request_context(headers=authentication_header):
+            cold = endpoint()
+        with app.test_request_context(headers=authentication_header):
+            warm = endpoint()
+    finally:
+        principal_cache.ttl = 0
+        principal_cache.invalidate()
+
+    assert type(cold) is Principal and type(warm) is Principal
+    assert warm is cold
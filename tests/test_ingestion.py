@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from project.utils.IngestionPipeline import RecipeIngestionPipeline, CompletionBackend, FakeCompletionBackend, load_prompt, read_prompt
+
+
+def test_ingestion_pipeline_runs_completions_concurrently():
+    latency = 0.05
+    ideas = [{'name': f'Salade {idx}', 'type': 'végétarien'} for idx in range(20)]
+    pipeline = RecipeIngestionPipeline(FakeCompletionBackend(latency=latency), max_workers=10)
+
+    start = time.perf_counter()
+    recipes = pipeline.run(ideas, writer=lambda recipe: recipe)
+    elapsed = time.perf_counter() - start
+
+    assert len(recipes) == len(ideas)
+    assert len({recipe['title'] for recipe in recipes}) == len(ideas)
+    assert elapsed < latency * len(ideas) / 2
+    assert pipeline.errors == 0
+
+
+def test_ingestion_pipeline_skips_bad_completions():
+    class BrokenBackend(FakeCompletionBackend):
+        def complete(self, prompt: str) -> str:
+            return 'not json' if 'Cassée' in prompt else super().complete(prompt)
+
+    ideas = [{'name': 'Soupe', 'type': 'vegan'}, {'name': 'Cassée', 'type': 'vegan'}]
+    pipeline = RecipeIngestionPipeline(BrokenBackend(), max_workers=2)
+
+    assert len(pipeline.run(ideas, writer=lambda recipe: recipe)) == 1
+    assert pipeline.errors == 1
+
+
+def test_recipe_prompt_template_matches_plain_replacement():
+    pipeline = RecipeIngestionPipeline(FakeCompletionBackend())
+    text = read_prompt('recipeGenerationJson.prompt')
+
+    assert load_prompt('recipeGenerationJson.prompt') is pipeline.prompt
+    assert pipeline.build_prompt({'name': 'Dahl {corail}', 'type': 'vegan'}) == \
+        text.replace('{recipe_name}', 'Dahl {corail}').replace('{diet_type}', 'vegan')
+
+
+def test_completion_backend_must_implement_complete():
+    class IncompleteBackend(CompletionBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteBackend()
@@ -0,0 +1,113 @@
+import uuid
+
+from project.database.database import db
+from project.database.models import Recipe, RecipeIngredient, Ingredient, ShoppingLists, ShoppingListItem, User
+from project.utils.IngredientIndex import IngredientIndex, ingredient_index, normalize_ingredient_name
+from project.utils.IngredientManager import IngredientManager
+
+SAVE_INGREDIENTS_QUERY_BUDGET = 4
+
+
+def test_save_ingredients_bulk(app_context, count_queries):
+    ingredient_mgt = IngredientManager()
+    recipe = Recipe.query.order_by(Recipe.recipe_id).first()
+    suffix = uuid.uuid4().hex[:8]
+    ingredients = [{'name': f'ingredient {suffix} {idx}', 'category': 'test', 'quantity': idx, 'unit': 'g'}
+                   for idx in range(12)]
+    ingredient_index.get('warm')
+
+    with count_queries() as statements:
+        assert ingredient_mgt.save_ingredients(recipe.recipe_id, ingredients) is True
+
+    assert len(statements) <= SAVE_INGREDIENTS_QUERY_BUDGET
+    ingredient_ids = {ingredient['ingredient_id'] for ingredient in ingredients}
+    relations = RecipeIngredient.query.filter(RecipeIngredient.recipe_id == recipe.recipe_id,
+                                              RecipeIngredient.ingredient_id.in_(ingredient_ids)).all()
+    assert len(relations) == 12
+
+    with count_queries() as statements:
+        assert ingredient_mgt.save_ingredients(recipe.recipe_id, [dict(ingredient) for ingredient in ingredients])
+
+    assert not any(statement.lstrip().upper().startswith('INSERT INTO INGREDIENT') for statement in statements)
+
+
+def test_save_ingredients_maps_name_variants(app_context):
+    ingredient_mgt = IngredientManager()
+    recipe = Recipe.query.order_by(Recipe.recipe_id).first()
+    suffix = uuid.uuid4().hex[:8]
+    ingredient_mgt.save_ingredients(recipe.recipe_id, [{'name': f'Tomate cerise {suffix}', 'quantity': 1}])
+    ingredient_id = ingredient_index.get(f'Tomate cerise {suffix}')
+
+    variants = [{'Name': f'tomates cerises {suffix}', 'Quantity': 2, 'unit': 'g'},
+                {'name': f'Tomates Cerises {suffix}', 'quantity': 3}]
+    assert ingredient_mgt.save_ingredients(recipe.recipe_id, variants) is True
+    assert [ingredient['ingredient_id'] for ingredient in variants] == [ingredient_id, ingredient_id]
+    assert Ingredient.query.filter(Ingredient.name.ilike(f'%{suffix}%')).count() == 1
+    assert RecipeIngredient.query.filter_by(recipe_id=recipe.recipe_id, ingredient_id=ingredient_id,
+                                            quantity=2).count() == 1
+
+
+def test_fuzzy_match_keeps_qualifier_words():
+    # A threshold low enough for the names to match on their trigrams alone
+    index = IngredientIndex(threshold=0.7)
+    index.load([('farine sans gluten', 1)])
+
+    assert normalize_ingredient_name('Farines sans gluten') == 'farine sans gluten'
+    assert index.match('farine de gluten') is None
+    assert index.match('farine au gluten') is None
+    assert index.match('farine sans gluten bio') == 1
+
+
+def test_merge_duplicated_ingredients(app_context):
+    ingredient_mgt = IngredientManager()
+    recipe = Recipe.query.order_by(Recipe.recipe_id).first()
+    suffix = uuid.uuid4().hex[:8]
+    ingredients = [Ingredient(name=f'Poireau {suffix}'), Ingredient(name=f'poireaux {suffix}', allergen='Test')]
+    db.session.add_all(ingredients)
+    db.session.commit()
+    db.session.add(RecipeIngredient(recipe_id=recipe.recipe_id, ingredient_id=ingredients[1].ingredient_id))
+    db.session.commit()
+    canonical_id, duplicate_id = ingredients[0].ingredient_id, ingredients[1].ingredient_id
+
+    duplicates = ingredient_mgt.find_duplicates()
+    assert duplicates[canonical_id] == [duplicate_id]
+    assert ingredient_mgt.merge_duplicates({canonical_id: [duplicate_id]}) == 1
+
+    assert db.session.get(Ingredient, duplicate_id) is None
+    assert db.session.get(Ingredient, canonical_id).allergen == 'Test'
+    assert RecipeIngredient.query.filter_by(ingredient_id=canonical_id).count() == 1
+
+
+def test_merge_collapses_the_relations_of_both_variants(app_context):
+    ingredient_mgt = IngredientManager()
+    recipe = Recipe.query.order_by(Recipe.recipe_id).first()
+    user = User.query.order_by(User.user_id).first()
+    suffix = uuid.uuid4().hex[:8]
+    ingredients = [Ingredient(name=f'Navet {suffix}'), Ingredient(name=f'navets {suffix}')]
+    shopping_list = ShoppingLists(user_id=user.user_id)
+    db.session.add_all(ingredients + [shopping_list])
+    db.session.commit()
+    canonical_id, duplicate_id = ingredients[0].ingredient_id, ingredients[1].ingredient_id
+    db.session.add_all([
+        RecipeIngredient(recipe_id=recipe.recipe_id, ingredient_id=canonical_id, quantity=1, unit='g'),
+        RecipeIngredient(recipe_id=recipe.recipe_id, ingredient_id=duplicate_id, quantity=2, unit='g'),
+        RecipeIngredient(recipe_id=recipe.recipe_id, ingredient_id=duplicate_id, quantity=3, unit='pièce'),
+        ShoppingListItem(shopping_list_id=shopping_list.shopping_list_id, ingredient_id=canonical_id, quantity=4,
+                         unit='g'),
+        ShoppingListItem(shopping_list_id=shopping_list.shopping_list_id, ingredient_id=duplicate_id, quantity=5,
+                         unit='g'),
+    ])
+    db.session.commit()
+
+    try:
+        assert ingredient_mgt.merge_duplicates({canonical_id: [duplicate_id]}) == 1
+
+        relations = RecipeIngredient.query.filter_by(recipe_id=recipe.recipe_id, ingredient_id=canonical_id)
+        assert sorted((relation.unit, relation.quantity) for relation in relations) == [('g', 3), ('pièce', 3)]
+        items = ShoppingListItem.query.filter_by(shopping_list_id=shopping_list.shopping_list_id).all()
+        assert [(item.ingredient_id, item.unit, item.quantity) for item in items] == [(canonical_id, 'g', 9)]
+    finally:
+        ShoppingListItem.query.filter_by(shopping_list_id=shopping_list.shopping_list_id).delete()
+        db.session.delete(shopping_list)
+        RecipeIngredient.query.filter_by(recipe_id=recipe.recipe_id, ingredient_id=canonical_id).delete()
+        db.session.commit()
@@ -0,0 +1,61 @@
+import threading
+import time
+
+from project.utils.LogSink import LogSink
+
+
+def make_record(idx: int) -> dict:
+    return {'user_id': 1, 'url': f'http://localhost/{idx}', 'method': 'GET', 'args': '{}', 'status_code': 200}
+
+
+def test_log_sink_batches_records():
+    batches = []
+    sink = LogSink(batch_size=10, flush_interval_ms=50, writer=batches.append)
+
+    for idx in range(25):
+        sink.emit(make_record(idx))
+
+    assert sink.flush()
+    assert sum(len(batch) for batch in batches) == 25
+    assert max(len(batch) for batch in batches) <= 10
+    assert sink.stats()['flushed'] == 25
+
+
+def test_log_sink_drops_on_overflow():
+    release = threading.Event()
+    sink = LogSink(batch_size=1, flush_interval_ms=10, max_queue=2, overflow='drop',
+                   writer=lambda records: release.wait(5))
+
+    for idx in range(10):
+        sink.emit(make_record(idx))
+    release.set()
+
+    assert sink.flush()
+    assert sink.stats()['dropped'] > 0
+    assert sink.stats()['dropped'] + sink.stats()['flushed'] == 10
+
+
+def test_log_sink_sync_mode():
+    batches = []
+    sink = LogSink(mode='sync', writer=batches.append)
+    sink.emit(make_record(0))
+
+    assert batches == [[make_record(0)]]
+    assert sink.stats()['flushed'] == 1
+
+
+def test_log_sink_flush_times_out_on_a_full_queue():
+    release = threading.Event()
+    sink = LogSink(batch_size=1, flush_interval_ms=10, max_queue=2, overflow='block',
+                   writer=lambda records: release.wait(5))
+
+    for idx in range(3):
+        sink.emit(make_record(idx))
+    started = time.monotonic()
+
+    try:
+        assert not sink.flush(timeout=0.1)
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+    assert sink.flush()
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from project.utils.MealPlanOptimizer import MealPlanOptimizer, daily_targets
+from project.utils.RecipeManager import RecipeManager, MEAL_PLAN_SIZE
+
+
+def test_optimizer_beats_random_weeks():
+    rng = np.random.default_rng(1)
+    calories = rng.uniform(250, 900, 500)
+    macros = np.column_stack([calories, calories * 0.05, calories * 0.12, calories * 0.03])
+    targets = daily_targets(2200)
+    optimizer = MealPlanOptimizer(seed=1, time_budget_ms=5)
+
+    week, score = optimizer.optimize(macros, targets)
+    random_scores = optimizer.score(rng.integers(0, 500, (1000, optimizer.week_size)), macros, targets)
+
+    assert week.shape == (MEAL_PLAN_SIZE,)
+    assert len(set(week.tolist())) == MEAL_PLAN_SIZE
+    assert score < np.percentile(random_scores, 1)
+
+
+def test_generate_meal_optimize_mode(app_context, user):
+    recipe_mgt = RecipeManager()
+    eligible_recipe_ids = set(recipe_mgt._eligible_recipe_ids(user.dietaryPreference, user.allergies))
+
+    meal_plan = recipe_mgt.generate_meal(user, recipe_mgt.next_week_date.isoformat(), mode='optimize')
+
+    recipe_ids = [meal['recipe_id'] for day_plan in meal_plan for meal in day_plan]
+    assert len(recipe_ids) == MEAL_PLAN_SIZE
+    assert set(recipe_ids) <= eligible_recipe_ids
+
+    with pytest.raises(ValueError):
+        recipe_mgt.generate_meal(user, recipe_mgt.next_week_date.isoformat(), mode='greedy')
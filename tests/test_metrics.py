@@ -0,0 +1,68 @@
+from project.app import app
+from project.utils.IngestionPipeline import RecipeIngestionPipeline, FakeCompletionBackend
+from project.utils.Metrics import Histogram, metrics
+
+
+def server_timing(response) -> dict:
+    timings = {}
+    for entry in response.headers['Server-Timing'].split(', '):
+        name, *params = entry.split(';')
+        timings[name] = dict(param.split('=', 1) for param in params)
+    return timings
+
+
+def test_histogram_exposition():
+    histogram = Histogram('sample_seconds', 'Sample.', (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(('/a', 'GET'), value)
+
+    lines = histogram.expose(('endpoint', 'method'))
+    assert 'sample_seconds_bucket{endpoint="/a",method="GET",le="0.1"} 2' in lines
+    assert 'sample_seconds_bucket{endpoint="/a",method="GET",le="1.0"} 3' in lines
+    assert 'sample_seconds_bucket{endpoint="/a",method="GET",le="+Inf"} 4' in lines
+    assert 'sample_seconds_count{endpoint="/a",method="GET"} 4' in lines
+
+
+def test_server_timing_header(client, user, authentication_header):
+    response = client.get(f'/recipe/diet?filter={user.dietaryPreference}&limit=5', headers=authentication_header)
+    timings = server_timing(response)
+
+    assert float(timings['app']['dur']) >= float(timings['db']['dur'])
+    assert timings['db']['desc'].endswith(' queries"')
+    assert 'serialize' in timings
+
+
+def test_metrics_endpoint(client, user, authentication_header):
+    metrics.reset()
+    client.get(f'/recipe/diet?filter={user.dietaryPreference}&limit=5', headers=authentication_header)
+    client.get('/recipe/diet', headers={})
+
+    metrics.token = 'scraper'
+    try:
+        body = client.get('/metrics', headers={'Authorization': 'Bearer scraper'}).data.decode()
+    finally:
+        metrics.token = None
+    assert 'http_requests_total{endpoint="/recipe/diet",method="GET",status="200"} 1' in body
+    assert 'http_requests_total{endpoint="/recipe/diet",method="GET",status="401"} 1' in body
+    assert 'http_request_sql_statements_count{endpoint="/recipe/diet",method="GET"} 2' in body
+    assert '# TYPE http_request_duration_seconds histogram' in body
+
+
+def test_metrics_endpoint_requires_the_token(client):
+    assert client.get('/metrics').status_code == 404
+
+    metrics.token = 'scraper'
+    try:
+        assert client.get('/metrics').status_code == 401
+        assert client.get('/metrics', headers={'Authorization': 'Bearer other'}).status_code == 401
+        assert client.get('/metrics', headers={'Authorization': 'Bearer scraper'}).status_code == 200
+    finally:
+        metrics.token = None
+
+
+def test_llm_span_covers_pipeline_workers():
+    with app.test_request_context('/dev/recipe/generate'):
+        app.preprocess_request()
+        pipeline = RecipeIngestionPipeline(FakeCompletionBackend(latency=0.02), max_workers=4)
+        pipeline.run([{'name': f'Recette {idx}', 'type': 'vegetarien'} for idx in range(4)], writer=lambda r: r)
+        assert metrics.current().spans['llm'] >= 0.08
@@ -0,0 +1,50 @@
+from project.app import app
+from project.database.database import db
+from project.database.models import RecipeIngredient
+from project.utils.PantryIndex import PantryIndex
+
+
+RELATIONS = [(1, 10), (1, 11), (2, 10), (2, 11), (2, 12), (2, 13), (3, 14), (4, 10)]
+
+
+def loaded_index():
+    index = PantryIndex()
+    index.load(RELATIONS)
+    return index
+
+
+def test_pantry_index_ranks_by_coverage():
+    index = loaded_index()
+    assert index.rank([10, 11]) == [(1, 2, 2), (4, 1, 1), (2, 2, 4)]
+    assert index.rank([10, 11], eligible_recipe_ids=[2, 3]) == [(2, 2, 4)]
+    assert index.rank([10, 11], min_coverage=0.75, limit=1) == [(1, 2, 2)]
+    assert index.rank([99]) == []
+
+
+def test_pantry_index_appends_new_relations():
+    index = loaded_index()
+    index.add_relations(3, [10])
+    index.add_relations(5, [14, 15])
+
+    assert index.rank([10, 14]) == [(3, 2, 2), (4, 1, 1), (1, 1, 2), (5, 1, 2), (2, 1, 4)]
+    assert index.rank([15]) == [(5, 1, 2)]
+    assert len(index) == 5
+
+
+def test_pantry_endpoint(client, user, authentication_header):
+    with app.app_context():
+        recipe_id, = db.session.query(RecipeIngredient.recipe_id).first()
+        ingredient_ids = [ingredient_id for ingredient_id, in
+                          db.session.query(RecipeIngredient.ingredient_id).filter_by(recipe_id=recipe_id)]
+
+    response = client.post('/recipe/pantry', json={'ingredients': ingredient_ids, 'limit': 50},
+                           headers=authentication_header)
+    assert response.status_code == 200
+    coverages = [recipe['coverage'] for recipe in response.json]
+    assert coverages == sorted(coverages, reverse=True)
+    assert all(0 < recipe['matched_ingredients'] <= recipe['ingredient_count'] for recipe in response.json)
+
+    assert client.post('/recipe/pantry', json={'ingredients': []},
+                       headers=authentication_header).status_code == 400
+    assert client.post('/recipe/pantry', json={'ingredients': [{'id': 1}]},
+                       headers=authentication_header).status_code == 400
@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+
+import pytest
+
+from project.app import app
+from project.route import route_blueprint
+from project.utils.CatalogCache import catalog_cache
+
+# Endpoints that can not run in the test environment, their budget is still declared
+UNMEASURED = {'handle_generate_recipe': 'needs the meal ideas file and a completion backend'}
+
+CALLS = {
+    'hello_world': lambda s: ('GET', '/', {}),
+    'handle_get_current_user': lambda s: ('GET', '/user/me', {}),
+    'handle_get_recipes_by_diet': lambda s: ('GET', f'/recipe/diet?filter={s["diet"]}&limit=20', {}),
+    'handle_search_recipes': lambda s: ('GET', '/recipe/search?q=recipe&limit=20', {}),
+    'handle_find_recipes_by_pantry': lambda s: ('POST', '/recipe/pantry', {'json': {'ingredients': s['ingredients']}}),
+    'handle_get_recipe': lambda s: ('GET', f'/recipe/id/{s["recipe_id"]}', {}),
+    'handle_user_login': lambda s: ('POST', '/user/login', {'json': {'email': s['email'], 'password': 'kebab'}}),
+    # An existing email, to not create a user at each run
+    'handle_add_user': lambda s: ('POST', '/user', {'json': {'email': s['email'], 'password': 'kebab'}}),
+    'handle_generate_meal': lambda s: ('POST', '/meal/generate', {'json': {'start_date': s['start']}}),
+    'handle_get_current_meal_plan': lambda s: ('GET', f'/meal/plan?start={s["start"]}', {}),
+    'handle_swap_recipe_in_meal': lambda s: ('POST', '/meal/swap', {'json': {'recipe_id': s['recipe_id'],
+                                                                              'date': s['date']}}),
+    'handle_get_shopping_list': lambda s: ('GET', f'/shopping/list?start={s["start"]}', {}),
+    'handle_flush_shopping_list': lambda s: ('DELETE', f'/shopping/list?start={s["start"]}', {}),
+    'handle_update_shopping_list_item': lambda s: ('PATCH', f'/shopping/list/item/{s["item_id"]}',
+                                                   {'json': {'quantity': 3}}),
+    'handle_delete_shopping_list_item': lambda s: ('DELETE', f'/shopping/list/item/{s["item_id"]}', {}),
+}
+
+
+def app_endpoints() -> dict:
+    """
+    :return: The view of each route of the API, keyed by its name in the blueprint.
+    """
+    prefix = f'{route_blueprint.name}.'
+    return {rule.endpoint.removeprefix(prefix): app.view_functions[rule.endpoint]
+            for rule in app.url_map.iter_rules() if rule.endpoint.startswith(prefix)}
+
+
+@pytest.fixture
+def scenario(client, user, authentication_header):
+    """
+    A meal plan of next week with its shopping list, and the process-wide indexes warmed.
+    """
+    today = date.today()
+    start = (today + timedelta(days=(7 - today.weekday()))).isoformat()
+    client.post('/meal/generate', json={'start_date': start}, headers=authentication_header)
+    meal = client.get(f'/meal/plan?start={start}', headers=authentication_header).json[0][0]
+    shopping_list = client.get(f'/shopping/list?start={start}', headers=authentication_header).json
+    detail = client.get(f'/recipe/id/{meal["recipe_id"]}', headers=authentication_header).json
+    ingredients = [ingredient['ingredient_id'] for ingredient in detail['ingredients']]
+    client.get('/recipe/search?q=recipe', headers=authentication_header)
+    client.post('/recipe/pantry', json={'ingredients': ingredients}, headers=authentication_header)
+
+    return {'email': user.email, 'diet': user.dietaryPreference, 'start': start, 'recipe_id': meal['recipe_id'],
+            'date': meal['date'], 'item_id': shopping_list['items'][0]['shopping_list_item_id'],
+            'ingredients': ingredients, 'headers': authentication_header}
+
+
+def test_every_route_has_a_budget():
+    endpoints = app_endpoints()
+    assert [endpoint for endpoint, view in endpoints.items() if not hasattr(view, '__query_budget__')] == []
+    assert set(endpoints) == set(CALLS) | set(UNMEASURED)
+
+
+@pytest.mark.parametrize('endpoint', sorted(CALLS))
+def test_endpoint_query_budget(endpoint, client, scenario, query_budget):
+    method, url, kwargs = CALLS[endpoint](scenario)
+    budget = app_endpoints()[endpoint].__query_budget__
+    catalog_cache.bump()
+
+    with query_budget(budget, f'{method} {url}'):
+        response = client.open(url, method=method, headers=scenario['headers'], **kwargs)
+    assert response.status_code < 500
+
+
+def test_query_budget_reports_duplicates(client, scenario, query_budget):
+    with pytest.raises(pytest.fail.Exception) as failure:
+        with query_budget(1, 'two plans'):
+            for _ in range(2):
+                client.get(f'/meal/plan?start={scenario["start"]}', headers=scenario['headers'])
+
+    assert 'two plans issued' in str(failure.value)
+    assert '   2 x SELECT meal_plans.meal_plan_id' in str(failure.value)
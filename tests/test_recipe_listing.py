@@ -0,0 +1,49 @@
+import json
+
+from project.app import app
+from project.utils.RecipeManager import RecipeManager
+
+
+def diet_listing(diet):
+    with app.app_context():
+        return RecipeManager().list_recipe_by_diet(diet)
+
+
+def test_recipe_diet_keyset_pages(client, user, authentication_header):
+    recipes = diet_listing(user.dietaryPreference)
+    recipe_ids = []
+    url = f'/recipe/diet?filter={user.dietaryPreference}&limit=7'
+    while url:
+        response = client.get(url, headers=authentication_header)
+        assert response.status_code == 200
+        recipe_ids += [recipe['recipe_id'] for recipe in response.json]
+        url = response.headers.get('Link', '').partition('>')[0].lstrip('<')
+
+    assert recipe_ids == sorted(recipe['recipe_id'] for recipe in recipes)
+
+
+def test_recipe_diet_fields_projection(client, user, authentication_header):
+    response = client.get(f'/recipe/diet?filter={user.dietaryPreference}&limit=3&fields=title,calories',
+                          headers=authentication_header)
+    assert response.status_code == 200
+    assert all(set(recipe) == {'recipe_id', 'title', 'calories'} for recipe in response.json)
+
+    response = client.get(f'/recipe/diet?filter={user.dietaryPreference}&fields=password',
+                          headers=authentication_header)
+    assert response.status_code == 400
+
+
+def test_recipe_diet_rejects_an_empty_page(client, user, authentication_header):
+    response = client.get(f'/recipe/diet?filter={user.dietaryPreference}&limit=0', headers=authentication_header)
+    assert response.status_code == 400
+
+
+def test_recipe_diet_ndjson_stream(client, user, authentication_header):
+    recipes = diet_listing(user.dietaryPreference)
+    response = client.get(f'/recipe/diet?filter={user.dietaryPreference}&format=ndjson',
+                          headers=authentication_header)
+
+    assert response.mimetype == 'application/x-ndjson'
+    streamed = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert sorted(recipe['recipe_id'] for recipe in streamed) == sorted(recipe['recipe_id'] for recipe in recipes)
+    assert streamed == sorted(streamed, key=lambda recipe: recipe['recipe_id'])
@@ -0,0 +1,71 @@
+from sqlalchemy import event, func
+
+from project.app import app
+from project.database.database import db
+from project.database.models import MealPlans, MealPlanRecipe, Recipe, RecipeIngredient
+from project.utils.AllergenIndex import allergen_index
+from project.utils.CatalogCache import catalog_cache
+from project.utils.RecipeManager import RecipeManager
+
+
+MEAL_PLAN_QUERY_BUDGET = 3
+
+
+def test_meal_plan_allergens_query_budget(app_context, user, count_queries):
+    recipe_mgt = RecipeManager()
+    recipe_mgt.generate_meal(user, recipe_mgt.current_week_date.isoformat())
+    allergen_index.invalidate()
+
+    with count_queries() as statements:
+        meal_plan = recipe_mgt.get_current_meal_plan(user)
+
+    assert len(meal_plan) == 7
+    assert len(statements) <= MEAL_PLAN_QUERY_BUDGET
+
+    for day_plan in meal_plan:
+        for meal in day_plan:
+            assert set(meal['allergens']) == allergen_index.get(meal['recipe_id'])
+
+
+def test_generate_meal_single_commit(app_context, user):
+    recipe_mgt = RecipeManager()
+    start_date = recipe_mgt.next_week_date.isoformat()
+    commits = []
+
+    def commit(conn):
+        commits.append(conn)
+
+    event.listen(db.engine, 'commit', commit)
+    try:
+        recipe_mgt.generate_meal(user, start_date)
+        recipe_mgt.generate_meal(user, start_date)
+    finally:
+        event.remove(db.engine, 'commit', commit)
+
+    meal_plans = MealPlans.query.filter_by(user_id=user.user_id, start_date=recipe_mgt.next_week_date).all()
+    assert len(commits) == 2
+    assert len(meal_plans) == 1
+    assert MealPlanRecipe.query.filter_by(meal_plan_id=meal_plans[0].meal_plan_id).count() == 14
+
+
+def test_recipe_detail_single_query(app_context, count_queries):
+    recipe_mgt = RecipeManager()
+    recipe_id = RecipeIngredient.query.first().recipe_id
+    ingredient_count = RecipeIngredient.query.filter_by(recipe_id=recipe_id).count()
+    catalog_cache.bump()
+
+    with count_queries() as statements:
+        recipe = recipe_mgt.get_recipe_by_id(recipe_id)
+
+    assert len(statements) == 1
+    assert recipe['recipe_id'] == recipe_id
+    assert len(recipe['ingredients']) == ingredient_count
+    assert {'name', 'quantity', 'unit', 'ingredient_id'} <= set(recipe['ingredients'][0])
+
+
+def test_recipe_detail_not_found(client, authentication_header):
+    with app.app_context():
+        missing_recipe_id = (db.session.query(func.max(Recipe.recipe_id)).scalar() or 0) + 1
+
+    response = client.get(f'/recipe/id/{missing_recipe_id}', headers=authentication_header)
+    assert response.status_code == 404
@@ -0,0 +1,131 @@
+from datetime import date
+
+import pytest
+from flask import Flask
+from sqlalchemy import insert
+
+from project.database.database import db
+from project.database.models import Ingredient, MealPlanRecipe, MealPlans, Recipe, RecipeIngredient, User
+from project.utils.ReplicaRouter import ReplicaSet, replica_router
+from project.utils.ShoppingListManager import ShoppingListManager
+from project.utils.decorator import read_only, read_your_writes
+
+
+WEEK = date(2024, 1, 1)
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    """
+    An app on two SQLite files, a primary and a replica, each holding one ingredient named after its file.
+    """
+    app = Flask('replicas')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'primary.db'}"
+    app.config['SQLALCHEMY_BINDS'] = {'replica_0': {'url': f"sqlite:///{tmp_path / 'replica.db'}", 'pool_size': 2}}
+    app.config['REPLICA_BIND_KEYS'] = ['replica_0']
+    app.config['REPLICA_STICKY_SECONDS'] = 60
+    db.init_app(app)
+    replica_router.init_app(app)
+
+    def identify(user_id: int):
+        replica_router.identify(user_id)
+        return ','.join(sorted(name for name, in db.session.query(Ingredient.name)))
+
+    @app.route('/read/<int:user_id>')
+    @read_only
+    def read(user_id):
+        return identify(user_id)
+
+    @app.route('/read-and-write/<int:user_id>')
+    @read_only
+    def read_and_write(user_id):
+        names = identify(user_id)
+        db.session.add(Ingredient(name='written'))
+        db.session.commit()
+        return names
+
+    @app.route('/write/<int:user_id>')
+    @read_your_writes
+    def write(user_id):
+        return identify(user_id)
+
+    @app.route('/shopping/<int:user_id>')
+    @read_only
+    def shopping_list(user_id):
+        return ShoppingListManager().get_shopping_list(user_id, WEEK) or {}
+
+    with app.app_context():
+        for name, engine in (('primary', db.engines[None]), ('replica', db.engines['replica_0'])):
+            db.metadata.create_all(engine)
+            with engine.begin() as connection:
+                connection.execute(insert(Ingredient), [{'name': name}])
+    return app
+
+
+def test_reads_of_read_only_endpoints_go_to_the_replica(replica_app):
+    client = replica_app.test_client()
+
+    assert client.get('/read/1').text == 'replica'
+    assert client.get('/write/2').text == 'primary'
+    with replica_app.app_context():
+        assert db.engines['replica_0'].pool.size() == 2
+        assert replica_app.extensions['replica_router'].in_flight == {'replica_0': 0}
+
+
+def test_writes_of_read_only_endpoints_go_to_the_primary(replica_app):
+    assert replica_app.test_client().get('/read-and-write/1').text == 'replica'
+
+    with replica_app.app_context():
+        assert sorted(name for name, in db.session.query(Ingredient.name)) == ['primary', 'written']
+        with replica_router.reading():
+            assert [name for name, in db.session.query(Ingredient.name)] == ['replica']
+
+
+def test_reads_stick_to_the_primary_after_a_write(replica_app):
+    client = replica_app.test_client()
+
+    client.get('/write/1')
+
+    assert client.get('/read/1').text == 'primary'
+    assert client.get('/read/2').text == 'replica'
+
+
+def test_shopping_list_built_during_a_read_only_request(replica_app):
+    # A meal plan replicated everywhere, whose shopping list is not built yet
+    with replica_app.app_context():
+        for engine in (db.engines[None], db.engines['replica_0']):
+            with engine.begin() as connection:
+                connection.execute(insert(User), [{'user_id': 1, 'email': 'u@x.io'}])
+                connection.execute(insert(Recipe), [{'recipe_id': 1, 'title': 'Soupe', 'instructions': []}])
+                connection.execute(insert(RecipeIngredient), [{'recipe_id': 1, 'ingredient_id': 1, 'quantity': 2,
+                                                               'unit': 'g'}])
+                connection.execute(insert(MealPlans), [{'meal_plan_id': 1, 'user_id': 1, 'start_date': WEEK}])
+                connection.execute(insert(MealPlanRecipe), [{'meal_plan_id': 1, 'recipe_id': 1, 'date': WEEK}])
+
+    response = replica_app.test_client().get('/shopping/1')
+
+    assert response.status_code == 200
+    assert [(item['ingredient_id'], item['quantity']) for item in response.json['items']] == [(1, 2)]
+
+
+def test_replica_selection():
+    round_robin = ReplicaSet(['a', 'b', 'c'])
+    assert [round_robin.acquire() for _ in range(4)] == ['a', 'b', 'c', 'a']
+
+    least_busy = ReplicaSet(['a', 'b'], selection='least_busy')
+    assert least_busy.acquire() == 'a'
+    assert [least_busy.acquire(), least_busy.acquire()] == ['b', 'a']
+    least_busy.release('a')
+    least_busy.release('a')
+    assert least_busy.acquire() == 'a'
+
+    with pytest.raises(ValueError):
+        ReplicaSet(['a'], selection='random')
+
+
+def test_stickiness_expires():
+    replicas = ReplicaSet(['a'], sticky_seconds=0)
+    replicas.stick(1)
+
+    assert not replicas.is_sticky(1)
+    assert not replicas.is_sticky(2)
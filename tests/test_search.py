@@ -0,0 +1,98 @@
+import threading
+import uuid
+
+from flask import Flask
+from sqlalchemy import delete
+
+from project.app import app
+from project.database.database import db
+from project.database.models import Recipe
+from project.utils.CatalogCache import catalog_cache
+from project.utils.SearchIndex import SearchIndex, search_index, tokenize
+from project.utils.RecipeManager import RecipeManager
+
+
+RECIPES = [
+    (1, 'Gratin de courgettes', 'Un gratin fondant.', ['Couper les courgettes.', 'Enfourner.'], 'vegetarien'),
+    (2, 'Salade de tomates', 'Une salade fraîche aux courgettes crues.', ['Couper.', 'Assaisonner.'], 'vegetarien'),
+    (3, 'Poulet rôti', 'Un poulet doré.', ['Rôtir le poulet.'], 'keto'),
+]
+RECIPE_INGREDIENTS = [(1, 'Courgette'), (1, 'Gruyère'), (2, 'Tomates'), (3, 'Poulet')]
+
+
+def loaded_index():
+    index = SearchIndex()
+    index.load(RECIPES, RECIPE_INGREDIENTS)
+    return index
+
+
+def test_tokenize_folds_accents_case_and_plurals():
+    assert tokenize('Gratin de Courgettes au Gruyère') == ['gratin', 'courgette', 'gruyere']
+    assert tokenize('Poulet RÔTI') == tokenize('poulets roti')
+
+
+def test_search_ranks_title_matches_first():
+    index = loaded_index()
+    results = index.search('courgette')
+    assert [recipe_id for recipe_id, _ in results] == [1, 2]
+    assert results[0][1] > results[1][1] > 0
+
+    assert index.search('gruyere') == index.search('Gruyères')[:1]
+    assert [recipe_id for recipe_id, _ in index.search('courgettes', diet='keto')] == []
+    assert index.search('de la') == []
+
+
+def test_search_index_updates_incrementally():
+    index = loaded_index()
+    index.add_recipe({'recipe_id': 4, 'title': 'Tarte au citron', 'description': '', 'instructions': [],
+                      'diet': 'vegetarien'})
+    index.add_ingredients(4, ['Citron', 'Courgette'])
+
+    assert [recipe_id for recipe_id, _ in index.search('citron')] == [4]
+    assert 4 in [recipe_id for recipe_id, _ in index.search('courgette')]
+
+    index.add_recipe({'recipe_id': 4, 'title': 'Tarte aux pommes', 'instructions': [], 'diet': 'vegetarien'})
+    assert index.search('tarte citron')[0][0] == 4
+    assert index.search('pomme')[0][0] == 4
+    assert len(index) == 4
+
+
+def test_search_endpoint(client, user, authentication_header):
+    title = f'Gaspacho {uuid.uuid4().hex}'
+    with app.app_context():
+        recipe_id = RecipeManager().save_recipe({'title': title, 'description': 'Une soupe froide.',
+                                                 'instructions': ['Mixer.'], 'diet': user.dietaryPreference})
+    try:
+        response = client.get(f'/recipe/search?q={title}&limit=5', headers=authentication_header)
+        assert response.status_code == 200
+        assert response.json[0]['recipe_id'] == recipe_id
+        assert all('score' in found for found in response.json)
+    finally:
+        with app.app_context():
+            db.session.execute(delete(Recipe).where(Recipe.recipe_id == recipe_id))
+            db.session.commit()
+            catalog_cache.bump()
+            search_index.clear()
+
+    assert client.get('/recipe/search?q=', headers=authentication_header).status_code == 400
+    assert client.get('/recipe/search?q=tarte&limit=0', headers=authentication_header).status_code == 400
+
+
+def test_search_index_warms_at_the_first_request(tmp_path, caplog):
+    warm_app = Flask('warm')
+    warm_app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'empty.db'}"
+    warm_app.config['SEARCH_INDEX_WARM'] = True
+    db.init_app(warm_app)
+    index = SearchIndex()
+    index.init_app(warm_app)
+
+    assert 'search-index-warm' not in [thread.name for thread in threading.enumerate()]
+
+    warm_app.test_client().get('/')
+    for thread in threading.enumerate():
+        if thread.name == 'search-index-warm':
+            thread.join()
+
+    # The database has no tables yet: nothing is built, nothing is logged
+    assert not index._built
+    assert caplog.records == []
@@ -0,0 +1,31 @@
+from datetime import date
+
+from project.database.models import RecipeIngredient, Ingredient, MealPlanRecipe, User
+
+
+def test_serialize_columns_only():
+    relation = MealPlanRecipe(meal_plan_id=1, recipe_id=2, date=date(2024, 1, 1))
+
+    assert relation.serialize() == {'meal_plans_recipe_relation_id': None, 'meal_plan_id': 1, 'recipe_id': 2,
+                                    'mealType': None, 'date': '2024-01-01'}
+
+
+def test_serialize_excluded_columns():
+    user = User(email='u@x.io', password_hash='hash', birthdate=date(1990, 5, 4), allergies=('Gluten',))
+    serialized = user.serialize()
+
+    assert 'password_hash' not in serialized
+    assert 'joinDate' not in serialized
+    assert 'lastTokenReset' not in serialized
+    assert serialized['birthdate'] == '1990-05-04'
+    assert serialized['allergies'] == ['Gluten']
+
+
+def test_serialize_include_relationship():
+    relation = RecipeIngredient(recipe_id=1, quantity=2, unit='g',
+                                ingredient=Ingredient(name='Tomate', category='Légume'))
+    serialized = relation.serialize(include=('ingredient',))
+
+    assert serialized['ingredient']['name'] == 'Tomate'
+    assert 'recipe' not in serialized
+    assert relation.serialize(include=('recipe',))['recipe'] is None
@@ -0,0 +1,79 @@
+from collections import defaultdict
+
+from project.app import app
+from project.database.models import RecipeIngredient, MealPlanRecipe, MealPlans
+from project.utils.RecipeManager import RecipeManager
+from project.utils.ShoppingListManager import ShoppingListManager
+
+
+def expected_totals(user):
+    # Recomputed from scratch, what the incrementally maintained list must match
+    recipe_mgt = RecipeManager()
+    meal_plan = MealPlans.query.filter_by(user_id=user.user_id, start_date=recipe_mgt.current_week_date).first()
+    totals = defaultdict(float)
+    for relation in MealPlanRecipe.query.filter_by(meal_plan_id=meal_plan.meal_plan_id):
+        for ingredient in RecipeIngredient.query.filter_by(recipe_id=relation.recipe_id):
+            totals[(ingredient.ingredient_id, ingredient.unit)] += ingredient.quantity or 0
+    return {key: round(total, 6) for key, total in totals.items() if total > 0}
+
+
+def list_totals(shopping_list):
+    return {(item['ingredient_id'], item['unit']): round(item['quantity'], 6) for item in shopping_list['items']}
+
+
+def test_shopping_list_build_and_swap(app_context, user, count_queries):
+    recipe_mgt = RecipeManager()
+    shopping_list_mgt = ShoppingListManager()
+    meal_plan = recipe_mgt.generate_meal(user, recipe_mgt.current_week_date.isoformat())
+
+    shopping_list = shopping_list_mgt.get_shopping_list(user.user_id, recipe_mgt.current_week_date)
+    assert list_totals(shopping_list) == expected_totals(user)
+
+    meal = meal_plan[2][0]
+    recipe_mgt.swap_recipe(meal['recipe_id'], meal['date'], user)
+    with count_queries() as statements:
+        shopping_list = shopping_list_mgt.get_shopping_list(user.user_id, recipe_mgt.current_week_date)
+
+    assert list_totals(shopping_list) == expected_totals(user)
+    assert not any(statement.lstrip().upper().startswith('INSERT') for statement in statements)
+
+
+def test_shopping_list_endpoints(client, user, authentication_header):
+    recipe_mgt = RecipeManager()
+    with app.app_context():
+        recipe_mgt.generate_meal(user, recipe_mgt.current_week_date.isoformat())
+
+    response = client.get('/shopping/list', headers=authentication_header)
+    assert response.status_code == 200
+    item = response.json['items'][0]
+
+    response = client.patch(f'/shopping/list/item/{item["shopping_list_item_id"]}', headers=authentication_header,
+                            json={'quantity': item['quantity'] + 1})
+    assert response.status_code == 200
+    assert response.json['quantity'] == item['quantity'] + 1
+
+    response = client.patch(f'/shopping/list/item/{item["shopping_list_item_id"]}', headers=authentication_header,
+                            json={'ingredient_id': 1})
+    assert response.status_code == 400
+
+    response = client.delete(f'/shopping/list/item/{item["shopping_list_item_id"]}', headers=authentication_header)
+    assert response.status_code == 204
+    response = client.delete(f'/shopping/list/item/{item["shopping_list_item_id"]}', headers=authentication_header)
+    assert response.status_code == 404
+
+    response = client.delete('/shopping/list', headers=authentication_header)
+    assert response.status_code == 204
+    assert client.get('/shopping/list', headers=authentication_header).json['items'] == []
+
+
+def test_swap_keeps_a_flushed_shopping_list_empty(app_context, user):
+    recipe_mgt = RecipeManager()
+    shopping_list_mgt = ShoppingListManager()
+    meal_plan = recipe_mgt.generate_meal(user, recipe_mgt.current_week_date.isoformat())
+    shopping_list_mgt.get_shopping_list(user.user_id, recipe_mgt.current_week_date)
+    assert shopping_list_mgt.flush(user.user_id, recipe_mgt.current_week_date)
+
+    meal = meal_plan[2][0]
+    recipe_mgt.swap_recipe(meal['recipe_id'], meal['date'], user)
+
+    assert shopping_list_mgt.get_shopping_list(user.user_id, recipe_mgt.current_week_date)['items'] == []
@@ -0,0 +1,21 @@
+from benchmarks.bench_startup import import_times
+from project.app import app
+
+# Only needed by the dev ingestion route, the meal plan optimizer or the ``flask db`` commands
+DEFERRED_MODULES = ('openai', 'httpx', 'pydantic', 'numpy', 'alembic', 'flask_migrate',
+                    'project.utils.IngestionPipeline')
+
+
+def test_app_import_defers_heavy_modules():
+    times = import_times('project.app')
+
+    assert 'project.app' in times
+    assert [module for module in DEFERRED_MODULES if module in times] == []
+
+
+def test_migrate_commands_are_loaded_on_demand():
+    result = app.test_cli_runner().invoke(args=['db', '--help'])
+
+    assert result.exit_code == 0, result.output
+    assert 'upgrade' in result.output
+    assert 'migrate' in app.extensions
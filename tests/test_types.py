@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, MetaData, Table, String, create_engine, insert, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from project.database.models import Recipe, User
+from project.database.types import PortableArray
+
+
+def test_portable_array_round_trip_on_sqlite():
+    metadata = MetaData()
+    table = Table('lists', metadata, Column('id', Integer, primary_key=True), Column('names', PortableArray(String)))
+    engine = create_engine('sqlite://')
+    metadata.create_all(engine)
+
+    with engine.begin() as connection:
+        connection.execute(insert(table), [{'names': ('gluten', 'lactose')}, {'names': []}, {'names': None}])
+        assert connection.execute(select(table.c.names).order_by(table.c.id)).scalars().all() == [
+            ['gluten', 'lactose'], [], None]
+
+
+def test_portable_array_is_a_native_array_on_postgres():
+    ddl = str(CreateTable(User.__table__).compile(dialect=postgresql.dialect()))
+    assert 'allergies VARCHAR[]' in ddl
+    assert 'instructions VARCHAR[] NOT NULL' in str(CreateTable(Recipe.__table__).compile(dialect=postgresql.dialect()))
+
+
+def test_serializer_converts_portable_arrays():
+    recipe = Recipe(recipe_id=1, title='Recette', instructions=('Couper.', 'Cuire.'), diet='flex')
+    assert recipe.serialize()['instructions'] == ['Couper.', 'Cuire.']